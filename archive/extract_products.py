@@ -2,12 +2,16 @@
 Extracteur de produits Foodles - Récupère les produits du frigo
 """
 from foodles_api import FoodlesAPI
-from rsc_parser import RSCParser
 import json
 import re
+import sys
+from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
 
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from rsc_decoder import RSCDocument
+
 
 class ProductExtractor:
     """Extrait les produits du contenu RSC"""
@@ -32,21 +36,20 @@ class ProductExtractor:
         content = fridge_data['raw_content']
         products = []
         
-        # Méthode 1: Extraire via JSON objects
-        parser = RSCParser(content)
-        json_objects = parser.extract_all_json_objects()
-        
-        print(f"🔍 Analyse de {len(json_objects)} objets JSON...")
-        
-        for obj in json_objects:
-            if self._is_product(obj):
-                product = self._clean_product(obj)
-                products.append(product)
+        # Décodage RSC en une passe: références résolues, props des composants comprises
+        try:
+            document = RSCDocument.parse(content)
+        except ValueError as e:
+            print(f"⚠️  Décodage RSC impossible ({e}), recherche dans le contenu brut...")
+            document = None
         
-        # Méthode 2: Parser le contenu brut pour trouver les produits
-        print("🔍 Recherche de produits dans le contenu brut...")
-        raw_products = self._extract_from_raw_content(content)
-        products.extend(raw_products)
+        if document is not None:
+            print(f"🔍 Analyse de {len(document.rows)} rows RSC...")
+            for obj in document.walk():
+                if self._is_product(obj):
+                    products.append(self._clean_product(obj))
+        else:
+            products.extend(self._extract_from_raw_content(content))
         
         # Déduplication par ID
         unique_products = {}
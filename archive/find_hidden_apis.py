@@ -4,9 +4,14 @@ Scan le code JavaScript de Foodles pour trouver les vraies APIs cachées.
 """
 
 import re
+import sys
 import requests
+from pathlib import Path
 from config import FoodlesConfig
 
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from api_discovery import APIDiscovery
+
 def fetch_and_analyze_js():
     """Télécharge et analyse les fichiers JS de Foodles"""
     
@@ -45,79 +50,21 @@ def fetch_and_analyze_js():
     html = response.text
     print(f"   ✅ Page chargée ({len(html)} caractères)")
     
-    # Extraire tous les liens vers les fichiers JS
-    js_files = re.findall(r'/_next/static/chunks/[^"\']+\.js', html)
+    # Chunks téléchargés en parallèle, mis en cache par nom (hash de contenu)
+    discovery = APIDiscovery(session_id=config.session_id, csrf_token=config.csrf_token)
+    js_files = discovery.find_chunks(html)
     print(f"\n2️⃣  Fichiers JavaScript trouvés: {len(js_files)}")
+    print(f"   Analyse de tous les fichiers (cache: {discovery.root})...\n")
     
-    # Patterns à rechercher dans le code JS
-    api_patterns = [
-        # Endpoints API classiques
-        r'/api/[a-zA-Z0-9/_-]+',
-        # GraphQL
-        r'graphql["\']?\s*:\s*["\'][^"\']+',
-        # Fetch/axios avec URLs
-        r'fetch\(["\']([^"\']+)["\']',
-        r'axios\.[a-z]+\(["\']([^"\']+)["\']',
-        # Routes Next.js
-        r'router\.push\(["\']([^"\']+)["\']',
-        # Mutations/Actions
-        r'action["\']?\s*:\s*["\']([^"\']+)',
-        r'mutation["\']?\s*:\s*["\']([^"\']+)',
-        # Endpoints dans des objets config
-        r'endpoint[s]?["\']?\s*:\s*["\']([^"\']+)',
-        r'url["\']?\s*:\s*["\']([^"\']+)',
-        # API routes
-        r'\/canteen\/[a-zA-Z0-9/_-]+',
-        r'\/cart\/[a-zA-Z0-9/_-]+',
-        r'\/order\/[a-zA-Z0-9/_-]+',
-        r'\/product\/[a-zA-Z0-9/_-]+',
-    ]
-    
-    all_endpoints = set()
-    
-    # Analyser les fichiers JS les plus prometteurs
-    priority_files = [
-        f for f in js_files 
-        if any(keyword in f for keyword in ['app', 'page', 'canteen', 'cart', 'order', 'product'])
-    ]
+    inventory = discovery.run(['/canteen/fridge'], html={'/canteen/fridge': html})
+    diff = discovery.save_inventory(inventory)
+    stats = discovery.stats
+    already_scanned = len(js_files) - stats['scanned'] - stats['errors']
+    print(f"   {stats['downloaded']} téléchargés, {already_scanned} déjà analysés, {stats['errors']} erreurs")
+    if diff['added'] or diff['removed']:
+        print(f"   🆕 Depuis le dernier inventaire: +{len(diff['added'])} / -{len(diff['removed'])}")
     
-    # Si pas de fichiers prioritaires, prendre les 10 premiers
-    if not priority_files:
-        priority_files = js_files[:10]
-    
-    print(f"   Analyse de {len(priority_files)} fichiers prioritaires...\n")
-    
-    for i, js_file in enumerate(priority_files, 1):
-        url = f"https://app.foodles.co{js_file}"
-        print(f"   [{i}/{len(priority_files)}] {js_file[:60]}...")
-        
-        try:
-            js_response = requests.get(url, timeout=10)
-            js_code = js_response.text
-            
-            # Chercher tous les patterns
-            for pattern in api_patterns:
-                matches = re.findall(pattern, js_code, re.IGNORECASE)
-                for match in matches:
-                    # Nettoyer et valider
-                    if isinstance(match, tuple):
-                        match = match[0] if match else ""
-                    
-                    match = match.strip()
-                    
-                    # Filtrer les résultats pertinents
-                    if match and (
-                        match.startswith('/api/') or
-                        match.startswith('/canteen') or
-                        match.startswith('/cart') or
-                        match.startswith('/order') or
-                        match.startswith('/product') or
-                        'foodles' in match.lower()
-                    ):
-                        all_endpoints.add(match)
-        
-        except Exception as e:
-            print(f"      ⚠️  Erreur: {e}")
+    all_endpoints = set(inventory['endpoints'])
     
     print(f"\n3️⃣  RÉSULTATS DE L'ANALYSE:")
     print("=" * 80)
@@ -38,7 +38,8 @@ class FoodlesCLI:
    categories                - Liste les catégories
    tags                      - Liste tous les tags
    filter tag <tag>          - Filtre par tag
-   export [fichier]          - Exporte les produits en JSON
+   export [fichier]          - Exporte les produits (JSON, ou .parquet/.arrow/.csv)
+   export stats [fichier]    - Exporte les stats par catégorie
    refresh                   - Recharge les produits
    user                      - Info utilisateur
    opening                   - Horaires d'ouverture
@@ -219,13 +220,18 @@ class FoodlesCLI:
             print(f"❌ Type de filtre '{filter_type}' non supporté")
             
     def cmd_export(self, args):
-        """Exporte les produits"""
+        """Exporte les produits ou les stats (format selon l'extension)"""
+        if args and args[0] == 'stats':
+            filename = self.client.export_stats(args[1] if len(args) > 1 else 'stats.json')
+            print(f"✅ Statistiques exportées vers {filename}")
+            return
+        
         filename = args[0] if args else 'export.json'
         
         if not self.products:
             self.load_products()
             
-        self.client.export_products(filename)
+        filename = self.client.export_products(filename)
         print(f"✅ {len(self.products)} produits exportés vers {filename}")
         
     def cmd_refresh(self, args):
@@ -5,9 +5,12 @@ Version finale intégrant parsing, recherche, et automatisation.
 """
 
 import json
+import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from foodles_real_api import FoodlesRealAPI
+from columnar_export import EXTENSIONS, PRODUCT_COLUMNS, AGGREGATE_COLUMNS, aggregate_rows, product_rows, write_table
+from snapshot_aggregates import normalize_items
 
 
 class FoodlesClient:
@@ -191,29 +194,55 @@ class FoodlesClient:
     
     # ==================== EXPORT ====================
     
-    def export_products(self, filename: str = "foodles_products.json"):
+    def export_products(self, filename: str = "foodles_products.json", fmt: str = None):
         """
-        Exporte tous les produits dans un fichier JSON
+        Exporte tous les produits
+        
+        JSON par défaut; Parquet, Arrow ou CSV (une ligne par produit, colonnes
+        typées) selon fmt ou l'extension du fichier.
         
         Args:
             filename: Nom du fichier de sortie
+            fmt: 'json', 'parquet', 'arrow' ou 'csv' (défaut: d'après l'extension)
+        
+        Returns:
+            Chemin du fichier écrit (l'extension suit le format réel)
         """
         products = self.get_all_products()
+        if self._is_columnar(filename, fmt):
+            return write_table(self._product_rows(), PRODUCT_COLUMNS, filename, fmt)[0]
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(products, f, indent=2, ensure_ascii=False)
         return filename
     
-    def export_stats(self, filename: str = "foodles_stats.json"):
+    def export_stats(self, filename: str = "foodles_stats.json", fmt: str = None):
         """
         Exporte les statistiques
         
+        En Parquet, Arrow ou CSV: une ligne par catégorie (produits, unités,
+        prix min/max/moyen).
+        
         Args:
             filename: Nom du fichier
+            fmt: 'json', 'parquet', 'arrow' ou 'csv' (défaut: d'après l'extension)
         """
+        if self._is_columnar(filename, fmt):
+            self.get_all_products()
+            return write_table(aggregate_rows(self._product_rows()), AGGREGATE_COLUMNS, filename, fmt)[0]
         stats = self.get_statistics()
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(stats, f, indent=2, ensure_ascii=False)
         return filename
+    
+    @staticmethod
+    def _is_columnar(filename: str, fmt: str = None) -> bool:
+        if fmt:
+            return fmt != 'json'
+        return os.path.splitext(filename)[1].lower() in EXTENSIONS.values()
+    
+    def _product_rows(self) -> List[Dict[str, Any]]:
+        """Produits du dernier frigo chargé, en lignes de table"""
+        return product_rows(normalize_items(self._fridge_data or {}), ts=datetime.now().replace(microsecond=0))
 
 
 # ==================== EXEMPLES D'UTILISATION ====================
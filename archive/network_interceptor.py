@@ -6,18 +6,51 @@ from playwright.sync_api import sync_playwright
 import json
 from datetime import datetime
 import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+
+from capture_store import CaptureStore
+
+API_KEYWORDS = ['api', 'product', 'menu', 'cart', 'order', 'canteen']
+
+# Types de ressources dont on ne garde pas le corps
+SKIPPED_BODY_TYPES = ('image', 'font', 'media')
+
+# URLs distinctes listées au plus dans le rapport (mode streaming)
+MAX_REPORT_URLS = 500
 
 
 class NetworkInterceptor:
     """Intercepte et analyse le trafic réseau de Foodles"""
     
-    def __init__(self):
+    def __init__(self, capture_dir: str = None):
+        """
+        Initialise l'intercepteur
+        
+        Args:
+            capture_dir: Si fourni, chaque requête/réponse est écrite au fil
+                de l'eau dans un CaptureStore (corps complets, mémoire constante)
+                au lieu d'être accumulée dans des listes
+        """
         self.requests = []
         self.responses = []
         self.api_calls = []
         
+        self.store = CaptureStore(capture_dir) if capture_dir else None
+        self._pending = {}
+        self.counts = {'requests': 0, 'responses': 0, 'api_calls': 0}
+        self.methods = set()
+        
+    def _is_api_url(self, url: str) -> bool:
+        return any(keyword in url.lower() for keyword in API_KEYWORDS)
+    
     def on_request(self, request):
         """Callback appelé pour chaque requête"""
+        if self.store:
+            self._stream_request(request)
+            return
+        
         req_data = {
             'timestamp': datetime.now().isoformat(),
             'url': request.url,
@@ -27,7 +60,7 @@ class NetworkInterceptor:
         }
         
         # Filtrer les requêtes intéressantes (API, données)
-        if any(keyword in request.url.lower() for keyword in ['api', 'product', 'menu', 'cart', 'order', 'canteen']):
+        if self._is_api_url(request.url):
             print(f"📡 {request.method} {request.url}")
             self.api_calls.append(req_data)
         
@@ -35,9 +68,13 @@ class NetworkInterceptor:
     
     def on_response(self, response):
         """Callback appelé pour chaque réponse"""
+        if self.store:
+            self._stream_response(response)
+            return
+        
         try:
             # Ne capturer que les réponses intéressantes
-            if response.status == 200 and any(keyword in response.url.lower() for keyword in ['api', 'product', 'menu', 'cart', 'order', 'canteen']):
+            if response.status == 200 and self._is_api_url(response.url):
                 resp_data = {
                     'timestamp': datetime.now().isoformat(),
                     'url': response.url,
@@ -64,6 +101,61 @@ class NetworkInterceptor:
         except Exception as e:
             print(f"❌ Erreur réponse: {e}")
     
+    def _stream_request(self, request):
+        """Écrit une requête dans le CaptureStore"""
+        self.counts['requests'] += 1
+        if self._is_api_url(request.url):
+            print(f"📡 {request.method} {request.url}")
+            self.counts['api_calls'] += 1
+            self.methods.add(request.method)
+        
+        post_data = request.post_data_buffer
+        self._pending[id(request)] = self.store.append(
+            'request',
+            request.url,
+            method=request.method,
+            headers=dict(request.headers),
+            body=post_data,
+            extra={'resource_type': request.resource_type}
+        )
+    
+    def _stream_response(self, response):
+        """Écrit une réponse complète (corps non tronqué) dans le CaptureStore"""
+        self.counts['responses'] += 1
+        request = response.request
+        
+        body = None
+        extra = {}
+        if request.resource_type not in SKIPPED_BODY_TYPES and not 300 <= response.status < 400:
+            try:
+                body = response.body()
+            except Exception as e:
+                extra['body_error'] = str(e)
+        
+        self.store.append(
+            'response',
+            response.url,
+            method=request.method,
+            status=response.status,
+            headers=dict(response.headers),
+            body=body,
+            extra=extra,
+            request_seq=self._pending.pop(id(request), None)
+        )
+        if body is not None and self._is_api_url(response.url):
+            print(f"✅ {response.status} {response.url} - {len(body)} octets capturés")
+    
+    def on_request_failed(self, request):
+        """Callback appelé quand une requête échoue (mode streaming)"""
+        if self.store:
+            self.store.append(
+                'response',
+                request.url,
+                method=request.method,
+                extra={'failure': request.failure},
+                request_seq=self._pending.pop(id(request), None)
+            )
+    
     def capture_foodles_traffic(self, email: str = None, password: str = None):
         """
         Capture le trafic réseau de Foodles
@@ -89,6 +181,7 @@ class NetworkInterceptor:
             # Activer les listeners réseau
             page.on('request', self.on_request)
             page.on('response', self.on_response)
+            page.on('requestfailed', self.on_request_failed)
             
             try:
                 # Aller sur Foodles
@@ -163,12 +256,22 @@ class NetworkInterceptor:
             finally:
                 print("\n🔒 Fermeture du navigateur...")
                 browser.close()
+                if self.store:
+                    self.store.close()
         
         print("\n✅ Capture terminée!")
         return self.get_summary()
     
     def get_summary(self):
         """Retourne un résumé de la capture"""
+        if self.store:
+            return {
+                'total_requests': self.counts['requests'],
+                'total_responses': self.counts['responses'],
+                'api_calls': self.counts['api_calls'],
+                'timestamp': datetime.now().isoformat()
+            }
+        
         return {
             'total_requests': len(self.requests),
             'total_responses': len(self.responses),
@@ -176,12 +279,50 @@ class NetworkInterceptor:
             'timestamp': datetime.now().isoformat()
         }
     
+    def _store_urls(self, kind: str, api_only: bool = False):
+        """
+        URLs distinctes relues dans l'index du CaptureStore (pas gardées en mémoire
+        pendant la capture), limitées à MAX_REPORT_URLS
+        
+        Returns:
+            Tuple (URLs triées, True si la liste a été tronquée)
+        """
+        urls = set()
+        for meta in self.store.iter_index(kind=kind):
+            url = meta['url']
+            if (api_only and not self._is_api_url(url)) or url in urls:
+                continue
+            if len(urls) >= MAX_REPORT_URLS:
+                return sorted(urls), True
+            urls.add(url)
+        return sorted(urls), False
+    
     def save_results(self, output_dir: str = 'network_capture'):
         """Sauvegarde tous les résultats capturés"""
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+        if self.store:
+            # Tout est déjà sur disque: on n'écrit que le rapport
+            endpoints, endpoints_truncated = self._store_urls('request', api_only=True)
+            response_urls, response_urls_truncated = self._store_urls('response')
+            report = {
+                'summary': self.get_summary(),
+                'capture_dir': self.store.root,
+                'store': self.store.summary(),
+                'unique_endpoints': endpoints,
+                'unique_endpoints_truncated': endpoints_truncated,
+                'methods_used': sorted(self.methods),
+                'response_urls': response_urls,
+                'response_urls_truncated': response_urls_truncated
+            }
+            report_file = f"{output_dir}/report_{timestamp}.json"
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"📄 Rapport sauvegardé: {report_file}")
+            return report
+        
         # Sauvegarder toutes les requêtes
         requests_file = f"{output_dir}/requests_{timestamp}.json"
         with open(requests_file, 'w', encoding='utf-8') as f:
@@ -216,6 +357,41 @@ class NetworkInterceptor:
         return report
 
 
+def replay_capture(capture_dir: str, url_contains: str = None):
+    """
+    Rejoue une capture hors-ligne dans les parsers
+    
+    Les réponses JSON passent dans FridgeParser, les réponses RSC
+    (texte "id:..." de app.foodles.co) dans RSCParser.
+    
+    Args:
+        capture_dir: Dossier du CaptureStore
+        url_contains: Filtre sur l'URL
+        
+    Returns:
+        Liste des produits extraits
+    """
+    from parse_fridge import FridgeParser
+    from rsc_parser import RSCParser
+    
+    store = CaptureStore(capture_dir)
+    products = []
+    
+    for meta, body in store.replay(url_contains=url_contains):
+        if isinstance(body, (dict, list)):
+            found = FridgeParser(body).get_products()
+        elif isinstance(body, str) and body[:1].isalnum() and ':' in body[:10]:
+            found = RSCParser(body).extract_products()
+        else:
+            continue
+        
+        if found:
+            print(f"🔁 {meta['url']}: {len(found)} produits")
+            products.extend(found)
+    
+    return products
+
+
 def main():
     """Fonction principale"""
     print("╔════════════════════════════════════════════════════════════════╗")
@@ -236,8 +412,9 @@ def main():
     
     input("▶️  Appuyez sur Entrée pour démarrer...")
     
-    # Créer l'intercepteur
-    interceptor = NetworkInterceptor()
+    # Créer l'intercepteur (écriture en flux dans network_capture/<timestamp>/)
+    capture_dir = f"network_capture/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    interceptor = NetworkInterceptor(capture_dir=capture_dir)
     
     # Note: Vous pouvez fournir email/password ici si vous voulez automatiser
     # interceptor.capture_foodles_traffic(email='votre@email.com', password='votrepass')
@@ -261,6 +438,7 @@ def main():
     print("✅ CAPTURE TERMINÉE!")
     print("=" * 80)
     print(f"\n📁 Fichiers générés dans: network_capture/")
+    print(f"🔁 Rejouer hors-ligne: replay_capture('{capture_dir}')")
     print(f"\n🎯 Endpoints API uniques trouvés: {len(report['unique_endpoints'])}")
     if report['unique_endpoints']:
         print("\nEndpoints capturés:")
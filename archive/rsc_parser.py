@@ -12,6 +12,19 @@ class RSCParser:
     def __init__(self, rsc_content: str):
         self.content = rsc_content
         self.lines = rsc_content.split('\n')
+        self._parsed = None
+    
+    def query(self) -> 'RSCQuery':
+        """
+        Prépare une extraction multiple en une seule passe
+        
+        Exemple:
+            results = parser.query().products().keyword('salade').key('price').run()
+        
+        Returns:
+            Requête à compléter puis exécuter avec run()
+        """
+        return RSCQuery(self)
     
     def parse(self) -> Dict[str, Any]:
         """
@@ -20,6 +33,9 @@ class RSCParser:
         Returns:
             Dictionnaire avec les données parsées
         """
+        if self._parsed is not None:
+            return self._parsed
+        
         result = {
             'fragments': [],
             'modules': [],
@@ -44,6 +60,7 @@ class RSCParser:
                 elif parsed_line.get('type') == 'data':
                     result['data'].append(parsed_line)
         
+        self._parsed = result
         return result
     
     def _parse_line(self, line: str) -> Optional[Dict[str, Any]]:
@@ -271,12 +288,171 @@ class RSCParser:
         return structures
 
 
-def parse_rsc_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
+class RSCQuery:
+    """
+    Plusieurs extractions (clés, mots-clés, produits...) exécutées en une
+    seule passe sur les lignes RSC: chaque ligne est découpée et décodée une
+    fois, et les objets décodés sont partagés entre tous les extracteurs.
+    La même passe remplit le résultat de parser.parse() (get_summary() ne
+    relit plus le contenu).
+    """
+    
+    # Clés reconnues comme éléments de menu (même logique que extract_menu_items:
+    # un élément par ligne, première valeur de chaque clé)
+    MENU_KEYS = ('title', 'description', 'category')
+    
+    # Objets JSON imbriqués (fallback quand une ligne n'est pas du JSON valide)
+    OBJECT_PATTERN = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}')
+    
+    def __init__(self, parser: RSCParser):
+        self.parser = parser
+        self._keys: Dict[str, str] = {}
+        self._keywords: Dict[str, str] = {}
+        self._products = None
+        self._menu_items = None
+        self._json_objects = None
+    
+    def key(self, key: str, name: str = None) -> 'RSCQuery':
+        """Toutes les valeurs associées à une clé (résultat: name ou 'key:<clé>')"""
+        self._keys[name or f"key:{key}"] = key
+        return self
+    
+    def keyword(self, keyword: str, name: str = None) -> 'RSCQuery':
+        """Lignes contenant un mot-clé, insensible à la casse (résultat: name ou 'keyword:<mot>')"""
+        self._keywords[name or f"keyword:{keyword}"] = keyword.lower()
+        return self
+    
+    def products(self, name: str = 'products') -> 'RSCQuery':
+        """Objets ayant un nom et un prix"""
+        self._products = name
+        return self
+    
+    def menu_items(self, name: str = 'menu_items') -> 'RSCQuery':
+        """Objets avec titre/description/catégorie"""
+        self._menu_items = name
+        return self
+    
+    def json_objects(self, name: str = 'all_json_objects') -> 'RSCQuery':
+        """Objets JSON de premier niveau (pas leurs sous-objets)"""
+        self._json_objects = name
+        return self
+    
+    def _needs_objects(self) -> bool:
+        return bool(self._keys or self._products or self._menu_items or self._json_objects)
+    
+    def _line_objects(self, line: str, parsed_line: Optional[Dict[str, Any]]) -> List[Any]:
+        """
+        Valeurs JSON d'une ligne, décodées une seule fois
+        
+        Réutilise le décodage de _parse_line (lignes data et module), sinon
+        décode la ligne ou, à défaut, les objets repérés par expression régulière.
+        """
+        if parsed_line:
+            content = parsed_line.get('content')
+            if parsed_line.get('type') == 'data' and not isinstance(content, str):
+                return [content]
+            if parsed_line.get('type') == 'module' and content != [parsed_line['raw']]:
+                return [content]
+        
+        colon = line.find(':')
+        payload = line[colon + 1:] if colon != -1 else line
+        if payload[:1] in ('I', 'E', 'D', 'W'):
+            payload = payload[1:]
+        if payload[:1] in ('[', '{'):
+            try:
+                return [json.loads(payload)]
+            except ValueError:
+                pass
+        
+        objects = []
+        for match in self.OBJECT_PATTERN.finditer(line):
+            try:
+                objects.append(json.loads(match.group()))
+            except ValueError:
+                continue
+        return objects
+    
+    def _visit(self, obj: Dict[str, Any], top_level: bool, menu_item: Dict[str, str],
+               results: Dict[str, List[Any]]):
+        """Soumet un objet décodé à tous les extracteurs"""
+        if self._json_objects and top_level:
+            results[self._json_objects].append(obj)
+        if self._products and 'name' in obj and 'price' in obj:
+            results[self._products].append(obj)
+        if self._menu_items:
+            for k in self.MENU_KEYS:
+                if k not in menu_item and isinstance(obj.get(k), str):
+                    menu_item[k] = obj[k]
+        for name, key in self._keys.items():
+            if key in obj:
+                results[name].append(obj[key])
+    
+    def run(self) -> Dict[str, List[Any]]:
+        """
+        Exécute toutes les extractions en une passe
+        
+        Returns:
+            Dict nom d'extracteur -> liste des résultats
+        """
+        results: Dict[str, List[Any]] = {name: [] for name in (*self._keys, *self._keywords)}
+        for name in (self._products, self._menu_items, self._json_objects):
+            if name:
+                results[name] = []
+        needs_objects = self._needs_objects()
+        parsed = None
+        if self.parser._parsed is None:
+            parsed = {'fragments': [], 'modules': [], 'data': [], 'raw_lines': []}
+        
+        for line in self.parser.lines:
+            if not line.strip():
+                continue
+            
+            parsed_line = self.parser._parse_line(line) if parsed is not None else None
+            if parsed_line:
+                parsed['raw_lines'].append(parsed_line)
+                line_type = parsed_line.get('type')
+                if line_type == 'fragment':
+                    parsed['fragments'].append(parsed_line)
+                elif line_type == 'module':
+                    parsed['modules'].append(parsed_line)
+                elif line_type == 'data':
+                    parsed['data'].append(parsed_line)
+            
+            if self._keywords:
+                line_lower = line.lower()
+                for name, keyword in self._keywords.items():
+                    if keyword in line_lower:
+                        results[name].append(line[:200] + '...' if len(line) > 200 else line)
+            
+            if not needs_objects or '{' not in line:
+                continue
+            
+            # Parcours de tous les dicts imbriqués de la ligne, dans l'ordre du
+            # document; top_level: pas contenu dans un autre objet
+            menu_item: Dict[str, str] = {}
+            stack = [(value, True) for value in reversed(self._line_objects(line, parsed_line))]
+            while stack:
+                value, top_level = stack.pop()
+                if isinstance(value, dict):
+                    self._visit(value, top_level, menu_item, results)
+                    stack.extend((child, False) for child in reversed(list(value.values())))
+                elif isinstance(value, list):
+                    stack.extend((child, top_level) for child in reversed(value))
+            if menu_item:
+                results[self._menu_items].append({k: menu_item[k] for k in self.MENU_KEYS if k in menu_item})
+        
+        if parsed is not None:
+            self.parser._parsed = parsed
+        return results
+
+
+def parse_rsc_response(response_data: Dict[str, Any], keywords: List[str] = None) -> Dict[str, Any]:
     """
     Fonction utilitaire pour parser une réponse API Foodles
     
     Args:
         response_data: Données de réponse de l'API
+        keywords: Mots-clés à compter pendant la même passe (optionnel)
         
     Returns:
         Données parsées et structurées
@@ -285,11 +461,19 @@ def parse_rsc_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
         return response_data
     
     parser = RSCParser(response_data['raw_content'])
+    query = parser.query().products().menu_items().json_objects()
+    for keyword in keywords or []:
+        query.keyword(keyword, name=keyword)
+    # Une passe: get_summary() et parse() reprennent le résultat de run()
+    results = query.run()
     
-    return {
+    parsed = {
         'summary': parser.get_summary(),
         'parsed_data': parser.parse(),
-        'products': parser.extract_products(),
-        'menu_items': parser.extract_menu_items(),
-        'all_json_objects': parser.extract_all_json_objects()
+        'products': results['products'],
+        'menu_items': results['menu_items'],
+        'all_json_objects': results['all_json_objects']
     }
+    if keywords:
+        parsed['keywords'] = {keyword: results[keyword] for keyword in keywords}
+    return parsed
@@ -6,7 +6,12 @@ from rsc_parser import RSCParser, parse_rsc_response
 from dotenv import load_dotenv
 import json
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+
+from snapshot_store import SnapshotStore
 
 
 class ResponseSaver:
@@ -15,6 +20,7 @@ class ResponseSaver:
     def __init__(self, output_dir: str = "api_responses"):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        self.snapshots = SnapshotStore(os.path.join(output_dir, 'store'))
     
     def save_response(self, endpoint_name: str, response_data: dict, parsed_data: dict = None):
         """
@@ -28,18 +34,22 @@ class ResponseSaver:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{endpoint_name}_{timestamp}"
         
-        # Sauvegarder le contenu brut
+        # Contenu brut et réponse complète: stockage dédupliqué par contenu
+        meta = {'endpoint': endpoint_name}
         if 'raw_content' in response_data:
-            raw_file = os.path.join(self.output_dir, f"{filename}_raw.txt")
-            with open(raw_file, 'w', encoding='utf-8') as f:
-                f.write(response_data['raw_content'])
-            print(f"📄 Contenu brut sauvegardé: {raw_file}")
+            raw = self.snapshots.put(endpoint_name, response_data['raw_content'], source='rsc')
+            meta['raw_blob'] = raw['blob']
+            state = "sauvegardé" if raw['new_blob'] else "inchangé (déjà stocké)"
+            print(f"📄 Contenu brut {state}: {raw['blob'][:12]}")
         
-        # Sauvegarder la réponse complète
-        response_file = os.path.join(self.output_dir, f"{filename}_response.json")
-        with open(response_file, 'w', encoding='utf-8') as f:
-            json.dump(response_data, f, indent=2, ensure_ascii=False)
-        print(f"📦 Réponse complète sauvegardée: {response_file}")
+        response = self.snapshots.put(
+            endpoint_name,
+            {k: v for k, v in response_data.items() if k != 'raw_content'},
+            source='response',
+            meta=meta
+        )
+        state = "sauvegardée" if response['new_blob'] else "inchangée (déjà stockée)"
+        print(f"📦 Réponse complète {state}: {response['blob'][:12]}")
         
         # Sauvegarder l'analyse parsée
         if parsed_data:
@@ -63,7 +73,13 @@ class ResponseSaver:
         # Parser si c'est du RSC
         parsed_data = None
         if 'raw_content' in response_data:
-            parsed_data = parse_rsc_response(response_data)
+            # Mots-clés comptés pendant la même passe que l'extraction
+            keywords = [
+                'product', 'price', 'name', 'title', 'description',
+                'category', 'available', 'stock', 'menu', 'order',
+                'cart', 'user', 'canteen', 'delivery', 'meal'
+            ]
+            parsed_data = parse_rsc_response(response_data, keywords=keywords)
             
             # Afficher les statistiques
             summary = parsed_data['summary']
@@ -74,18 +90,9 @@ class ResponseSaver:
             print(f"   - Entrées de données: {summary['data_entries']}")
             print(f"   - Objets JSON: {len(parsed_data['all_json_objects'])}")
             
-            # Recherche de contenu intéressant
-            parser = RSCParser(response_data['raw_content'])
-            keywords = [
-                'product', 'price', 'name', 'title', 'description',
-                'category', 'available', 'stock', 'menu', 'order',
-                'cart', 'user', 'canteen', 'delivery', 'meal'
-            ]
-            
             print(f"\n🔍 Recherche de mots-clés:")
             found_keywords = {}
-            for keyword in keywords:
-                results = parser.search_in_content(keyword)
+            for keyword, results in parsed_data.pop('keywords').items():
                 if results:
                     found_keywords[keyword] = len(results)
                     print(f"   - '{keyword}': {len(results)} occurrences")
@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 """
-Capture des 3 cantines en changeant la cantine active puis en récupérant le frigo
+Capture des cantines du registre en changeant la cantine active puis en récupérant le frigo
 """
 
-import requests
 import json
+import os
+import requests
 from datetime import datetime
 import time
+from lib.canteen_registry import CanteenRegistry
+from lib.snapshot_store import SnapshotStore
+from lib.snapshot_writer import SnapshotWriter
+from lib.write_behind import WriteBehindQueue
 
 # Nouveaux credentials valides
 sessionid = '0e7doeqn3nqkxn1zb722c4blty5vayg5'
@@ -20,63 +25,86 @@ headers = {
     'Content-Type': 'application/json'
 }
 
-cantines = {
-    'Copernic': 2051,
-    'Amazone': 2052,
-    'Hangar': 2053
-}
+cantines = {c['short_name']: c['id'] for c in CanteenRegistry()}
+
+print(f"🔄 Capture des données des {len(cantines)} cantines...\n")
+
+# Historique dédupliqué des captures (lu par les rapports, prévisions, SQLite...)
+snapshots = SnapshotStore(os.path.join('cantines_data', 'store'))
+
+# Fichiers écrits de façon atomique, par lots (vidés au plus tard à la fin)
+writer = SnapshotWriter()
 
-print("🔄 Capture des données des 3 cantines...\n")
 
-for nom, cantine_id in cantines.items():
-    try:
-        print(f"📡 {nom} (ID: {cantine_id})...")
-        
-        # Étape 1: Changer de cantine active
-        print(f"   🔄 Changement de cantine...")
-        change_response = requests.patch(
-            'https://api.foodles.co/api/client/',
-            headers=headers,
-            json={'canteen': cantine_id},
-            timeout=10
-        )
-        
-        if change_response.status_code == 200:
-            print(f"   ✅ Cantine changée")
-        else:
-            print(f"   ⚠️  Changement: statut {change_response.status_code}")
-        
-        # Petite pause pour que le serveur prenne en compte
-        time.sleep(1)
-        
-        # Étape 2: Récupérer le frigo
-        print(f"   📦 Récupération du frigo...")
-        fridge_response = requests.get(
-            'https://api.foodles.co/api/fridge/',
-            headers=headers,
-            timeout=10
-        )
-        
-        if fridge_response.status_code == 200:
-            data = fridge_response.json()
+def enregistrer(item):
+    """Décodage, stockage, écriture et analyse d'une réponse (thread d'arrière-plan)"""
+    nom, cantine_id, raw = item
+    data = json.loads(raw)
+    
+    # Réponse brute dans le stockage dédupliqué (une écriture par contenu distinct)
+    record = snapshots.put(cantine_id, raw)
+    
+    date_str = datetime.now().strftime('%Y%m%d')
+    filename = f'cantines_data/cantine_{nom}_{date_str}.json'
+    
+    # Réponse brute: écrite telle quelle, sans ré-encodage
+    if record['changed'] or not os.path.exists(filename):
+        writer.write(filename, raw)
+    
+    # Analyser
+    categories = data.get('categories', [])
+    nb_produits = sum(len(cat.get('products', [])) for cat in categories)
+    nb_unites = sum(p.get('quantity', 0) for cat in categories for p in cat.get('products', []))
+    
+    print(f"   ✅ {nom}: {nb_produits} produits, {nb_unites} unités → {filename}")
+
+
+# La cantine suivante est demandée pendant l'enregistrement de la précédente;
+# submit() attend si l'écriture prend trop de retard (file bornée)
+file_ecriture = WriteBehindQueue(enregistrer, maxsize=8, name='captures')
+
+try:
+    for nom, cantine_id in cantines.items():
+        try:
+            print(f"📡 {nom} (ID: {cantine_id})...")
             
-            # Sauvegarder
-            date_str = datetime.now().strftime('%Y%m%d')
-            filename = f'cantines_data/cantine_{nom}_{date_str}.json'
+            # Étape 1: Changer de cantine active
+            print(f"   🔄 Changement de cantine...")
+            change_response = requests.patch(
+                'https://api.foodles.co/api/client/',
+                headers=headers,
+                json={'canteen': cantine_id},
+                timeout=10
+            )
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if change_response.status_code == 200:
+                print(f"   ✅ Cantine changée")
+            else:
+                print(f"   ⚠️  Changement: statut {change_response.status_code}")
             
-            # Analyser
-            categories = data.get('categories', [])
-            nb_produits = sum(len(cat.get('products', [])) for cat in categories)
-            nb_unites = sum(p.get('quantity', 0) for cat in categories for p in cat.get('products', []))
+            # Petite pause pour que le serveur prenne en compte
+            time.sleep(1)
             
-            print(f"   ✅ {nb_produits} produits, {nb_unites} unités → {filename}\n")
-        else:
-            print(f"   ❌ Erreur frigo: {fridge_response.status_code}\n")
-        
-    except Exception as e:
-        print(f"   ❌ Erreur: {e}\n")
-
+            # Étape 2: Récupérer le frigo
+            print(f"   📦 Récupération du frigo...")
+            fridge_response = requests.get(
+                'https://api.foodles.co/api/fridge/',
+                headers=headers,
+                timeout=10
+            )
+            
+            if fridge_response.status_code == 200:
+                file_ecriture.submit((nom, cantine_id, fridge_response.content))
+                print(f"   📥 Reçu, enregistrement en arrière-plan\n")
+            else:
+                print(f"   ❌ Erreur frigo: {fridge_response.status_code}\n")
+            
+        except Exception as e:
+            print(f"   ❌ Erreur: {e}\n")
+finally:
+    # Ctrl-C compris: les captures reçues sont enregistrées avant de quitter
+    file_ecriture.close()
+    writer.close()
+print(f"⏱️  Enregistrement: {file_ecriture.stats['busy_seconds']:.2f}s en arrière-plan, "
+      f"{file_ecriture.stats['blocked_seconds']:.2f}s d'attente côté réseau")
 print("✅ Capture terminée!")
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
-"""Capture rapide des 3 cantines"""
+"""Capture rapide des cantines du registre"""
 
 import os
-import json
 from datetime import datetime
+from lib.canteen_registry import CanteenRegistry
 from lib.foodles_real_api import FoodlesRealAPI
+from lib.snapshot_writer import SnapshotWriter
 
 # Utiliser les credentials du .env
 sessionid = '0e7doeqn3nqkxn1zb722c4blty5vayg5'
@@ -12,13 +13,12 @@ csrftoken = 'w23gonol4yxqMKsfRr7XcHMl7lEaXsdy'
 
 api = FoodlesRealAPI(session_id=sessionid, csrf_token=csrftoken)
 
-cantines = {
-    'Copernic': 2051,
-    'Amazone': 2052,
-    'Hangar': 2053
-}
+cantines = {c['short_name']: c['id'] for c in CanteenRegistry()}
 
-print("🔄 Capture des données des 3 cantines...\n")
+print(f"🔄 Capture des données des {len(cantines)} cantines...\n")
+
+# Fichiers écrits de façon atomique, par lots (vidés au plus tard à la fin)
+writer = SnapshotWriter()
 
 for nom, cantine_id in cantines.items():
     try:
@@ -28,8 +28,7 @@ for nom, cantine_id in cantines.items():
         date_str = datetime.now().strftime('%Y%m%d')
         filename = f'cantines_data/cantine_{nom}_{date_str}.json'
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        writer.write(filename, data)
         
         nb_produits = sum(len(cat.get('items', [])) for cat in data.get('categories', []))
         print(f"   ✅ {nb_produits} produits capturés → {filename}\n")
@@ -37,4 +36,6 @@ for nom, cantine_id in cantines.items():
     except Exception as e:
         print(f"   ❌ Erreur: {e}\n")
 
+writer.close()
+
 print("✅ Capture terminée!")
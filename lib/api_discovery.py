@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Découverte des endpoints cachés dans le JavaScript de app.foodles.co.
+
+Les chunks Next.js (/_next/static/chunks/*.js) portent le hash de leur contenu
+dans leur nom: une fois téléchargés et analysés, ils ne changent plus. Le
+pipeline télécharge en parallèle les seuls chunks inconnus, les analyse avec un
+motif unique (toutes les regex combinées, plus une relecture de chaque
+correspondance pour les chemins imbriqués), met en cache fichiers et résultats,
+puis écrit un inventaire trié des endpoints, comparable d'un déploiement à l'autre.
+
+Structure:
+    chunks/<nom>.js       chunks téléchargés
+    scans/<nom>.json      résultats d'analyse par chunk
+    inventory.json        inventaire courant (endpoint -> types, chunks)
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+import requests
+
+
+DEFAULT_DISCOVERY_DIR = os.path.join('data', 'api_discovery')
+
+APP_URL = "https://app.foodles.co"
+
+# À incrémenter quand les motifs changent (invalide les analyses en cache)
+PATTERNS_VERSION = 2
+
+# (type, motif). Le groupe (?P<v>...) optionnel délimite la valeur à garder.
+DISCOVERY_PATTERNS = [
+    ('api', r'/api/[a-zA-Z0-9/_-]+'),
+    ('graphql', r'graphql["\']?\s*:\s*["\'](?P<v>[^"\']+)'),
+    ('fetch', r'fetch\(["\'](?P<v>[^"\']+)["\']'),
+    ('axios', r'axios\.[a-z]+\(["\'](?P<v>[^"\']+)["\']'),
+    ('route', r'router\.push\(["\'](?P<v>[^"\']+)["\']'),
+    ('action', r'action["\']?\s*:\s*["\'](?P<v>[^"\']+)'),
+    ('mutation', r'mutation["\']?\s*:\s*["\'](?P<v>[^"\']+)'),
+    ('endpoint', r'endpoints?["\']?\s*:\s*["\'](?P<v>[^"\']+)'),
+    ('url', r'url["\']?\s*:\s*["\'](?P<v>[^"\']+)'),
+    ('path', r'/(?:canteen|cart|order|product)/[a-zA-Z0-9/_-]+'),
+]
+
+# Valeurs conservées (même filtre que archive/find_hidden_apis.py)
+KEPT_PREFIXES = ('/api/', '/canteen', '/cart', '/order', '/product')
+
+CHUNK_PATTERN = re.compile(r'/_next/static/chunks/[^"\'\s]+\.js')
+
+
+def build_combined_pattern(patterns: List[Tuple[str, str]] = None) -> re.Pattern:
+    """
+    Combine les motifs en une seule regex à alternatives nommées
+    
+    Chaque motif devient (?P<k<i>>...) et son groupe de valeur (?P<v<i>>...),
+    de sorte qu'un seul parcours du texte suffit pour tous les motifs.
+    """
+    alternatives = []
+    for i, (_, pattern) in enumerate(patterns or DISCOVERY_PATTERNS):
+        alternatives.append(f"(?P<k{i}>{pattern.replace('(?P<v>', f'(?P<v{i}>')})")
+    return re.compile('|'.join(alternatives), re.IGNORECASE)
+
+
+COMBINED_PATTERN = build_combined_pattern()
+
+
+def _scan_span(text: str, pos: int, endpos: int, found: Dict[str, Set[str]]):
+    for match in COMBINED_PATTERN.finditer(text, pos, endpos):
+        group = match.lastgroup
+        index = int(group[1:])
+        kind = DISCOVERY_PATTERNS[index][0]
+        value = match.group(f"v{index}") if f"v{index}" in COMBINED_PATTERN.groupindex else None
+        value = (value or match.group(group)).strip()
+        
+        if value.startswith(KEPT_PREFIXES) or 'foodles' in value.lower():
+            found.setdefault(value, set()).add(kind)
+        
+        # Une alternative consomme le texte qu'elle couvre: on relit la
+        # correspondance pour les motifs imbriqués (/canteen/... dans
+        # /api/canteen/..., /api/... dans fetch("/api/..."))
+        _scan_span(text, match.start() + 1, match.end(), found)
+
+
+def scan_text(text: str) -> Dict[str, Set[str]]:
+    """
+    Analyse un texte (chunk JS ou HTML) en un seul passage
+    
+    Args:
+        text: Contenu à analyser
+    
+    Returns:
+        Dict valeur trouvée -> types de motifs correspondants
+    """
+    found: Dict[str, Set[str]] = {}
+    _scan_span(text, 0, len(text), found)
+    return found
+
+
+def diff_inventories(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Compare deux inventaires d'endpoints
+    
+    Returns:
+        Dict avec 'added' et 'removed' (listes triées)
+    """
+    old_endpoints = set((old or {}).get('endpoints', {}))
+    new_endpoints = set((new or {}).get('endpoints', {}))
+    return {
+        'added': sorted(new_endpoints - old_endpoints),
+        'removed': sorted(old_endpoints - new_endpoints),
+    }
+
+
+class APIDiscovery:
+    """Pipeline de découverte: pages -> chunks -> analyse -> inventaire"""
+    
+    def __init__(self, root: str = DEFAULT_DISCOVERY_DIR, session_id: str = None,
+                 csrf_token: str = None, app_url: str = APP_URL, workers: int = 8):
+        """
+        Initialise le pipeline
+        
+        Args:
+            root: Dossier du cache et de l'inventaire
+            session_id: Cookie sessionid (pages authentifiées)
+            csrf_token: Cookie csrftoken
+            app_url: URL de l'application web
+            workers: Téléchargements simultanés
+        """
+        self.root = root
+        self.app_url = app_url.rstrip('/')
+        self.workers = workers
+        self.chunks_dir = os.path.join(root, 'chunks')
+        self.scans_dir = os.path.join(root, 'scans')
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        os.makedirs(self.scans_dir, exist_ok=True)
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Referer': f"{self.app_url}/",
+        })
+        if session_id:
+            self.session.cookies.set('sessionid', session_id)
+            self.session.cookies.set('isloggedin', '1')
+        if csrf_token:
+            self.session.cookies.set('csrftoken', csrf_token)
+        
+        self.stats = {'downloaded': 0, 'cached': 0, 'scanned': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+    
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    @staticmethod
+    def chunk_name(chunk_path: str) -> str:
+        """Nom de fichier du cache (le nom du chunk contient déjà son hash)"""
+        return chunk_path.split('/_next/static/chunks/', 1)[-1].replace('/', '__')
+    
+    # ==================== TÉLÉCHARGEMENT ====================
+    
+    def fetch_page(self, path: str) -> str:
+        """HTML d'une page de l'application"""
+        response = self.session.get(f"{self.app_url}{path}", timeout=15)
+        response.raise_for_status()
+        return response.text
+    
+    @staticmethod
+    def find_chunks(html: str) -> List[str]:
+        """Chemins des chunks JS référencés par une page (triés, uniques)"""
+        return sorted(set(CHUNK_PATTERN.findall(html)))
+    
+    def load_chunk(self, chunk_path: str) -> Optional[str]:
+        """
+        Contenu d'un chunk, depuis le cache disque ou téléchargé
+        
+        Args:
+            chunk_path: Chemin /_next/static/chunks/...
+        
+        Returns:
+            Code JS (None en cas d'erreur)
+        """
+        path = os.path.join(self.chunks_dir, self.chunk_name(chunk_path))
+        if os.path.exists(path):
+            self._count('cached')
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return f.read()
+        
+        try:
+            response = self.session.get(f"{self.app_url}{chunk_path}", timeout=15)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"   ⚠️  {chunk_path}: {e}")
+            self._count('errors')
+            return None
+        
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        os.replace(tmp_path, path)
+        self._count('downloaded')
+        return response.text
+    
+    # ==================== ANALYSE ====================
+    
+    def scan_chunk(self, chunk_path: str) -> Dict[str, List[str]]:
+        """
+        Résultats d'analyse d'un chunk (mis en cache: le contenu ne change pas)
+        
+        Returns:
+            Dict valeur -> types de motifs
+        """
+        scan_path = os.path.join(self.scans_dir, f"{self.chunk_name(chunk_path)}.json")
+        if os.path.exists(scan_path):
+            with open(scan_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == PATTERNS_VERSION:
+                return cached['found']
+        
+        code = self.load_chunk(chunk_path)
+        if code is None:
+            return {}
+        
+        found = {value: sorted(kinds) for value, kinds in scan_text(code).items()}
+        self._count('scanned')
+        tmp_path = f"{scan_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PATTERNS_VERSION, 'found': found}, f, ensure_ascii=False)
+        os.replace(tmp_path, scan_path)
+        return found
+    
+    def run(self, pages: List[str] = None, html: Dict[str, str] = None) -> Dict[str, Any]:
+        """
+        Exécute le pipeline complet
+        
+        Args:
+            pages: Pages de l'application à explorer (défaut: frigo)
+            html: HTML déjà téléchargé, par page (pas de nouvelle requête)
+        
+        Returns:
+            Inventaire {'generated_at', 'pages', 'chunks', 'endpoints'}
+        """
+        pages = pages or ['/canteen/fridge']
+        endpoints: Dict[str, Dict[str, Set[str]]] = {}
+        
+        def record(found: Dict[str, Any], source: str):
+            for value, kinds in found.items():
+                entry = endpoints.setdefault(value, {'kinds': set(), 'sources': set()})
+                entry['kinds'].update(kinds)
+                entry['sources'].add(source)
+        
+        chunks = set()
+        for page in pages:
+            print(f"📄 {page}...")
+            page_html = (html or {}).get(page)
+            if page_html is None:
+                page_html = self.fetch_page(page)
+            record(scan_text(page_html), page)
+            chunks.update(self.find_chunks(page_html))
+        chunks = sorted(chunks)
+        print(f"   📦 {len(chunks)} chunks JavaScript")
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_path, found in zip(chunks, executor.map(self.scan_chunk, chunks)):
+                record(found, self.chunk_name(chunk_path))
+        
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'pages': sorted(pages),
+            'chunks': [self.chunk_name(c) for c in chunks],
+            'endpoints': {
+                value: {'kinds': sorted(entry['kinds']), 'sources': sorted(entry['sources'])}
+                for value, entry in sorted(endpoints.items())
+            },
+        }
+    
+    # ==================== INVENTAIRE ====================
+    
+    @property
+    def inventory_path(self) -> str:
+        return os.path.join(self.root, 'inventory.json')
+    
+    def load_inventory(self) -> Optional[Dict[str, Any]]:
+        """Dernier inventaire enregistré"""
+        if not os.path.exists(self.inventory_path):
+            return None
+        with open(self.inventory_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def save_inventory(self, inventory: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Enregistre l'inventaire (trié, une clé par ligne) et le compare au précédent
+        
+        Returns:
+            Différences avec l'inventaire précédent
+        """
+        diff = diff_inventories(self.load_inventory(), inventory)
+        tmp_path = f"{self.inventory_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(inventory, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, self.inventory_path)
+        return diff
+
+
+def main():
+    """Découvre les endpoints et affiche les changements depuis le dernier passage"""
+    import argparse
+    import time
+    from dotenv import load_dotenv
+    
+    parser = argparse.ArgumentParser(description="Découverte des APIs cachées dans le JS Foodles")
+    parser.add_argument('--pages', nargs='+', default=['/canteen/fridge'], help="Pages à explorer")
+    parser.add_argument('--dir', default=DEFAULT_DISCOVERY_DIR, help="Dossier du cache et de l'inventaire")
+    parser.add_argument('--workers', type=int, default=8, help="Téléchargements simultanés")
+    args = parser.parse_args()
+    
+    load_dotenv()
+    discovery = APIDiscovery(
+        root=args.dir,
+        session_id=os.getenv('FOODLES_SESSIONID'),
+        csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+        workers=args.workers,
+    )
+    
+    print("🔍 Découverte des APIs cachées\n")
+    start = time.perf_counter()
+    inventory = discovery.run(args.pages)
+    diff = discovery.save_inventory(inventory)
+    elapsed = time.perf_counter() - start
+    
+    stats = discovery.stats
+    print(f"\n⏱️  {elapsed:.1f}s - {stats['downloaded']} téléchargés, {stats['cached']} en cache, "
+          f"{stats['scanned']} analysés, {stats['errors']} erreurs")
+    print(f"📋 {len(inventory['endpoints'])} endpoints -> {discovery.inventory_path}")
+    
+    for endpoint in diff['added']:
+        print(f"   ➕ {endpoint}  {', '.join(inventory['endpoints'][endpoint]['kinds'])}")
+    for endpoint in diff['removed']:
+        print(f"   ➖ {endpoint}")
+    if not diff['added'] and not diff['removed']:
+        print("   ✅ Aucun changement depuis le dernier inventaire")
+
+
+if __name__ == "__main__":
+    main()
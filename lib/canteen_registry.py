@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Registre des cantines: IDs stables, noms courts et adresses, découverts via
+l'API (/api/company/) et conservés dans cantines_data/canteens.json.
+
+Tous les scripts de capture et de rapport parcourent ce registre au lieu de
+leur propre liste. Le nom court ('Copernic') sert aux fichiers
+cantine_<nom>_<date>.json; il ne change plus une fois attribué.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterator, Union
+
+
+DEFAULT_REGISTRY_FILE = os.path.join('cantines_data', 'canteens.json')
+
+# Cantines connues avant toute découverte
+SEED_CANTEENS = [
+    {'id': 2051, 'short_name': 'Copernic', 'name': 'Worldline Copernic',
+     'address': '3 rue Copernic, 41000 Blois', 'company': 'Worldline'},
+    {'id': 2052, 'short_name': 'Amazone', 'name': 'Worldline Amazone',
+     'address': '5 rue Copernic, 41000 Blois', 'company': 'Worldline'},
+    {'id': 2053, 'short_name': 'Hangar', 'name': 'Worldline Hangar',
+     'address': '11 rue Copernic, 41000 Blois', 'company': 'Worldline'},
+]
+
+
+def make_short_name(name: str, canteen_id: int, taken: set) -> str:
+    """
+    Nom court utilisable dans un nom de fichier ('Worldline Copernic' -> 'Copernic')
+    
+    Args:
+        name: Nom complet
+        canteen_id: ID (suffixe en cas de collision)
+        taken: Noms courts déjà attribués
+    
+    Returns:
+        Nom court unique
+    """
+    ascii_name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii')
+    words = re.findall(r'[A-Za-z0-9]+', ascii_name)
+    short_name = words[-1].capitalize() if words else str(canteen_id)
+    if short_name.lower() in {t.lower() for t in taken}:
+        short_name = f"{short_name}{canteen_id}"
+    return short_name
+
+
+def format_address(address: Any) -> str:
+    """Adresse lisible, quel que soit le format renvoyé par l'API"""
+    if isinstance(address, dict):
+        parts = [address.get(k) for k in ('street', 'address', 'line1', 'zip_code', 'postal_code', 'city')]
+        return ', '.join(str(p) for p in parts if p)
+    return address or ''
+
+
+class CanteenRegistry:
+    """Cantines connues, indexées par ID"""
+    
+    def __init__(self, path: str = DEFAULT_REGISTRY_FILE):
+        """
+        Charge le registre (ou l'initialise avec les cantines connues)
+        
+        Args:
+            path: Fichier JSON du registre
+        """
+        self.path = path
+        self.canteens: Dict[int, Dict[str, Any]] = {}
+        self.discovered_at = None
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.discovered_at = data.get('discovered_at')
+                for entry in data.get('canteens', []):
+                    self.canteens[int(entry['id'])] = entry
+            except (OSError, ValueError, KeyError):
+                self.canteens = {}
+        
+        if not self.canteens:
+            for entry in SEED_CANTEENS:
+                self.canteens[entry['id']] = dict(entry)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.canteens[cid] for cid in sorted(self.canteens))
+    
+    def __len__(self) -> int:
+        return len(self.canteens)
+    
+    def ids(self) -> List[int]:
+        return sorted(self.canteens)
+    
+    def short_names(self) -> List[str]:
+        return [entry['short_name'] for entry in self]
+    
+    def get(self, key: Union[int, str]) -> Optional[Dict[str, Any]]:
+        """
+        Cantine par ID, nom court ou nom complet
+        
+        Args:
+            key: 2051, '2051', 'Copernic' ou 'Worldline Copernic'
+        
+        Returns:
+            Entrée du registre (None si inconnue)
+        """
+        if isinstance(key, int) or (isinstance(key, str) and key.isdigit()):
+            return self.canteens.get(int(key))
+        key_lower = str(key).lower()
+        for entry in self.canteens.values():
+            if entry['short_name'].lower() == key_lower or entry.get('name', '').lower() == key_lower:
+                return entry
+        return None
+    
+    def file_keys(self, entry: Dict[str, Any]) -> List[str]:
+        """Clés possibles dans les noms de fichiers cantine_<clé>_<date>.json"""
+        return [entry['short_name'], str(entry['id'])]
+    
+    def add(self, canteen_id: int, name: str, address: str = None,
+            company_id: int = None, company: str = None) -> Dict[str, Any]:
+        """
+        Ajoute ou met à jour une cantine (le nom court existant est conservé)
+        
+        Returns:
+            Entrée du registre
+        """
+        entry = self.canteens.get(canteen_id)
+        if entry is None:
+            taken = {e['short_name'] for e in self.canteens.values()}
+            entry = {'id': canteen_id, 'short_name': make_short_name(name, canteen_id, taken)}
+            self.canteens[canteen_id] = entry
+        
+        entry['name'] = name or entry.get('name') or entry['short_name']
+        if address:
+            entry['address'] = address
+        entry.setdefault('address', '')
+        if company_id is not None:
+            entry['company_id'] = company_id
+        if company:
+            entry['company'] = company
+        return entry
+    
+    # ==================== DÉCOUVERTE ====================
+    
+    @property
+    def companies_cache_file(self) -> str:
+        """Liste des entreprises du jour, à côté du registre"""
+        return os.path.join(os.path.dirname(self.path), 'companies.json')
+    
+    def discover(self, api, page_size: int = 100, workers: int = 8, refresh: bool = False) -> int:
+        """
+        Met à jour le registre depuis l'API (liste des entreprises en cache pour la journée)
+        
+        Args:
+            api: Client FoodlesRealAPI authentifié
+            page_size: Entreprises par page
+            workers: Pages demandées simultanément
+            refresh: Ignorer la liste du jour déjà téléchargée
+        
+        Returns:
+            Nombre de cantines ajoutées
+        """
+        before = len(self.canteens)
+        companies = api.get_all_companies(page_size=page_size, workers=workers,
+                                          cache_file=self.companies_cache_file, refresh=refresh)
+        for company in companies:
+            for canteen in company.get('canteens', []) or company.get('stores', []):
+                if not isinstance(canteen, dict) or 'id' not in canteen:
+                    continue
+                self.add(
+                    int(canteen['id']),
+                    canteen.get('name', ''),
+                    address=format_address(canteen.get('address')),
+                    company_id=company.get('id'),
+                    company=company.get('name'),
+                )
+        self.discovered_at = datetime.now().isoformat(timespec='seconds')
+        return len(self.canteens) - before
+    
+    def save(self):
+        """Écrit le registre (atomique)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'discovered_at': self.discovered_at, 'canteens': list(self)},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    """Affiche le registre, ou le met à jour depuis l'API avec --discover"""
+    import argparse
+    import sys
+    from dotenv import load_dotenv
+    
+    parser = argparse.ArgumentParser(description="Registre des cantines Foodles")
+    parser.add_argument('--discover', action='store_true', help="Découvrir les cantines via l'API")
+    parser.add_argument('--file', default=DEFAULT_REGISTRY_FILE, help="Fichier du registre")
+    parser.add_argument('--refresh', action='store_true', help="Ignorer la liste des entreprises du jour en cache")
+    parser.add_argument('--base-url', help="URL de l'API (ex: serveur mock)")
+    args = parser.parse_args()
+    
+    registry = CanteenRegistry(args.file)
+    
+    if args.discover:
+        sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+        from foodles_real_api import FoodlesRealAPI
+        
+        load_dotenv()
+        api = FoodlesRealAPI(
+            session_id=os.getenv('FOODLES_SESSIONID'),
+            csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+            base_url=args.base_url,
+        )
+        added = registry.discover(api, refresh=args.refresh)
+        registry.save()
+        print(f"✅ {added} cantine(s) ajoutée(s) -> {args.file}")
+    
+    print(f"\n🏢 {len(registry)} cantines")
+    for entry in registry:
+        print(f"   {entry['id']:>6}  {entry['short_name']:<15} {entry.get('name', ''):<35} {entry.get('address', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Stockage en flux des captures réseau (requêtes/réponses), façon HAR.
+Chaque entrée est ajoutée au fil de l'eau dans un journal compressé et
+indexé; les corps de réponse sont stockés une seule fois par hash de contenu.
+La mémoire reste constante quelle que soit la durée de la capture.
+
+Structure d'un dossier de capture:
+    index.jsonl          une ligne de métadonnées par entrée (offset dans le journal)
+    entries.log          entrées complètes (en-têtes...), zlib, préfixées par leur taille
+    bodies/ab/<sha256>.*  corps de réponse, dédupliqués (BlobStore)
+"""
+
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+from snapshot_store import BlobStore
+
+
+class CaptureStore:
+    """Journal de capture append-only avec corps dédupliqués"""
+    
+    INDEX_FILE = 'index.jsonl'
+    LOG_FILE = 'entries.log'
+    BODIES_DIR = 'bodies'
+    
+    # Préfixe de taille de chaque entrée du journal
+    _FRAME = struct.Struct('>I')
+    
+    def __init__(self, root: str):
+        """
+        Ouvre (ou crée) un dossier de capture
+        
+        Args:
+            root: Dossier de la capture
+        """
+        self.root = root
+        self.bodies = BlobStore(os.path.join(root, self.BODIES_DIR))
+        
+        self._lock = threading.Lock()
+        self._index = None
+        self._log = None
+        self._seq = self._count_entries()
+    
+    def _count_entries(self) -> int:
+        """Nombre d'entrées déjà présentes (reprise d'une capture existante)"""
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as f:
+            return sum(1 for _ in f)
+    
+    def _open(self):
+        if self._log is None:
+            self._log = open(os.path.join(self.root, self.LOG_FILE), 'ab')
+            self._index = open(os.path.join(self.root, self.INDEX_FILE), 'a', encoding='utf-8')
+    
+    def close(self):
+        """Ferme les fichiers du journal"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._index.close()
+                self._log = self._index = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    # ==================== ÉCRITURE ====================
+    
+    def put_body(self, body: bytes) -> str:
+        """
+        Stocke un corps de réponse (une seule fois par contenu)
+        
+        Args:
+            body: Contenu brut
+        
+        Returns:
+            Hash SHA-256 du contenu
+        """
+        body_hash, _ = self.bodies.put(body)
+        return body_hash
+    
+    def append(self, kind: str, url: str, method: str = None, status: int = None,
+               headers: Dict[str, str] = None, body: bytes = None,
+               extra: Dict[str, Any] = None, request_seq: int = None) -> int:
+        """
+        Ajoute une entrée au journal
+        
+        Args:
+            kind: 'request' ou 'response'
+            url: URL
+            method: Méthode HTTP
+            status: Code HTTP (réponses)
+            headers: En-têtes
+            body: Corps complet (stocké à part, dédupliqué)
+            extra: Champs supplémentaires (post_data, resource_type, erreur...)
+            request_seq: Numéro de la requête associée (pour une réponse)
+        
+        Returns:
+            Numéro de séquence de l'entrée
+        """
+        body_hash = self.put_body(body) if body is not None else None
+        
+        meta = {
+            'ts': datetime.now().isoformat(),
+            'kind': kind,
+            'method': method,
+            'url': url,
+            'status': status,
+            'body_hash': body_hash,
+            'body_size': len(body) if body is not None else None,
+            'request_seq': request_seq,
+        }
+        full = {**meta, 'headers': headers or {}, **(extra or {})}
+        payload = zlib.compress(json.dumps(full, ensure_ascii=False).encode('utf-8'))
+        
+        with self._lock:
+            self._open()
+            seq = self._seq
+            self._seq += 1
+            
+            offset = self._log.tell()
+            self._log.write(self._FRAME.pack(len(payload)))
+            self._log.write(payload)
+            self._log.flush()
+            
+            meta.update({'seq': seq, 'offset': offset, 'length': len(payload)})
+            self._index.write(json.dumps(meta, ensure_ascii=False) + '\n')
+            self._index.flush()
+        
+        return seq
+    
+    # ==================== RELECTURE ====================
+    
+    def iter_index(self, kind: str = None, url_contains: str = None,
+                   status: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt l'index en flux, avec filtres optionnels
+        
+        Args:
+            kind: 'request' ou 'response'
+            url_contains: Sous-chaîne recherchée dans l'URL
+            status: Code HTTP
+        
+        Yields:
+            Métadonnées de chaque entrée
+        """
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    meta = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée (capture interrompue)
+                    continue
+                if kind and meta['kind'] != kind:
+                    continue
+                if url_contains and url_contains not in meta['url']:
+                    continue
+                if status is not None and meta['status'] != status:
+                    continue
+                yield meta
+    
+    def load_entry(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        """Relit l'entrée complète (en-têtes, post_data...) depuis le journal"""
+        with open(os.path.join(self.root, self.LOG_FILE), 'rb') as f:
+            f.seek(meta['offset'] + self._FRAME.size)
+            return json.loads(zlib.decompress(f.read(meta['length'])))
+    
+    def load_body(self, body_hash: str) -> Optional[bytes]:
+        """Relit un corps de réponse par son hash"""
+        return self.bodies.get(body_hash)
+    
+    def replay(self, url_contains: str = None, status: int = 200) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """
+        Rejoue les réponses capturées, corps décodé (JSON si possible, sinon texte)
+        
+        Args:
+            url_contains: Sous-chaîne recherchée dans l'URL
+            status: Code HTTP (None = tous)
+        
+        Yields:
+            Tuples (métadonnées, corps décodé)
+        """
+        for meta in self.iter_index(kind='response', url_contains=url_contains, status=status):
+            if not meta.get('body_hash'):
+                continue
+            body = self.load_body(meta['body_hash'])
+            if body is None:
+                continue
+            text = body.decode('utf-8', errors='replace')
+            try:
+                yield meta, json.loads(text)
+            except ValueError:
+                yield meta, text
+    
+    def summary(self) -> Dict[str, Any]:
+        """Statistiques de la capture (calculées en flux)"""
+        stats = {'entries': 0, 'requests': 0, 'responses': 0, 'unique_bodies': 0, 'body_bytes': 0}
+        for meta in self.iter_index():
+            stats['entries'] += 1
+            stats[f"{meta['kind']}s"] = stats.get(f"{meta['kind']}s", 0) + 1
+        
+        bodies_dir = os.path.join(self.root, self.BODIES_DIR)
+        for dirpath, _, filenames in os.walk(bodies_dir):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.zst')):
+                    stats['unique_bodies'] += 1
+                    stats['body_bytes'] += os.path.getsize(os.path.join(dirpath, filename))
+        return stats
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Export en colonnes des produits et des agrégats, pour les notebooks.
+
+Parquet ou Arrow IPC avec pyarrow (colonnes typées), CSV sinon. Les tables
+peuvent être partitionnées par cantine et par date, à la manière de Hive:
+    
+    exports/products/canteen_id=2051/date=2026-10-19/part-0.parquet
+
+(les colonnes de partition sont portées par les dossiers, pas par les
+fichiers; pyarrow.dataset et pandas les reconstituent à la lecture).
+"""
+
+import csv
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, List, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from snapshot_aggregates import ProductRecord
+
+FORMATS = ('parquet', 'arrow', 'csv')
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+DEFAULT_EXPORT_DIR = os.path.join('cantines_data', 'exports')
+
+# Schémas: (colonne, type); toutes les colonnes acceptent None
+PRODUCT_COLUMNS = (
+    ('canteen_id', 'int'),
+    ('canteen', 'str'),
+    ('ts', 'timestamp'),
+    ('product', 'str'),
+    ('name', 'str'),
+    ('category', 'str'),
+    ('price_cents', 'int'),
+    ('quantity', 'int'),
+    ('dlc', 'bool'),
+    ('vegetarian', 'bool'),
+    ('nutriscore', 'str'),
+)
+
+AGGREGATE_COLUMNS = (
+    ('canteen_id', 'int'),
+    ('canteen', 'str'),
+    ('ts', 'timestamp'),
+    ('category', 'str'),
+    ('products', 'int'),
+    ('units', 'int'),
+    ('vegetarian', 'int'),
+    ('dlc', 'int'),
+    ('price_min_cents', 'int'),
+    ('price_max_cents', 'int'),
+    ('price_mean_cents', 'float'),
+)
+
+
+def _arrow_type(kind: str):
+    return {
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'bool': pyarrow.bool_(),
+        'str': pyarrow.string(),
+        'timestamp': pyarrow.timestamp('s'),
+    }[kind]
+
+
+def resolve_format(fmt: str = None, path: str = None) -> str:
+    """
+    Format effectif: demandé, sinon d'après l'extension, sinon Parquet;
+    CSV si pyarrow n'est pas installé
+    """
+    if fmt is None and path:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = next((name for name, e in EXTENSIONS.items() if e == ext), None)
+    fmt = fmt or 'parquet'
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(FORMATS)})")
+    if fmt != 'csv' and pyarrow is None:
+        return 'csv'
+    return fmt
+
+
+def product_rows(records: Iterable[ProductRecord], canteen_id: int = None, canteen: str = None,
+                 ts: datetime = None) -> List[Dict[str, Any]]:
+    """Lignes de la table des produits à partir des produits normalisés d'une capture"""
+    return [
+        {
+            'canteen_id': canteen_id,
+            'canteen': canteen,
+            'ts': ts,
+            'product': record.product,
+            'name': record.name,
+            'category': record.category,
+            'price_cents': int(record.price) if record.price is not None else None,
+            'quantity': record.quantity,
+            'dlc': record.dlc,
+            'vegetarian': 'VEGETARIAN' not in record.diets,
+            'nutriscore': record.nutriscore,
+        }
+        for record in records
+    ]
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agrégats par (cantine, capture, catégorie) à partir des lignes de produits"""
+    groups: Dict[Tuple, Dict[str, Any]] = OrderedDict()
+    prices: Dict[Tuple, List[int]] = {}
+    for row in rows:
+        key = (row['canteen_id'], row['canteen'], row['ts'], row['category'])
+        agg = groups.get(key)
+        if agg is None:
+            agg = groups[key] = {
+                'canteen_id': row['canteen_id'], 'canteen': row['canteen'], 'ts': row['ts'],
+                'category': row['category'], 'products': 0, 'units': 0, 'vegetarian': 0, 'dlc': 0,
+            }
+            prices[key] = []
+        agg['products'] += 1
+        agg['units'] += row['quantity'] or 0
+        agg['vegetarian'] += bool(row['vegetarian'])
+        agg['dlc'] += bool(row['dlc'])
+        if row['price_cents']:
+            prices[key].append(row['price_cents'])
+    
+    for key, agg in groups.items():
+        values = prices[key]
+        agg['price_min_cents'] = min(values) if values else None
+        agg['price_max_cents'] = max(values) if values else None
+        agg['price_mean_cents'] = sum(values) / len(values) if values else None
+    return list(groups.values())
+
+
+def _write_file(rows: List[Dict[str, Any]], columns: Sequence[Tuple[str, str]], path: str, fmt: str):
+    """Écrit un fichier (atomique: fichier temporaire puis renommage)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    
+    if fmt == 'csv':
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in columns])
+            for row in rows:
+                writer.writerow([
+                    '' if row.get(name) is None
+                    else row[name].isoformat() if kind == 'timestamp'
+                    else str(row[name]).lower() if kind == 'bool'
+                    else row[name]
+                    for name, kind in columns
+                ])
+    else:
+        table = pyarrow.table({
+            name: pyarrow.array([row.get(name) for row in rows], type=_arrow_type(kind))
+            for name, kind in columns
+        })
+        if fmt == 'parquet':
+            pyarrow.parquet.write_table(table, tmp_path, compression='zstd')
+        else:
+            with pyarrow.OSFile(tmp_path, 'wb') as sink:
+                with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+    
+    os.replace(tmp_path, path)
+
+
+def _partition_value(row: Dict[str, Any], column: str) -> str:
+    if column == 'date':
+        return row['ts'].date().isoformat() if row.get('ts') else 'unknown'
+    value = row.get(column)
+    return 'unknown' if value is None else str(value)
+
+
+def write_table(rows: List[Dict[str, Any]], columns: Sequence[Tuple[str, str]], path: str,
+                fmt: str = None, partition_by: Sequence[str] = (), basename: str = 'part-0') -> List[str]:
+    """
+    Écrit une table, éventuellement partitionnée
+    
+    Args:
+        rows: Lignes (dicts colonne -> valeur)
+        columns: Schéma (PRODUCT_COLUMNS, AGGREGATE_COLUMNS...)
+        path: Fichier, ou dossier racine si partition_by
+        fmt: 'parquet', 'arrow' ou 'csv' (défaut: d'après l'extension, sinon Parquet)
+        partition_by: Colonnes de partition ('canteen_id', 'date'...)
+        basename: Nom des fichiers dans les partitions (sans extension)
+    
+    Returns:
+        Chemins des fichiers écrits
+    """
+    fmt = resolve_format(fmt, None if partition_by else path)
+    ext = EXTENSIONS[fmt]
+    
+    if not partition_by:
+        root, current_ext = os.path.splitext(path)
+        if current_ext.lower() in EXTENSIONS.values() and current_ext.lower() != ext:
+            # Repli CSV: l'extension suit le format réellement écrit
+            path = root + ext
+        _write_file(rows, columns, path, fmt)
+        return [path]
+    
+    partitions: Dict[Tuple[str, ...], List[Dict[str, Any]]] = OrderedDict()
+    for row in rows:
+        partitions.setdefault(tuple(_partition_value(row, c) for c in partition_by), []).append(row)
+    
+    file_columns = [(name, kind) for name, kind in columns if name not in partition_by]
+    written = []
+    for values, part_rows in partitions.items():
+        directory = os.path.join(path, *(f"{c}={v}" for c, v in zip(partition_by, values)))
+        file_path = os.path.join(directory, basename + ext)
+        _write_file(part_rows, file_columns, file_path, fmt)
+        written.append(file_path)
+    return written
+
+
+def export_store(store, out_dir: str = DEFAULT_EXPORT_DIR, registry=None, canteen=None,
+                 since: datetime = None, until: datetime = None, fmt: str = None,
+                 partition: bool = True, workers: int = None) -> Dict[str, int]:
+    """
+    Exporte l'historique du SnapshotStore: produits et agrégats par catégorie
+    
+    Les captures sont décodées en parallèle (SnapshotLoader) et écrites jour
+    par jour: la mémoire ne dépend pas de la longueur de l'historique.
+    Chaque jour exporté remplace le fichier (ou la partition) de ce jour:
+    since et until sont étendus aux jours entiers (minuit), pour qu'un jour
+    partiel n'écrase pas un export complet.
+    
+    Args:
+        store: SnapshotStore
+        out_dir: Dossier de sortie (products/ et aggregates/)
+        registry: CanteenRegistry pour les noms courts (optionnel)
+        canteen, since, until: Filtres de iter_snapshots (jours entiers)
+        fmt: Format ('parquet', 'arrow', 'csv')
+        partition: Partitionner par cantine et date (sinon un fichier par jour)
+        workers: Processus de décodage
+    
+    Returns:
+        Compteurs snapshots, rows, files
+    """
+    from snapshot_loader import SnapshotLoader
+    
+    fmt = resolve_format(fmt)
+    partition_by = ('canteen_id', 'date') if partition else ()
+    midnight = dict(hour=0, minute=0, second=0, microsecond=0)
+    if since is not None:
+        since = since.replace(**midnight)
+    if until is not None and until != until.replace(**midnight):
+        until = until.replace(**midnight) + timedelta(days=1)
+    stats = {'snapshots': 0, 'rows': 0, 'files': 0}
+    names: Dict[str, Optional[str]] = {}
+    day_rows: List[Dict[str, Any]] = []
+    current_day = None
+    
+    def flush():
+        if not day_rows:
+            return
+        for table, columns, rows in (('products', PRODUCT_COLUMNS, day_rows),
+                                     ('aggregates', AGGREGATE_COLUMNS, aggregate_rows(day_rows))):
+            if partition:
+                written = write_table(rows, columns, os.path.join(out_dir, table), fmt, partition_by)
+            else:
+                path = os.path.join(out_dir, table, f"{current_day}{EXTENSIONS[fmt]}")
+                written = write_table(rows, columns, path, fmt)
+            stats['files'] += len(written)
+        stats['rows'] += len(day_rows)
+        day_rows.clear()
+    
+    records = store.iter_snapshots(canteen=canteen, source='fridge', since=since, until=until)
+    for chunk in SnapshotLoader(workers).iter_store(store, records):
+        for _, canteen_key, ts, loaded in chunk:
+            if ts[:10] != current_day:
+                flush()
+                current_day = ts[:10]
+            key = str(canteen_key)
+            if key not in names:
+                entry = registry.get(key) if registry else None
+                names[key] = entry['short_name'] if entry else None
+            canteen_id = int(key) if key.isdigit() else None
+            day_rows.extend(product_rows(loaded, canteen_id, names[key] or key, datetime.fromisoformat(ts)))
+            stats['snapshots'] += 1
+    flush()
+    return stats
+
+
+def main():
+    """Exporte l'historique des captures en Parquet/Arrow/CSV"""
+    import argparse
+    from canteen_registry import CanteenRegistry
+    from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+    
+    parser = argparse.ArgumentParser(description="Export en colonnes de l'historique des captures")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    parser.add_argument('--out', default=DEFAULT_EXPORT_DIR, help="Dossier de sortie")
+    parser.add_argument('--format', choices=FORMATS, help="Format (défaut: parquet, csv sans pyarrow)")
+    parser.add_argument('--jours', type=int, help="Seulement les N derniers jours (entiers)")
+    parser.add_argument('--cantine', help="ID ou nom court de la cantine")
+    parser.add_argument('--no-partition', action='store_true', help="Un fichier par jour au lieu de cantine/date")
+    parser.add_argument('--workers', type=int, help="Processus de décodage")
+    args = parser.parse_args()
+    
+    fmt = resolve_format(args.format)
+    if args.format and fmt != args.format:
+        print(f"⚠️  pyarrow non installé: export en CSV au lieu de {args.format}")
+    
+    registry = CanteenRegistry()
+    canteen = None
+    if args.cantine:
+        entry = registry.get(args.cantine)
+        canteen = entry['id'] if entry else args.cantine
+    since = datetime.now() - timedelta(days=args.jours) if args.jours else None
+    
+    stats = export_store(SnapshotStore(args.store_dir), args.out, registry, canteen=canteen, since=since,
+                         fmt=fmt, partition=not args.no_partition, workers=args.workers)
+    print(f"✅ {stats['snapshots']} captures, {stats['rows']} lignes produits, "
+          f"{stats['files']} fichiers {fmt} dans {args.out}")
+
+
+if __name__ == "__main__":
+    main()
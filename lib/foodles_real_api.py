@@ -4,9 +4,38 @@ Client API Foodles COMPLET basé sur les vraies APIs découvertes.
 Utilise https://api.foodles.co/api/ (pas le format RSC).
 """
 
+import copy
+import json
+import os
 import requests
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator
 from datetime import datetime
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """Limite le débit de requêtes, partagé entre threads (intervalle minimal)"""
+    
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: Requêtes par seconde au maximum
+        """
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Attend le prochain créneau disponible"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 
 class FoodlesRealAPI:
@@ -14,14 +43,22 @@ class FoodlesRealAPI:
     
     BASE_URL = "https://api.foodles.co/api"
     
-    def __init__(self, session_id: str = None, csrf_token: str = None):
+    # Méthodes dédupliquées (sans effet de bord)
+    SINGLE_FLIGHT_METHODS = ('GET', 'HEAD')
+    
+    def __init__(self, session_id: str = None, csrf_token: str = None, base_url: str = None,
+                 rate_limit: float = None):
         """
         Initialise le client API
         
         Args:
             session_id: Cookie sessionid (optionnel si on veut se connecter)
             csrf_token: Cookie csrftoken (optionnel)
+            base_url: URL de l'API (défaut: api.foodles.co, ou serveur mock local)
+            rate_limit: Requêtes par seconde au maximum (défaut: illimité)
         """
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
         self.session = requests.Session()
         
         # Headers par défaut
@@ -33,17 +70,117 @@ class FoodlesRealAPI:
             'Origin': 'https://app.foodles.co',
         })
         
-        # Cookies d'authentification
-        if session_id:
-            self.session.cookies.set('sessionid', session_id, domain='api.foodles.co')
-            self.session.cookies.set('sessionid', session_id, domain='app.foodles.co')
+        # Cookies d'authentification (domaines Foodles, ou hôte du serveur mock)
+        if urlparse(self.base_url).hostname == 'api.foodles.co':
+            cookie_domains = ['api.foodles.co', 'app.foodles.co']
+        else:
+            cookie_domains = ['']
+        
+        for domain in cookie_domains:
+            if session_id:
+                self.session.cookies.set('sessionid', session_id, domain=domain)
+            if csrf_token:
+                self.session.cookies.set('csrftoken', csrf_token, domain=domain)
         
         if csrf_token:
-            self.session.cookies.set('csrftoken', csrf_token, domain='api.foodles.co')
-            self.session.cookies.set('csrftoken', csrf_token, domain='app.foodles.co')
             self.session.headers['X-CSRFToken'] = csrf_token
         
         self.client_id = None
+        
+        # Requêtes en vol, partagées entre appelants concurrents (single-flight)
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Liste complète des entreprises, valable pour la journée: (date, liste)
+        self._companies_cache = None
+        self._companies_lock = threading.Lock()
+    
+    # ==================== REQUÊTES ====================
+    
+    def throttle(self):
+        """Attend le prochain créneau autorisé par la limite de débit"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+    
+    def request(self, method: str, url: str, throttle: bool = True, **kwargs) -> requests.Response:
+        """
+        Requête brute, soumise à la limite de débit du client
+        
+        Args:
+            method: Méthode HTTP
+            url: URL complète, ou chemin relatif à base_url ('/fridge/')
+            throttle: False si l'appelant a déjà appelé throttle()
+            **kwargs: Arguments passés à requests (params, headers, json, timeout, ...)
+        
+        Returns:
+            Réponse requests (non vérifiée)
+        """
+        if url.startswith('/'):
+            url = f"{self.base_url}{url}"
+        if throttle:
+            self.throttle()
+        return self.session.request(method, url, **kwargs)
+    
+    @staticmethod
+    def _request_key(method: str, url: str, params: Optional[Dict[str, Any]]) -> tuple:
+        """Clé de déduplication: méthode, URL et paramètres triés"""
+        items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (method.upper(), url, items)
+    
+    def _request_json(self, method: str, url: str, params: Dict[str, Any] = None,
+                      shared: bool = True, **kwargs) -> Any:
+        """
+        Exécute une requête et retourne le JSON décodé
+        
+        Les requêtes GET identiques lancées en même temps (depuis plusieurs
+        threads) ne partent qu'une fois: le premier appelant fait la requête,
+        les autres attendent et reçoivent une copie du même résultat (ou la
+        même exception).
+        
+        Args:
+            method: Méthode HTTP
+            url: URL complète
+            params: Paramètres de query string
+            shared: False pour les endpoints dont la réponse dépend de l'état
+                de la session (cantine active): jamais partagés
+            **kwargs: Arguments passés à requests (json, timeout, ...)
+        
+        Returns:
+            Réponse JSON décodée
+        """
+        if not shared or method.upper() not in self.SINGLE_FLIGHT_METHODS:
+            response = self.request(method, url, params=params, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        
+        key = self._request_key(method, url, params)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_leader:
+            # Une requête identique est déjà en cours: on partage son résultat
+            # (copie: chaque appelant peut modifier le sien)
+            return copy.deepcopy(future.result())
+        
+        try:
+            response = self.request(method, url, params=params, **kwargs)
+            response.raise_for_status()
+            result = response.json()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # Les autres appelants copient un exemplaire à part: le premier
+            # peut modifier le sien pendant qu'ils le copient
+            future.set_result(copy.deepcopy(result))
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
     
     # ==================== AUTHENTIFICATION ====================
     
@@ -57,12 +194,11 @@ class FoodlesRealAPI:
         Returns:
             Dict avec les infos de connexion (type, etc.)
         """
-        response = self.session.get(
-            f"{self.BASE_URL}/auth/login-type/",
+        return self._request_json(
+            'GET',
+            f"{self.base_url}/auth/login-type/",
             params={'email': email}
         )
-        response.raise_for_status()
-        return response.json()
     
     def login(self, email: str, password: str) -> Dict[str, Any]:
         """
@@ -75,15 +211,14 @@ class FoodlesRealAPI:
         Returns:
             Dict avec les infos utilisateur
         """
-        response = self.session.post(
-            f"{self.BASE_URL}/auth/login/",
+        data = self._request_json(
+            'POST',
+            f"{self.base_url}/auth/login/",
             json={
                 'email': email,
                 'password': password
             }
         )
-        response.raise_for_status()
-        data = response.json()
         
         # Récupérer les cookies
         if 'sessionid' in self.session.cookies:
@@ -100,9 +235,8 @@ class FoodlesRealAPI:
         Returns:
             Dict avec les infos utilisateur
         """
-        response = self.session.get(f"{self.BASE_URL}/async/client/current/")
-        response.raise_for_status()
-        data = response.json()
+        # Dépend de la cantine active (PATCH /client/): pas de partage
+        data = self._request_json('GET', f"{self.base_url}/async/client/current/", shared=False)
         
         # Sauvegarder l'ID client
         if 'id' in data:
@@ -124,12 +258,11 @@ class FoodlesRealAPI:
             user = self.get_current_user()
             self.client_id = user['id']
         
-        response = self.session.patch(
-            f"{self.BASE_URL}/client/v2/{self.client_id}/",
+        return self._request_json(
+            'PATCH',
+            f"{self.base_url}/client/v2/{self.client_id}/",
             json=fields
         )
-        response.raise_for_status()
-        return response.json()
     
     # ==================== PAIEMENTS ====================
     
@@ -140,9 +273,7 @@ class FoodlesRealAPI:
         Returns:
             Liste des cartes
         """
-        response = self.session.get(f"{self.BASE_URL}/payments/meal-voucher-card/")
-        response.raise_for_status()
-        return response.json()
+        return self._request_json('GET', f"{self.base_url}/payments/meal-voucher-card/")
     
     # ==================== ENTREPRISES ====================
     
@@ -157,12 +288,111 @@ class FoodlesRealAPI:
         Returns:
             Dict avec results, count, etc.
         """
-        response = self.session.get(
-            f"{self.BASE_URL}/company/",
+        return self._request_json(
+            'GET',
+            f"{self.base_url}/company/",
             params={'page': page, 'ps': page_size}
         )
-        response.raise_for_status()
-        return response.json()
+    
+    def iter_companies(self, page_size: int = 100, workers: int = 8) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt toutes les entreprises, dans l'ordre des pages
+        
+        La première page donne le total ('count') et la taille réelle des
+        pages (le serveur peut plafonner page_size); les pages suivantes sont
+        demandées en parallèle (au plus 'workers' à la fois) et restituées
+        dans l'ordre dès qu'elles arrivent. Si la dernière page annonce
+        encore une suite ('next'), elle est suivie page par page.
+        
+        Args:
+            page_size: Entreprises par page (demandé)
+            workers: Pages demandées simultanément
+        
+        Yields:
+            Entreprises
+        """
+        first = self.get_companies(page=1, page_size=page_size)
+        results = first.get('results', [])
+        yield from results
+        
+        count = first.get('count') or len(results)
+        collected = len(results)
+        # Taille servie, pas celle demandée (max_page_size côté serveur)
+        served = len(results) if first.get('next') and results else page_size
+        last_page = (count + served - 1) // served
+        data = first
+        
+        if last_page > 1:
+            executor = ThreadPoolExecutor(max_workers=min(workers, last_page - 1))
+            try:
+                pages = executor.map(lambda page: self.get_companies(page=page, page_size=page_size),
+                                     range(2, last_page + 1))
+                for data in pages:
+                    collected += len(data.get('results', []))
+                    yield from data.get('results', [])
+            finally:
+                # Arrêt anticipé du consommateur: les pages pas encore parties sont annulées
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        page = max(last_page, 1)
+        while data.get('next'):
+            page += 1
+            data = self.get_companies(page=page, page_size=page_size)
+            collected += len(data.get('results', []))
+            yield from data.get('results', [])
+        
+        if collected != count:
+            print(f"⚠️  Entreprises: {collected} reçues pour {count} annoncées")
+    
+    def get_all_companies(self, page_size: int = 100, workers: int = 8,
+                          cache_file: str = None, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Liste complète des entreprises, mise en cache pour la journée
+        
+        Args:
+            page_size: Entreprises par page
+            workers: Pages demandées simultanément
+            cache_file: Fichier JSON où conserver la liste du jour (optionnel)
+            refresh: Ignorer le cache
+        
+        Returns:
+            Entreprises, dans l'ordre de l'API
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        # Appels concurrents: une seule récupération, les autres lisent le cache
+        with self._companies_lock:
+            if not refresh:
+                if self._companies_cache and self._companies_cache[0] == today:
+                    if cache_file and not os.path.exists(cache_file):
+                        self._save_companies(cache_file, today, self._companies_cache[1])
+                    return self._companies_cache[1]
+                if cache_file and os.path.exists(cache_file):
+                    try:
+                        with open(cache_file, 'r', encoding='utf-8') as f:
+                            cached = json.load(f)
+                        if cached.get('date') == today and cached.get('base_url') == self.base_url:
+                            self._companies_cache = (today, cached['companies'])
+                            return cached['companies']
+                    except (OSError, ValueError, KeyError):
+                        pass
+            
+            companies = list(self.iter_companies(page_size=page_size, workers=workers))
+            self._companies_cache = (today, companies)
+            
+            if cache_file:
+                self._save_companies(cache_file, today, companies)
+            
+            return companies
+    
+    def _save_companies(self, cache_file: str, today: str, companies: List[Dict[str, Any]]):
+        """Écrit la liste des entreprises du jour (atomique)"""
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        tmp_path = f"{cache_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'date': today, 'base_url': self.base_url, 'companies': companies},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, cache_file)
     
     # ==================== FRIGO ====================
     
@@ -173,9 +403,37 @@ class FoodlesRealAPI:
         Returns:
             Dict avec les infos du frigo
         """
-        response = self.session.get(f"{self.BASE_URL}/fridge/")
-        response.raise_for_status()
-        return response.json()
+        # Frigo de la cantine active (PATCH /client/): pas de partage entre appelants
+        return self._request_json('GET', f"{self.base_url}/fridge/", shared=False)
+    
+    def get_canteen_fridge(self, canteen_id: int) -> Dict[str, Any]:
+        """
+        Récupère le frigo d'une cantine précise
+        
+        Args:
+            canteen_id: ID de la cantine (ex: 2051)
+        
+        Returns:
+            Dict avec les catégories et produits (403 si la cantine
+            n'est pas la cantine active du compte)
+        """
+        return self._request_json('GET', f"{self.base_url}/fridge/canteen/{canteen_id}/")
+    
+    def set_active_canteen(self, canteen_id: int) -> Dict[str, Any]:
+        """
+        Change la cantine active du compte
+        
+        Args:
+            canteen_id: ID de la cantine
+        
+        Returns:
+            Dict avec les infos client mises à jour
+        """
+        return self._request_json(
+            'PATCH',
+            f"{self.base_url}/client/",
+            json={'canteen': canteen_id}
+        )
     
     # ==================== CANTINE / MENU ====================
     
@@ -193,12 +451,11 @@ class FoodlesRealAPI:
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        response = self.session.get(
-            f"{self.BASE_URL}/ondemand/stores/{store_id}/menu/",
+        return self._request_json(
+            'GET',
+            f"{self.base_url}/ondemand/stores/{store_id}/menu/",
             params={'when': date}
         )
-        response.raise_for_status()
-        return response.json()
     
     def get_store_cart(self, store_id: int, date: str = None) -> Dict[str, Any]:
         """
@@ -214,12 +471,11 @@ class FoodlesRealAPI:
         if not date:
             date = datetime.now().strftime('%Y-%m-%d')
         
-        response = self.session.get(
-            f"{self.BASE_URL}/ondemand/stores/{store_id}/cart/",
+        return self._request_json(
+            'GET',
+            f"{self.base_url}/ondemand/stores/{store_id}/cart/",
             params={'when': date}
         )
-        response.raise_for_status()
-        return response.json()
     
     def get_store_opening(self, store_id: int) -> Dict[str, Any]:
         """
@@ -231,11 +487,10 @@ class FoodlesRealAPI:
         Returns:
             Dict avec les horaires
         """
-        response = self.session.get(
-            f"{self.BASE_URL}/ondemand/stores/{store_id}/opening/"
+        return self._request_json(
+            'GET',
+            f"{self.base_url}/ondemand/stores/{store_id}/opening/"
         )
-        response.raise_for_status()
-        return response.json()
     
     # ==================== HELPERS ====================
     
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Préchargement des menus sur plusieurs jours: une fenêtre de jours ouvrés
+(10 par défaut) pour toutes les cantines, demandée en parallèle.
+
+Les menus sont gardés en cache par (cantine, date) dans
+cantines_data/menus.json; les jours passés sont purgés au chargement. Les
+rapports de planification interrogent ce cache ("qu'y a-t-il où cette
+semaine") et ne demandent à l'API que les couples manquants. Un couple en
+échec (cantine fermée, 403...) est aussi noté, et n'est redemandé qu'après
+FAILURE_TTL.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from snapshot_aggregates import iter_items, price_amount
+
+
+DEFAULT_MENU_CACHE = os.path.join('cantines_data', 'menus.json')
+
+# Jours ouvrés préchargés par défaut (deux semaines)
+DEFAULT_WINDOW_DAYS = 10
+
+# Délai avant de redemander un couple (cantine, date) en échec
+FAILURE_TTL = timedelta(minutes=15)
+
+JOURS = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+
+def working_days(start: date = None, count: int = DEFAULT_WINDOW_DAYS) -> List[str]:
+    """
+    Jours ouvrés (lundi-vendredi) à partir de start inclus
+    
+    Args:
+        start: Premier jour (défaut: aujourd'hui)
+        count: Nombre de jours ouvrés
+    
+    Returns:
+        Dates au format YYYY-MM-DD
+    """
+    day = start or date.today()
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def current_week(today: date = None) -> List[str]:
+    """Jours ouvrés restants de la semaine en cours (le week-end: semaine suivante)"""
+    today = today or date.today()
+    monday = today - timedelta(days=today.weekday())
+    if today.weekday() >= 5:
+        monday += timedelta(days=7)
+    start = max(today, monday)
+    return working_days(start, 5 - start.weekday())
+
+
+def cache_key(store_id: int, day: str) -> str:
+    return f"{store_id}|{day}"
+
+
+class MenuPrefetcher:
+    """Menus par (cantine, date), préchargés en parallèle et gardés jusqu'au jour passé"""
+    
+    def __init__(self, api=None, cache_file: str = DEFAULT_MENU_CACHE, workers: int = 8):
+        """
+        Charge le cache (sans les jours passés)
+        
+        Args:
+            api: Client FoodlesRealAPI (None: lecture du cache seulement)
+            cache_file: Fichier JSON du cache
+            workers: Requêtes simultanées
+        """
+        self.api = api
+        self.cache_file = cache_file
+        self.workers = workers
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        # Échecs récents: clé -> {'failed_at', 'error'} (gardés FAILURE_TTL)
+        self.failures: Dict[str, Dict[str, str]] = {}
+        # Compteurs cumulés depuis la création (prefetch() rend ceux de l'appel)
+        self.stats = {'cached': 0, 'fetched': 0, 'errors': 0, 'skipped': 0, 'expired': 0}
+        self._dirty = False
+        
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data.get('menus', {})
+                self.failures = data.get('failures', {})
+            except (OSError, ValueError):
+                # Cache corrompu: on repart de zéro
+                self.entries = {}
+                self.failures = {}
+        self.expire()
+    
+    def expire(self, today: date = None) -> int:
+        """
+        Retire les menus des jours passés
+        
+        Returns:
+            Nombre d'entrées retirées
+        """
+        today = (today or date.today()).isoformat()
+        expired = [key for key, entry in self.entries.items() if entry['date'] < today]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.stats['expired'] += len(expired)
+            self._dirty = True
+        
+        stale = [key for key in self.failures if not self._recent_failure(key)]
+        for key in stale:
+            del self.failures[key]
+        if stale:
+            self._dirty = True
+        return len(expired)
+    
+    def _recent_failure(self, key: str) -> bool:
+        """Échec enregistré il y a moins de FAILURE_TTL"""
+        failure = self.failures.get(key)
+        if not failure:
+            return False
+        try:
+            failed_at = datetime.fromisoformat(failure['failed_at'])
+        except (KeyError, ValueError):
+            return False
+        return datetime.now() - failed_at < FAILURE_TTL
+    
+    def menu(self, store_id: int, day: str) -> Optional[Dict[str, Any]]:
+        """Menu en cache (None s'il n'a pas été préchargé)"""
+        entry = self.entries.get(cache_key(store_id, day))
+        return entry['menu'] if entry else None
+    
+    def _fetch(self, store_id: int, day: str) -> Dict[str, Any]:
+        return self.api.get_store_menu(store_id, day)
+    
+    def prefetch(self, store_ids: Iterable[int], days: List[str] = None,
+                 refresh: bool = False) -> Dict[str, int]:
+        """
+        Précharge les menus manquants de chaque cantine sur la fenêtre
+        
+        Args:
+            store_ids: IDs des cantines
+            days: Dates YYYY-MM-DD (défaut: les 10 prochains jours ouvrés)
+            refresh: Redemander aussi les menus déjà en cache et les échecs récents
+        
+        Returns:
+            Statistiques de cet appel (cached, fetched, errors, skipped, expired)
+        """
+        start = dict(self.stats)
+        self.expire()
+        days = days or working_days()
+        wanted = [(int(store_id), day) for store_id in store_ids for day in days]
+        missing = []
+        for s, d in wanted:
+            key = cache_key(s, d)
+            if refresh:
+                missing.append((s, d))
+            elif key in self.entries:
+                self.stats['cached'] += 1
+            elif self._recent_failure(key):
+                # Échec récent: pas de nouvel essai avant FAILURE_TTL
+                self.stats['skipped'] += 1
+            else:
+                missing.append((s, d))
+        
+        if missing and self.api is None:
+            raise ValueError("Client API requis pour précharger les menus manquants")
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._fetch, s, d): (s, d) for s, d in missing}
+            for future in as_completed(futures):
+                store_id, day = futures[future]
+                key = cache_key(store_id, day)
+                try:
+                    menu = future.result()
+                except Exception as e:
+                    # Une cantine fermée ou refusée n'empêche pas les autres
+                    self.errors[key] = str(e)
+                    self.failures[key] = {
+                        'failed_at': datetime.now().isoformat(timespec='seconds'),
+                        'error': str(e)[:200],
+                    }
+                    self.stats['errors'] += 1
+                    self._dirty = True
+                    continue
+                self.entries[key] = {
+                    'store': store_id,
+                    'date': day,
+                    'fetched_at': datetime.now().isoformat(timespec='seconds'),
+                    'menu': menu,
+                }
+                self.errors.pop(key, None)
+                self.failures.pop(key, None)
+                self.stats['fetched'] += 1
+                self._dirty = True
+        
+        return {name: value - start[name] for name, value in self.stats.items()}
+    
+    def overview(self, store_ids: Iterable[int] = None,
+                 days: List[str] = None) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        """
+        Qu'y a-t-il où: produits par jour puis par cantine (depuis le cache)
+        
+        Args:
+            store_ids: Cantines à inclure (défaut: toutes celles du cache)
+            days: Dates à inclure (défaut: jours ouvrés de la semaine en cours)
+        
+        Returns:
+            {date: {store_id: [{'name', 'category', 'price', 'quantity'}]}}
+        """
+        days = days or current_week()
+        stores = {int(s) for s in store_ids} if store_ids is not None else None
+        
+        result: Dict[str, Dict[int, List[Dict[str, Any]]]] = {day: {} for day in days}
+        for entry in self.entries.values():
+            if entry['date'] not in result or (stores is not None and entry['store'] not in stores):
+                continue
+            result[entry['date']][entry['store']] = [
+                {
+                    'name': item.get('name', 'N/A'),
+                    'category': cat_name,
+                    'price': price_amount(item),
+                    'quantity': item.get('quantity', 0),
+                }
+                for cat_name, item in iter_items(entry['menu'])
+            ]
+        return result
+    
+    def find(self, query: str, days: List[str] = None) -> List[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Où et quand trouver un produit (recherche insensible à la casse)
+        
+        Returns:
+            Tuples (date, store_id, produit), triés par date
+        """
+        query = query.lower()
+        matches = []
+        for day, stores in self.overview(days=days or sorted({e['date'] for e in self.entries.values()})).items():
+            for store_id, items in stores.items():
+                matches.extend((day, store_id, item) for item in items if query in item['name'].lower())
+        return sorted(matches, key=lambda m: (m[0], m[1]))
+    
+    def save(self):
+        """Écrit le cache sur disque (atomique) s'il a changé"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'menus': self.entries, 'failures': self.failures}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_file)
+        self._dirty = False
+
+
+def print_overview(overview: Dict[str, Dict[int, List[Dict[str, Any]]]], names: Dict[int, str] = None,
+                   limit: int = 5):
+    """Affiche la vue jour × cantine (les premiers produits de chaque menu)"""
+    names = names or {}
+    for day, stores in overview.items():
+        day_date = date.fromisoformat(day)
+        print(f"\n📅 {JOURS[day_date.weekday()]} {day_date.strftime('%d/%m')}")
+        if not stores:
+            print("   ℹ️  Aucun menu en cache")
+            continue
+        for store_id, items in sorted(stores.items()):
+            preview = ', '.join(item['name'] for item in items[:limit])
+            more = f" (+{len(items) - limit})" if len(items) > limit else ''
+            print(f"   🏢 {names.get(store_id, store_id)}: {len(items)} produits - {preview}{more}")
+
+
+def main():
+    """Précharge les menus des cantines du registre et affiche la semaine"""
+    import argparse
+    from dotenv import load_dotenv
+    from canteen_registry import CanteenRegistry
+    from foodles_real_api import FoodlesRealAPI
+    
+    parser = argparse.ArgumentParser(description="Préchargement des menus Foodles sur plusieurs jours")
+    parser.add_argument('--days', type=int, default=DEFAULT_WINDOW_DAYS, help="Jours ouvrés à précharger")
+    parser.add_argument('--store', type=int, action='append', help="ID de cantine (défaut: tout le registre)")
+    parser.add_argument('--cache', default=DEFAULT_MENU_CACHE, help="Fichier du cache")
+    parser.add_argument('--workers', type=int, default=8, help="Requêtes simultanées")
+    parser.add_argument('--refresh', action='store_true', help="Redemander les menus déjà en cache")
+    parser.add_argument('--offline', action='store_true', help="Lire le cache sans appeler l'API")
+    parser.add_argument('--search', help="Chercher un produit sur toute la fenêtre")
+    parser.add_argument('--base-url', help="URL de l'API (ex: serveur mock)")
+    args = parser.parse_args()
+    
+    registry = CanteenRegistry()
+    store_ids = args.store or registry.ids()
+    names = {entry['id']: entry['short_name'] for entry in registry}
+    
+    api = None
+    if not args.offline:
+        load_dotenv()
+        api = FoodlesRealAPI(
+            session_id=os.getenv('FOODLES_SESSIONID'),
+            csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+            base_url=args.base_url,
+        )
+    
+    prefetcher = MenuPrefetcher(api, args.cache, workers=args.workers)
+    if api:
+        stats = prefetcher.prefetch(store_ids, working_days(count=args.days), refresh=args.refresh)
+        prefetcher.save()
+        print(f"✅ {stats['fetched']} menus téléchargés, {stats['cached']} en cache, "
+              f"{stats['errors']} erreurs, {stats['skipped']} échecs récents non redemandés, "
+              f"{prefetcher.stats['expired']} périmés retirés")
+    
+    if args.search:
+        matches = prefetcher.find(args.search)
+        print(f"\n🔍 '{args.search}': {len(matches)} résultat(s)")
+        for day, store_id, item in matches:
+            print(f"   {day}  {names.get(store_id, store_id):<15} {item['name']} ({item['category']})")
+        return
+    
+    print_overview(prefetcher.overview(store_ids), names)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Serveur mock de l'API Foodles pour les tests hors-ligne et les tests de charge.
+Implémente les endpoints utilisés par FoodlesRealAPI avec des fixtures
+enregistrées (cantines_data/) ou synthétisées, une latence et un taux
+d'erreur configurables, et la sémantique de changement de cantine.
+"""
+
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse, parse_qs
+
+from canteen_registry import CanteenRegistry
+from opening_hours import OpeningHours
+
+CATEGORY_NAMES = ['Entrées', 'Plats', 'Sandwichs', 'Desserts', 'Boissons', 'Snacks']
+
+DIETS = ['VEGETARIAN', 'VEGAN', 'PESCATARIAN']
+
+
+class FixtureSet:
+    """Jeu de données servi par le mock: frigo, horaires et entreprises par cantine"""
+    
+    def __init__(self):
+        self.fridges: Dict[int, Dict[str, Any]] = {}
+        self.openings: Dict[int, Dict[str, Any]] = {}
+        self.canteen_names: Dict[int, str] = {}
+    
+    @property
+    def canteen_ids(self) -> List[int]:
+        return sorted(self.fridges)
+    
+    def add_canteen(self, canteen_id: int, name: str, fridge: Dict[str, Any],
+                    opening: Dict[str, Any] = None):
+        """
+        Ajoute une cantine au jeu de données
+        
+        Args:
+            canteen_id: ID de la cantine
+            name: Nom affiché
+            fridge: Réponse de /api/fridge/ pour cette cantine
+            opening: Horaires (défaut: 11h30-14h00 en semaine)
+        """
+        self.fridges[canteen_id] = fridge
+        self.canteen_names[canteen_id] = name
+        self.openings[canteen_id] = opening or default_opening()
+    
+    @classmethod
+    def from_directory(cls, data_dir: str = 'cantines_data') -> 'FixtureSet':
+        """
+        Charge les captures les plus récentes de cantines_data/
+        
+        Args:
+            data_dir: Dossier des fichiers cantine_<nom|id>_<date>.json
+        
+        Returns:
+            FixtureSet avec une cantine par fichier reconnu
+        """
+        fixtures = cls()
+        latest: Dict[int, str] = {}
+        # Noms courts des fichiers cantine_<nom>_<date>.json -> IDs
+        registry = CanteenRegistry(os.path.join(data_dir, 'canteens.json'))
+        
+        for path in glob.glob(os.path.join(data_dir, 'cantine_*_*.json')):
+            match = re.match(r'cantine_(.+)_\d{8}\.json$', os.path.basename(path))
+            if not match:
+                continue
+            key = match.group(1)
+            entry = registry.get(key)
+            if entry is None and not key.isdigit():
+                continue
+            canteen_id = entry['id'] if entry else int(key)
+            if canteen_id not in latest or os.path.getmtime(path) > os.path.getmtime(latest[canteen_id]):
+                latest[canteen_id] = path
+        
+        for canteen_id, path in latest.items():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if 'categories' in data:
+                entry = registry.get(canteen_id)
+                fixtures.add_canteen(canteen_id, entry['name'] if entry else f"Cantine {canteen_id}", data)
+        
+        return fixtures
+    
+    @classmethod
+    def synthesize(cls, count: int, first_id: int = 2051, products: int = 35,
+                   seed: int = 42) -> 'FixtureSet':
+        """
+        Génère des cantines synthétiques reproductibles
+        
+        Args:
+            count: Nombre de cantines
+            first_id: Premier ID de cantine
+            products: Nombre moyen de produits par frigo
+            seed: Graine aléatoire
+        
+        Returns:
+            FixtureSet synthétique
+        """
+        rng = random.Random(seed)
+        fixtures = cls()
+        
+        for i in range(count):
+            canteen_id = first_id + i
+            categories = []
+            product_id = canteen_id * 1000
+            for cat_name in CATEGORY_NAMES:
+                items = []
+                for _ in range(max(1, rng.randint(products // 12, products // 4))):
+                    product_id += 1
+                    excluded = [d for d in DIETS if rng.random() < 0.4]
+                    items.append({
+                        'id': product_id,
+                        'name': f"{cat_name[:-1]} {product_id}",
+                        'quantity': rng.randint(0, 8),
+                        'price': {'amount': rng.choice([250, 390, 490, 590, 690, 790]), 'currency': 'EUR'},
+                        'nutriscore': rng.choice('ABCDE'),
+                        'has_near_expiration_sale': rng.random() < 0.15,
+                        'filter_reasons': {'excluded_diets': excluded},
+                        'tags': [{'name': cat_name}],
+                    })
+                categories.append({'name': cat_name, 'products': items})
+            fixtures.add_canteen(canteen_id, f"Cantine {canteen_id}", {'categories': categories})
+        
+        return fixtures
+
+
+def default_opening(start: str = '11:30', end: str = '14:00') -> Dict[str, Any]:
+    """Horaires par défaut: du lundi au vendredi, start-end"""
+    return {'opening_hours': [{'day': day, 'start': start, 'end': end} for day in range(5)]}
+
+
+class MockFoodlesServer:
+    """Serveur HTTP local qui imite api.foodles.co"""
+    
+    def __init__(self, fixtures: FixtureSet, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, strict_canteen: bool = False, seed: int = None):
+        """
+        Initialise le serveur
+        
+        Args:
+            fixtures: Données servies
+            host: Adresse d'écoute
+            port: Port (0 = port libre choisi par l'OS)
+            latency: Latence moyenne ajoutée à chaque réponse (secondes)
+            jitter: Variation aléatoire de la latence (secondes, +/-)
+            error_rate: Proportion de réponses en erreur (0.0 - 1.0)
+            error_status: Code HTTP des erreurs injectées
+            strict_canteen: /fridge/canteen/{id}/ renvoie 403 si id != cantine active
+            seed: Graine pour la latence et les erreurs (reproductibilité)
+        """
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.strict_canteen = strict_canteen
+        
+        self.stats = Counter()
+        self.sessions: Dict[str, Optional[int]] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+    
+    @property
+    def url(self) -> str:
+        """URL de base à passer à FoodlesRealAPI(base_url=...)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+    
+    def start(self) -> 'MockFoodlesServer':
+        """Démarre le serveur dans un thread de fond"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Arrête le serveur"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    # ==================== SIMULATION ====================
+    
+    def _simulate(self) -> Optional[int]:
+        """Applique la latence et tire au sort une erreur éventuelle"""
+        with self._lock:
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+            failed = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return self.error_status if failed else None
+    
+    def _active_canteen(self, session_key: str) -> Optional[int]:
+        with self._lock:
+            if session_key not in self.sessions:
+                ids = self.fixtures.canteen_ids
+                self.sessions[session_key] = ids[0] if ids else None
+            return self.sessions[session_key]
+    
+    def _set_active_canteen(self, session_key: str, canteen_id: int):
+        with self._lock:
+            self.sessions[session_key] = canteen_id
+    
+    def handle(self, method: str, path: str, query: Dict[str, List[str]],
+               body: Any, session_key: str):
+        """
+        Route une requête vers la réponse mock
+        
+        Returns:
+            Tuple (status, payload, cookies à poser)
+        """
+        route = re.sub(r'/\d+/', '/{id}/', path)
+        with self._lock:
+            self.stats[f"{method} {route}"] += 1
+        
+        error = self._simulate()
+        if error:
+            return error, {'detail': 'Erreur simulée'}, {}
+        
+        if path == '/api/auth/login/' and method == 'POST':
+            new_session = uuid.uuid4().hex
+            self._active_canteen(new_session)
+            return 200, {'id': 1, 'email': (body or {}).get('email')}, {'sessionid': new_session}
+        
+        if path == '/api/async/client/current/' and method == 'GET':
+            canteen_id = self._active_canteen(session_key)
+            return 200, {'id': 1, 'canteen': {'id': canteen_id,
+                                              'name': self.fixtures.canteen_names.get(canteen_id)}}, {}
+        
+        if path == '/api/client/' and method == 'PATCH':
+            canteen_id = (body or {}).get('canteen')
+            if canteen_id not in self.fixtures.fridges:
+                return 404, {'detail': 'Cantine inconnue'}, {}
+            self._set_active_canteen(session_key, canteen_id)
+            return 200, {'id': 1, 'canteen': canteen_id}, {}
+        
+        if path == '/api/fridge/' and method == 'GET':
+            fridge = self.fixtures.fridges.get(self._active_canteen(session_key))
+            if fridge is None:
+                return 404, {'detail': 'Cantine inconnue'}, {}
+            return 200, fridge, {}
+        
+        if path == '/api/company/' and method == 'GET':
+            return 200, self._companies_page(query), {}
+        
+        match = re.match(r'^/api/fridge/canteen/(\d+)/$', path)
+        if match and method == 'GET':
+            canteen_id = int(match.group(1))
+            if canteen_id not in self.fixtures.fridges:
+                return 404, {'detail': 'Cantine inconnue'}, {}
+            if self.strict_canteen and canteen_id != self._active_canteen(session_key):
+                return 403, {'detail': "Cantine non associée au compte"}, {}
+            return 200, self.fixtures.fridges[canteen_id], {}
+        
+        match = re.match(r'^/api/ondemand/stores/(\d+)/(menu|cart|opening)/$', path)
+        if match and method == 'GET':
+            store_id, resource = int(match.group(1)), match.group(2)
+            if store_id not in self.fixtures.fridges:
+                return 404, {'detail': 'Store inconnu'}, {}
+            if resource == 'opening':
+                opening = self.fixtures.openings[store_id]
+                # Même modèle d'horaires que StoreStatus / le poller
+                hours = OpeningHours.from_opening(opening)
+                status = hours.status(datetime.now()) if hours else {
+                    'is_open': None, 'next_opening': None, 'next_closing': None}
+                return 200, {**opening, **status}, {}
+            if resource == 'cart':
+                return 200, {'store': store_id, 'items': [], 'total': {'amount': 0}}, {}
+            fridge = self.fixtures.fridges[store_id]
+            return 200, {
+                'store': store_id,
+                'when': query.get('when', [datetime.now().strftime('%Y-%m-%d')])[0],
+                'categories': [
+                    {'name': cat.get('name'), 'items': cat.get('items', []) or cat.get('products', [])}
+                    for cat in fridge.get('categories', [])
+                ],
+            }, {}
+        
+        return 404, {'detail': 'Not found'}, {}
+    
+    def _companies_page(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Une page de /api/company/ (une entreprise par tranche de 3 cantines)
+        
+        Raises:
+            ValueError: page ou ps n'est pas un entier positif
+        """
+        page = int(query.get('page', ['1'])[0])
+        page_size = int(query.get('ps', ['25'])[0])
+        if page < 1 or page_size < 1:
+            raise ValueError(f"page={page}, ps={page_size}")
+        ids = self.fixtures.canteen_ids
+        companies = [
+            {
+                'id': 100 + i // 3,
+                'name': f"Entreprise {100 + i // 3}",
+                'canteens': [{'id': cid, 'name': self.fixtures.canteen_names[cid]} for cid in ids[i:i + 3]],
+            }
+            for i in range(0, len(ids), 3)
+        ]
+        start = (page - 1) * page_size
+        return {
+            'count': len(companies),
+            'next': page + 1 if start + page_size < len(companies) else None,
+            'results': companies[start:start + page_size],
+        }
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _respond(self):
+                parsed = urlparse(self.path)
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    # Corps illisible: la connexion ne peut pas être réutilisée
+                    self.close_connection = True
+                    return 400, {'detail': 'Content-Length invalide'}, {}
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    body = None
+                
+                cookies = SimpleCookie(self.headers.get('Cookie', ''))
+                session_key = cookies['sessionid'].value if 'sessionid' in cookies else 'anonymous'
+                
+                try:
+                    return server.handle(self.command, parsed.path, parse_qs(parsed.query), body, session_key)
+                except ValueError as e:
+                    # Paramètre mal formé (page=abc...): erreur client, comme l'API
+                    return 400, {'detail': f"Paramètre invalide: {e}"}, {}
+                except Exception as e:
+                    return 500, {'detail': f"Erreur du serveur mock: {e}"}, {}
+            
+            def _dispatch(self):
+                status, payload, set_cookies = self._respond()
+                
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in set_cookies.items():
+                    self.send_header('Set-Cookie', f"{name}={value}; Path=/")
+                self.end_headers()
+                self.wfile.write(data)
+            
+            do_GET = do_POST = do_PATCH = _dispatch
+        
+        return Handler
+
+
+def main():
+    """Lance le mock en avant-plan"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serveur mock de l'API Foodles")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data-dir', default='cantines_data', help="Fixtures enregistrées")
+    parser.add_argument('--synthetic', type=int, default=0, help="Nombre de cantines synthétiques")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--strict-canteen', action='store_true')
+    args = parser.parse_args()
+    
+    fixtures = FixtureSet.synthesize(args.synthetic) if args.synthetic else FixtureSet.from_directory(args.data_dir)
+    if not fixtures.canteen_ids:
+        print(f"⚠️  Aucune fixture dans {args.data_dir}, génération de 3 cantines synthétiques")
+        fixtures = FixtureSet.synthesize(3)
+    
+    server = MockFoodlesServer(fixtures, port=args.port, latency=args.latency,
+                               error_rate=args.error_rate, strict_canteen=args.strict_canteen)
+    print(f"🧪 Mock Foodles: {server.url} ({len(fixtures.canteen_ids)} cantines)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Arrêt")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
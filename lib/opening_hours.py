@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Modèle des horaires d'ouverture d'une cantine, construit à partir des
+réponses de get_store_opening.
+
+Les créneaux sont convertis une fois en une liste triée de bornes
+(secondes depuis lundi 00:00); "ouvert à t" et "prochain changement après t"
+sont ensuite une simple recherche dichotomique (bisect).
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+WEEK_SECONDS = 7 * 24 * 3600
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Horodatage ISO de l'API (le fuseau est ignoré: heure locale de la cantine)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _hhmm_seconds(value: str) -> int:
+    hours, minutes = value.split(':')[:2]
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _week_start(t: datetime) -> datetime:
+    """Lundi 00:00 de la semaine de t"""
+    return datetime.combine((t - timedelta(days=t.weekday())).date(), datetime.min.time())
+
+
+def merge_intervals(intervals: List[Tuple[float, float]]) -> List[float]:
+    """
+    Fusionne des intervalles [début, fin) et les aplatit en bornes triées
+    
+    Returns:
+        [ouverture, fermeture, ouverture, fermeture, ...]
+    """
+    bounds: List[float] = []
+    for start, end in sorted(i for i in intervals if i[1] > i[0]):
+        if bounds and start <= bounds[-1]:
+            bounds[-1] = max(bounds[-1], end)
+        else:
+            bounds.extend((start, end))
+    return bounds
+
+
+class OpeningHours:
+    """
+    Horaires d'une cantine: bornes triées, requêtes en O(log n)
+    
+    Deux modes:
+    - hebdomadaire (créneaux 'opening_hours'): valable indéfiniment;
+    - annoncé (is_open + next_opening/next_closing): valable jusqu'au
+      dernier changement connu, au-delà l'état est inconnu (None).
+    """
+    
+    def __init__(self, bounds: List[float], weekly: bool = True, open_at_start: bool = False,
+                 origin: datetime = None):
+        """
+        Args:
+            bounds: Bornes triées où l'état change (secondes)
+            weekly: True si les bornes sont relatives à lundi 00:00 et se répètent
+            open_at_start: État avant la première borne
+            origin: Instant zéro des bornes (mode annoncé)
+        """
+        self.bounds = bounds
+        self.weekly = weekly
+        self.open_at_start = open_at_start
+        self.origin = origin
+    
+    @classmethod
+    def weekly_slots(cls, slots: List[Dict[str, Any]]) -> 'OpeningHours':
+        """
+        Horaires hebdomadaires
+        
+        Args:
+            slots: [{'day': 0-6 (0=lundi), 'start': 'HH:MM', 'end': 'HH:MM'}]
+                   (un créneau qui finit avant de commencer passe minuit)
+        """
+        intervals = []
+        for slot in slots:
+            start = slot['day'] * 86400 + _hhmm_seconds(slot['start'])
+            end = slot['day'] * 86400 + _hhmm_seconds(slot['end'])
+            if end <= start:
+                end += 86400
+            # Un créneau qui déborde de la semaine est coupé en deux
+            if end > WEEK_SECONDS:
+                intervals.append((0, end - WEEK_SECONDS))
+                end = WEEK_SECONDS
+            intervals.append((start, end))
+        bounds = merge_intervals(intervals)
+        if bounds and bounds[0] == 0 and bounds[-1] == WEEK_SECONDS:
+            # Ouvert au passage dimanche -> lundi: pas de vrai changement à 00:00
+            return cls(bounds[1:-1], open_at_start=True)
+        return cls(bounds)
+    
+    @classmethod
+    def announced(cls, is_open: bool, changes: List[datetime], fetched_at: datetime) -> 'OpeningHours':
+        """
+        Horaires déduits d'un état et des changements annoncés
+        
+        Args:
+            is_open: État au moment de la capture
+            changes: Prochains changements d'état (next_opening, next_closing...)
+            fetched_at: Date de la capture
+        """
+        bounds = sorted((t - fetched_at).total_seconds() for t in changes if t > fetched_at)
+        return cls(bounds, weekly=False, open_at_start=bool(is_open), origin=fetched_at)
+    
+    @classmethod
+    def from_opening(cls, opening: Dict[str, Any], fetched_at: datetime = None) -> Optional['OpeningHours']:
+        """
+        Modèle à partir d'une réponse de get_store_opening
+        
+        Args:
+            opening: Réponse de l'API
+            fetched_at: Date de la réponse (mode annoncé)
+        
+        Returns:
+            OpeningHours (None si la réponse ne dit rien d'exploitable)
+        """
+        slots = opening.get('opening_hours') or []
+        if slots:
+            return cls.weekly_slots(slots)
+        if opening.get('is_open') is None:
+            return None
+        changes = [_parse_time(opening.get('next_opening')), _parse_time(opening.get('next_closing'))]
+        return cls.announced(opening['is_open'], [t for t in changes if t], fetched_at or datetime.now())
+    
+    # ==================== REQUÊTES ====================
+    
+    def _offset(self, t: datetime) -> float:
+        if self.weekly:
+            return (t - _week_start(t)).total_seconds()
+        return (t - self.origin).total_seconds()
+    
+    def _to_datetime(self, t: datetime, offset: float) -> datetime:
+        base = _week_start(t) if self.weekly else self.origin
+        return base + timedelta(seconds=offset)
+    
+    def is_open(self, t: datetime) -> Optional[bool]:
+        """
+        Ouvert à l'instant t ?
+        
+        Returns:
+            True/False, ou None au-delà du dernier changement annoncé
+        """
+        offset = self._offset(t)
+        if not self.weekly and self.bounds and offset >= self.bounds[-1]:
+            return None
+        crossed = bisect_right(self.bounds, offset)
+        return self.open_at_start != (crossed % 2 == 1)
+    
+    def next_change(self, t: datetime) -> Optional[datetime]:
+        """
+        Prochain changement d'état strictement après t
+        
+        Returns:
+            Date du changement (None si jamais / inconnu)
+        """
+        if not self.bounds:
+            return None
+        offset = self._offset(t)
+        index = bisect_right(self.bounds, offset)
+        if index < len(self.bounds):
+            return self._to_datetime(t, self.bounds[index])
+        if not self.weekly:
+            return None
+        # Après la dernière borne de la semaine: première borne de la suivante
+        return self._to_datetime(t, self.bounds[0] + WEEK_SECONDS)
+    
+    def _next_bound(self, t: datetime, opening: bool) -> Optional[datetime]:
+        """Prochaine borne après t qui ouvre (opening=True) ou ferme la cantine"""
+        if not self.bounds:
+            return None
+        offset = self._offset(t)
+        index = bisect_right(self.bounds, offset)
+        for j in range(index, index + 2):
+            if j < len(self.bounds):
+                bound = self.bounds[j]
+            elif self.weekly:
+                # Nombre de bornes pair: la parité est conservée d'une semaine à l'autre
+                bound = self.bounds[j - len(self.bounds)] + WEEK_SECONDS
+            else:
+                return None
+            # Après la borne j, j + 1 changements ont eu lieu
+            if (self.open_at_start != (j % 2 == 0)) == opening:
+                return self._to_datetime(t, bound)
+        return None
+    
+    def next_opening(self, t: datetime) -> Optional[datetime]:
+        """Prochaine ouverture après t (None si inconnue)"""
+        return self._next_bound(t, True)
+    
+    def next_closing(self, t: datetime) -> Optional[datetime]:
+        """Prochaine fermeture après t (None si inconnue)"""
+        return self._next_bound(t, False)
+    
+    def known_until(self) -> Optional[datetime]:
+        """Limite de validité (mode annoncé), None si hebdomadaire"""
+        if self.weekly:
+            return None
+        return self.origin + timedelta(seconds=self.bounds[-1]) if self.bounds else None
+    
+    def status(self, t: datetime) -> Dict[str, Any]:
+        """
+        État à l'instant t, au format de la réponse de l'API
+        
+        Returns:
+            Dict is_open, next_opening, next_closing (dates ISO)
+        """
+        is_open = self.is_open(t)
+        if is_open is None:
+            return {'is_open': None, 'next_opening': None, 'next_closing': None}
+        next_opening = self.next_opening(t)
+        next_closing = self.next_closing(t) if is_open else None
+        return {
+            'is_open': is_open,
+            'next_opening': next_opening.isoformat() if next_opening else None,
+            'next_closing': next_closing.isoformat() if next_closing else None,
+        }
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Historique des prix par (cantine, produit), limité aux changements.
+
+Chaque série est encodée par plages (run-length): une entrée
+[horodatage, prix, en_promo_DLC] n'est ajoutée que lorsque le prix ou le
+drapeau has_near_expiration_sale change. Les démarques (baisses de prix)
+sont relevées au fil de l'eau; les requêtes (profondeur, heure par rapport
+à la fermeture, remise type par catégorie) lisent ces séries précalculées
+sans recharger les captures.
+"""
+
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime
+from statistics import mean, median
+from typing import Callable, Optional, Dict, Any, List, Union
+
+from snapshot_aggregates import iter_items, price_amount
+from stock_forecast import product_key
+
+# À incrémenter quand le format change (invalide l'historique calculé)
+PRICE_HISTORY_VERSION = 1
+
+DEFAULT_PRICE_FILE = os.path.join('cantines_data', 'store', 'prices.json')
+
+
+class PriceHistory:
+    """Séries de prix encodées par plages, et démarques relevées"""
+    
+    def __init__(self, path: str = DEFAULT_PRICE_FILE):
+        """
+        Charge l'historique
+        
+        Args:
+            path: Fichier JSON de l'historique
+        """
+        self.path = path
+        # 'cantine|produit' -> {'name', 'category', 'runs': [[ts, prix, promo], ...]}
+        self.series: Dict[str, Dict[str, Any]] = {}
+        # Baisses de prix: {'key', 'ts', 'from', 'to', 'depth', 'sale'}
+        self.markdowns: List[Dict[str, Any]] = []
+        # cantine -> horodatage ISO de la dernière capture traitée
+        self.cursors: Dict[str, str] = {}
+        self._dirty = False
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('version') == PRICE_HISTORY_VERSION:
+                    self.series = state.get('series', {})
+                    self.markdowns = state.get('markdowns', [])
+                    self.cursors = state.get('cursors', {})
+            except (OSError, ValueError):
+                # Historique corrompu: on repart de zéro
+                self.series, self.markdowns, self.cursors = {}, [], {}
+    
+    def observe(self, canteen: Union[int, str], key: str, price: float, sale: bool, ts: float,
+                name: str = None, category: str = None) -> bool:
+        """
+        Ajoute une observation de prix (rien n'est stocké si rien ne change)
+        
+        Args:
+            canteen: ID de la cantine
+            key: Identifiant du produit
+            price: Prix (montant brut de l'API)
+            sale: Produit en promo DLC (has_near_expiration_sale)
+            ts: Horodatage (secondes epoch)
+            name: Nom du produit
+            category: Catégorie
+        
+        Returns:
+            True si une nouvelle plage a été ajoutée
+        """
+        state_key = f"{canteen}|{key}"
+        series = self.series.get(state_key)
+        if series is None:
+            series = self.series[state_key] = {'name': name or key, 'category': category, 'runs': []}
+        runs = series['runs']
+        
+        if runs and runs[-1][1] == price and runs[-1][2] == sale:
+            return False
+        if runs and ts <= runs[-1][0]:
+            return False
+        
+        if runs and 0 < price < runs[-1][1]:
+            self.markdowns.append({
+                'key': state_key,
+                'ts': ts,
+                'from': runs[-1][1],
+                'to': price,
+                'depth': 1 - price / runs[-1][1],
+                'sale': sale,
+            })
+        runs.append([ts, price, sale])
+        self._dirty = True
+        return True
+    
+    def update_from_store(self, store) -> int:
+        """
+        Traite les captures du SnapshotStore postérieures aux curseurs
+        
+        Returns:
+            Nombre de captures traitées
+        """
+        decoded: Dict[str, List] = {}
+        processed = 0
+        
+        for record in store.iter_after(self.cursors, source='fridge'):
+            if record['blob'] not in decoded:
+                data = store.load(record) or {}
+                decoded[record['blob']] = [
+                    (product_key(item), price_amount(item), bool(item.get('has_near_expiration_sale')),
+                     item.get('name'), cat_name)
+                    for cat_name, item in iter_items(data)
+                ]
+            epoch = datetime.fromisoformat(record['ts']).timestamp()
+            for key, price, sale, name, category in decoded[record['blob']]:
+                self.observe(record['canteen'], key, price, sale, epoch, name, category)
+            processed += 1
+        
+        if processed:
+            self._dirty = True
+        return processed
+    
+    # ==================== REQUÊTES ====================
+    
+    def price_at(self, canteen: Union[int, str], key: str, ts: datetime) -> Optional[float]:
+        """Prix d'un produit à l'instant ts (None avant la première observation)"""
+        series = self.series.get(f"{canteen}|{key}")
+        if not series:
+            return None
+        runs = series['runs']
+        index = bisect_right([run[0] for run in runs], ts.timestamp())
+        return runs[index - 1][1] if index else None
+    
+    def _event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        store_id, key = event['key'].split('|', 1)
+        series = self.series[event['key']]
+        return {
+            'canteen': store_id,
+            'product': key,
+            'name': series['name'],
+            'category': series['category'],
+            'at': datetime.fromtimestamp(event['ts']),
+            'from': event['from'],
+            'to': event['to'],
+            'depth': event['depth'],
+            'sale': event['sale'],
+        }
+    
+    def markdown_events(self, canteen: Union[int, str] = None, category: str = None,
+                        since: datetime = None) -> List[Dict[str, Any]]:
+        """
+        Démarques relevées, par ordre chronologique
+        
+        Returns:
+            Dicts canteen, product, name, category, at, from, to, depth, sale
+        """
+        prefix = f"{canteen}|" if canteen is not None else ''
+        since_ts = since.timestamp() if since else None
+        return [
+            self._event(event) for event in self.markdowns
+            if event['key'].startswith(prefix)
+            and (category is None or self.series[event['key']]['category'] == category)
+            and (since_ts is None or event['ts'] >= since_ts)
+        ]
+    
+    def last_markdown(self, canteen: Union[int, str], key: str) -> Optional[Dict[str, Any]]:
+        """Dernière démarque d'un produit, si son prix actuel est encore démarqué"""
+        state_key = f"{canteen}|{key}"
+        series = self.series.get(state_key)
+        if not series:
+            return None
+        for event in reversed(self.markdowns):
+            if event['key'] == state_key:
+                return self._event(event) if series['runs'][-1][1] == event['to'] else None
+        return None
+    
+    def markdown_timing(self, closing_for: Callable[[str, datetime], Optional[datetime]],
+                        **filters) -> List[Dict[str, Any]]:
+        """
+        Démarques avec leur avance sur la fermeture
+        
+        Args:
+            closing_for: (cantine, instant) -> fermeture du créneau ouvert à cet
+                instant, None si inconnue ou magasin fermé
+            **filters: Filtres de markdown_events (canteen, category, since)
+        
+        Returns:
+            Événements avec 'minutes_before_closing' (None si horaires inconnus)
+        """
+        events = self.markdown_events(**filters)
+        for event in events:
+            closing = closing_for(event['canteen'], event['at'])
+            event['minutes_before_closing'] = (closing - event['at']).total_seconds() / 60 if closing else None
+        return events
+    
+    def typical_discount(self, canteen: Union[int, str] = None,
+                         since: datetime = None) -> Dict[str, Dict[str, float]]:
+        """
+        Remise type par catégorie
+        
+        Returns:
+            {catégorie: {'count', 'median', 'mean', 'max'}} (profondeurs entre 0 et 1)
+        """
+        by_category: Dict[str, List[float]] = {}
+        for event in self.markdown_events(canteen=canteen, since=since):
+            by_category.setdefault(event['category'] or 'Unknown', []).append(event['depth'])
+        return {
+            category: {'count': len(depths), 'median': median(depths), 'mean': mean(depths), 'max': max(depths)}
+            for category, depths in sorted(by_category.items())
+        }
+    
+    def save(self):
+        """Écrit l'historique sur disque (atomique) s'il a changé"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PRICE_HISTORY_VERSION, 'cursors': self.cursors,
+                       'series': self.series, 'markdowns': self.markdowns}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def main():
+    """Remise type par catégorie et dernières démarques, depuis l'historique des captures"""
+    import argparse
+    from datetime import timedelta
+    from canteen_registry import CanteenRegistry
+    from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+    from store_status import StoreStatus
+    
+    parser = argparse.ArgumentParser(description="Historique des prix et démarques")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    parser.add_argument('--jours', type=int, default=7, help="Période analysée")
+    parser.add_argument('--cantine', help="ID ou nom court de la cantine")
+    parser.add_argument('--limit', type=int, default=20, help="Démarques affichées")
+    args = parser.parse_args()
+    
+    registry = CanteenRegistry()
+    canteen = None
+    if args.cantine:
+        entry = registry.get(args.cantine)
+        canteen = entry['id'] if entry else args.cantine
+    
+    history = PriceHistory(os.path.join(args.store_dir, 'prices.json'))
+    processed = history.update_from_store(SnapshotStore(args.store_dir))
+    history.save()
+    print(f"⚡ {processed} nouvelle(s) capture(s) intégrée(s), {len(history.series)} séries")
+    
+    since = datetime.now() - timedelta(days=args.jours)
+    print(f"\n🏷️  Remise type par catégorie ({args.jours} jours)")
+    for category, stats in history.typical_discount(canteen, since).items():
+        print(f"   • {category}: -{stats['median'] * 100:.0f}% (médiane), "
+              f"max -{stats['max'] * 100:.0f}%, {stats['count']} démarques")
+    
+    # Horaires en cache uniquement (aucun appel réseau)
+    status = StoreStatus()
+    
+    def closing_for(store_id, at):
+        # Horaires hebdomadaires seulement: des horaires annoncés (statut du
+        # moment) ne disent rien d'un instant passé; et une démarque relevée
+        # magasin fermé n'a pas de fermeture de référence
+        hours = status.hours(store_id)
+        if not hours or not hours.weekly or not hours.is_open(at):
+            return None
+        return hours.next_closing(at)
+    
+    events = history.markdown_timing(closing_for, canteen=canteen, since=since)
+    print(f"\n🔥 Dernières démarques ({len(events)})")
+    for event in events[-args.limit:]:
+        entry = registry.get(event['canteen'])
+        name = entry['short_name'] if entry else event['canteen']
+        timing = ''
+        if event['minutes_before_closing'] is not None:
+            timing = f", {event['minutes_before_closing']:.0f} min avant fermeture"
+        print(f"   {event['at'].strftime('%d/%m %H:%M')}  {name:<12} {event['name']}: "
+              f"{event['from'] / 100:.2f}€ → {event['to'] / 100:.2f}€ (-{event['depth'] * 100:.0f}%){timing}")
+
+
+if __name__ == "__main__":
+    main()
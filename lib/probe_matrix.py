@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Exploration systématique des endpoints: une matrice
+endpoints × méthodes × paramètres × variantes d'en-têtes × cantines,
+exécutée en parallèle sous la limite de débit du client.
+
+Chaque cellule (statut, latence, taille, hash du corps) est enregistrée dans
+une table SQLite avec l'identifiant du passage: on peut comparer deux passages
+et voir quand un endpoint passe de 403 à 200 (ou change de contenu).
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Iterator, Iterable
+
+import requests
+
+from foodles_real_api import FoodlesRealAPI
+
+
+DEFAULT_PROBES_DB = os.path.join('data', 'probes.sqlite')
+
+# Variantes d'en-têtes testées (celles essayées à la main dans explore_403.py)
+HEADER_VARIANTS = {
+    'default': {},
+    'xhr': {'X-Requested-With': 'XMLHttpRequest'},
+    'app_referer': {'Referer': 'https://app.foodles.co/canteen/fridge'},
+    'no_csrf': {'X-CSRFToken': ''},
+}
+
+# Endpoints explorés par défaut ({canteen} est remplacé par chaque ID)
+DEFAULT_ENDPOINTS = [
+    '/client/',
+    '/fridge/',
+    '/fridge/canteen/{canteen}/',
+    '/ondemand/stores/{canteen}/menu/',
+    '/ondemand/stores/{canteen}/cart/',
+    '/ondemand/stores/{canteen}/opening/',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    run_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    method TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    url TEXT NOT NULL,
+    params TEXT NOT NULL,
+    header_variant TEXT NOT NULL,
+    canteen TEXT,
+    status INTEGER,
+    latency_ms REAL,
+    size INTEGER,
+    body_hash TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_probes_cell ON probes (endpoint, method, header_variant, canteen);
+CREATE INDEX IF NOT EXISTS idx_probes_run ON probes (run_id);
+"""
+
+
+class ProbeMatrix:
+    """Produit cartésien des dimensions à explorer"""
+    
+    def __init__(self, endpoints: Iterable[str], methods: Iterable[str] = ('GET',),
+                 params: Iterable[Dict[str, Any]] = None,
+                 header_variants: Dict[str, Dict[str, str]] = None,
+                 canteens: Iterable[Any] = None):
+        """
+        Args:
+            endpoints: Chemins relatifs à l'API, avec {canteen} éventuel
+            methods: Méthodes HTTP
+            params: Jeux de paramètres de query string ({canteen} accepté dans les valeurs)
+            header_variants: Nom -> en-têtes ajoutés
+            canteens: IDs de cantine (None = endpoints sans cantine)
+        """
+        self.endpoints = list(endpoints)
+        self.methods = [m.upper() for m in methods]
+        self.params = list(params or [{}])
+        self.header_variants = header_variants or {'default': {}}
+        self.canteens = list(canteens or [None])
+    
+    def __len__(self) -> int:
+        return len(list(self.cells()))
+    
+    def cells(self) -> Iterator[Dict[str, Any]]:
+        """
+        Cellules de la matrice (les endpoints sans {canteen} ne sont pas
+        répétés pour chaque cantine)
+        
+        Yields:
+            Dict endpoint, path, method, params, header_variant, headers, canteen
+        """
+        for endpoint, method, params, variant in itertools.product(
+                self.endpoints, self.methods, self.params, self.header_variants):
+            uses_canteen = '{canteen}' in endpoint or any('{canteen}' in str(v) for v in params.values())
+            for canteen in (self.canteens if uses_canteen else [None]):
+                fill = (lambda value: str(value).replace('{canteen}', str(canteen))) if canteen is not None else str
+                yield {
+                    'endpoint': endpoint,
+                    'path': fill(endpoint),
+                    'method': method,
+                    'params': {k: fill(v) for k, v in params.items()},
+                    'header_variant': variant,
+                    'headers': self.header_variants[variant],
+                    'canteen': canteen,
+                }
+
+
+class ProbeResults:
+    """Table SQLite des résultats de probes"""
+    
+    def __init__(self, path: str = DEFAULT_PROBES_DB):
+        """
+        Ouvre (ou crée) la base
+        
+        Args:
+            path: Fichier SQLite
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+    
+    def close(self):
+        self.conn.close()
+    
+    def record(self, rows: List[Dict[str, Any]]):
+        """Enregistre un lot de cellules (une transaction)"""
+        columns = ('run_id', 'ts', 'method', 'endpoint', 'url', 'params', 'header_variant',
+                   'canteen', 'status', 'latency_ms', 'size', 'body_hash', 'error')
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO probes ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row.get(c) for c in columns) for row in rows]
+            )
+    
+    def query(self, sql: str, args: tuple = ()) -> List[Dict[str, Any]]:
+        """Requête libre sur la table 'probes'"""
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, args)]
+    
+    def runs(self) -> List[Dict[str, Any]]:
+        """Passages enregistrés, du plus récent au plus ancien"""
+        return self.query(
+            "SELECT run_id, MIN(ts) AS started, COUNT(*) AS cells, "
+            "SUM(status BETWEEN 200 AND 299) AS ok FROM probes "
+            "GROUP BY run_id ORDER BY started DESC"
+        )
+    
+    def run_cells(self, run_id: str) -> List[Dict[str, Any]]:
+        """Cellules d'un passage"""
+        return self.query(
+            "SELECT * FROM probes WHERE run_id = ? ORDER BY endpoint, method, header_variant, canteen, params",
+            (run_id,)
+        )
+    
+    def changes(self, run_id: str, previous_run_id: str) -> List[Dict[str, Any]]:
+        """
+        Cellules dont le statut ou le contenu a changé entre deux passages
+        
+        Returns:
+            Liste de dicts (cellule, ancien/nouveau statut et hash)
+        """
+        return self.query(
+            """
+            SELECT cur.method, cur.endpoint, cur.url, cur.params, cur.header_variant, cur.canteen,
+                   prev.status AS old_status, cur.status AS new_status,
+                   prev.body_hash AS old_hash, cur.body_hash AS new_hash
+            FROM probes cur
+            LEFT JOIN probes prev
+              ON prev.run_id = ? AND prev.method = cur.method AND prev.url = cur.url
+             AND prev.params = cur.params AND prev.header_variant = cur.header_variant
+            WHERE cur.run_id = ?
+              AND (prev.run_id IS NULL OR prev.status IS NOT cur.status OR prev.body_hash IS NOT cur.body_hash)
+            ORDER BY cur.endpoint, cur.method
+            """,
+            (previous_run_id, run_id)
+        )
+
+
+class ProbeRunner:
+    """Exécute une matrice de probes en parallèle"""
+    
+    def __init__(self, api: FoodlesRealAPI, results: ProbeResults, workers: int = 8,
+                 timeout: float = 15):
+        """
+        Args:
+            api: Client (sa limite de débit s'applique à chaque cellule)
+            results: Table des résultats
+            workers: Requêtes simultanées
+            timeout: Timeout par requête (secondes)
+        """
+        self.api = api
+        self.results = results
+        self.workers = workers
+        self.timeout = timeout
+    
+    def probe(self, cell: Dict[str, Any], run_id: str) -> Dict[str, Any]:
+        """Exécute une cellule et mesure la réponse"""
+        row = {
+            'run_id': run_id,
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'method': cell['method'],
+            'endpoint': cell['endpoint'],
+            'url': cell['path'],
+            'params': json.dumps(cell['params'], sort_keys=True),
+            'header_variant': cell['header_variant'],
+            'canteen': str(cell['canteen']) if cell['canteen'] is not None else None,
+        }
+        # La latence mesurée exclut l'attente due à la limite de débit
+        self.api.throttle()
+        start = time.perf_counter()
+        try:
+            response = self.api.request(
+                cell['method'], cell['path'], throttle=False,
+                params=cell['params'] or None,
+                headers=cell['headers'] or None,
+                timeout=self.timeout,
+            )
+            body = response.content
+            row.update({
+                'status': response.status_code,
+                'size': len(body),
+                'body_hash': hashlib.sha256(body).hexdigest(),
+            })
+        except requests.RequestException as e:
+            row['error'] = str(e)[:500]
+        row['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return row
+    
+    def run(self, matrix: ProbeMatrix, run_id: str = None, batch_size: int = 100) -> str:
+        """
+        Exécute toute la matrice
+        
+        Args:
+            matrix: Cellules à explorer
+            run_id: Identifiant du passage (défaut: horodatage)
+            batch_size: Cellules enregistrées par transaction
+        
+        Returns:
+            Identifiant du passage
+        """
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        batch = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.probe, cell, run_id) for cell in matrix.cells()]
+                for future in as_completed(futures):
+                    batch.append(future.result())
+                    if len(batch) >= batch_size:
+                        self.results.record(batch)
+                        batch = []
+        finally:
+            # Une exception inattendue (ou Ctrl+C) ne perd pas les cellules déjà mesurées
+            if batch:
+                self.results.record(batch)
+        return run_id
+
+
+def print_run(results: ProbeResults, run_id: str):
+    """Affiche un passage, groupé par statut"""
+    cells = results.run_cells(run_id)
+    by_status: Dict[Any, List[Dict[str, Any]]] = {}
+    for cell in cells:
+        by_status.setdefault(cell['status'] or 'erreur', []).append(cell)
+    
+    for status in sorted(by_status, key=str):
+        icon = '✅' if isinstance(status, int) and status < 300 else '❌'
+        print(f"\n{icon} {status} ({len(by_status[status])} cellules)")
+        for cell in by_status[status][:20]:
+            params = '' if cell['params'] == '{}' else f" {cell['params']}"
+            print(f"   {cell['method']:6} {cell['url']}{params} [{cell['header_variant']}] "
+                  f"{cell['latency_ms']:.0f}ms {cell['size'] or 0}o")
+        if len(by_status[status]) > 20:
+            print(f"   ... et {len(by_status[status]) - 20} autres")
+
+
+def main():
+    """Explore une matrice d'endpoints et affiche les changements depuis le passage précédent"""
+    import argparse
+    from dotenv import load_dotenv
+    
+    parser = argparse.ArgumentParser(description="Matrice de probes sur l'API Foodles")
+    parser.add_argument('--endpoint', action='append', help="Chemin à tester ({canteen} accepté), répétable")
+    parser.add_argument('--method', action='append', help="Méthode HTTP, répétable (défaut: GET)")
+    parser.add_argument('--canteen', action='append', type=int, help="ID de cantine, répétable (défaut: 2051)")
+    parser.add_argument('--headers', nargs='+', default=['default'], choices=sorted(HEADER_VARIANTS),
+                        help="Variantes d'en-têtes")
+    parser.add_argument('--param', action='append', default=[],
+                        help="Jeu de paramètres JSON, répétable (ex: '{\"date\": \"2026-01-30\"}')")
+    parser.add_argument('--rate', type=float, default=5, help="Requêtes par seconde (défaut: 5)")
+    parser.add_argument('--workers', type=int, default=8, help="Requêtes simultanées")
+    parser.add_argument('--db', default=DEFAULT_PROBES_DB, help="Base SQLite des résultats")
+    parser.add_argument('--base-url', help="URL de l'API (ex: serveur mock)")
+    args = parser.parse_args()
+    
+    load_dotenv()
+    api = FoodlesRealAPI(
+        session_id=os.getenv('FOODLES_SESSIONID'),
+        csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+        base_url=args.base_url,
+        rate_limit=args.rate,
+    )
+    matrix = ProbeMatrix(
+        endpoints=args.endpoint or DEFAULT_ENDPOINTS,
+        methods=args.method or ['GET'],
+        params=[json.loads(p) for p in args.param] or [{}],
+        header_variants={name: HEADER_VARIANTS[name] for name in args.headers},
+        canteens=args.canteen or [2051],
+    )
+    
+    results = ProbeResults(args.db)
+    print(f"🧪 {len(matrix)} cellules à {args.rate:g} req/s...")
+    start = time.perf_counter()
+    run_id = ProbeRunner(api, results, workers=args.workers).run(matrix)
+    print(f"⏱️  Passage {run_id} terminé en {time.perf_counter() - start:.1f}s -> {args.db}")
+    print_run(results, run_id)
+    
+    runs = results.runs()
+    if len(runs) > 1:
+        changes = results.changes(run_id, runs[1]['run_id'])
+        print(f"\n🔄 {len(changes)} cellule(s) modifiée(s) depuis {runs[1]['run_id']}")
+        for change in changes[:20]:
+            print(f"   {change['method']:6} {change['url']} [{change['header_variant']}] "
+                  f"{change['old_status']} -> {change['new_status']}")
+    results.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Décodeur incrémental du format "flight" RSC (React Server Components) de Next.js,
+celui des pages app.foodles.co (?_rsc=...) comme data/fridge_full_content.txt.
+
+Une ligne = une "row" <id hex>:<contenu>. Types de rows gérés:
+    I[...]          import de module client (id, chunks, export)
+    H<code>[...]    hint (preload...)
+    E{...}          erreur
+    T<len hex>,...  texte de longueur fixe (peut contenir des retours à la ligne)
+    JSON            tout le reste ("$Sreact.fragment", objets, tableaux, null...)
+
+Les chaînes commençant par '$' sont des références: $<id> / $<id>:chemin
+(valeur d'une autre row), $L<id> (référence paresseuse), $@<id> (promesse),
+$S<nom> (symbole), $undefined, $$ (dollar échappé)...
+
+Le découpage se fait en une seule passe sur un flux d'octets: feed() peut être
+appelé avec des morceaux arbitraires (réponse HTTP en streaming). Le JSON des
+rows n'est décodé qu'à la demande, quand une référence ou un chemin l'atteint.
+"""
+
+import json
+from typing import Optional, Dict, Any, List, Iterator, Union
+
+# Tags suivis d'une longueur hexadécimale puis d'une virgule (contenu binaire/texte)
+LENGTH_PREFIXED_TAGS = b'TABOUVSsLlGgMmo'
+LENGTH_PREFIXED_TAGS_STR = LENGTH_PREFIXED_TAGS.decode('ascii')
+
+# Champs d'un élément React ["$", type, key, props]
+ELEMENT_FIELDS = {'type': 1, 'key': 2, 'props': 3}
+
+# Tags suivis d'un JSON (I = module, E = erreur, D/W = debug/console)
+JSON_TAGS = b'IEDW'
+
+
+class RSCRow:
+    """
+    Une row du flux RSC, gardée sous forme d'octets bruts
+    
+    Le JSON n'est décodé qu'au premier accès à .value: les rows jamais
+    atteintes (manifestes de modules, métadonnées...) ne coûtent qu'un découpage.
+    """
+    
+    __slots__ = ('id', 'tag', '_raw', '_value')
+    
+    _UNSET = object()
+    
+    def __init__(self, row_id: str, tag: str, raw):
+        self.id = row_id
+        self.tag = tag
+        self._raw = raw
+        self._value = self._UNSET
+    
+    @property
+    def is_module(self) -> bool:
+        return self.tag == 'I'
+    
+    @property
+    def is_decoded(self) -> bool:
+        return self._value is not self._UNSET
+    
+    @property
+    def raw(self) -> bytes:
+        """Contenu brut de la row (sans id ni tag)"""
+        return bytes(self._raw)
+    
+    @property
+    def value(self) -> Any:
+        """Contenu décodé (à la demande)"""
+        if self._value is self._UNSET:
+            self._value = self._decode()
+        return self._value
+    
+    def _decode(self) -> Any:
+        raw = bytes(self._raw)
+        if self.tag == 'T':
+            return raw.decode('utf-8')
+        if self.tag and self.tag in LENGTH_PREFIXED_TAGS_STR:
+            return raw
+        if self.tag == 'H':
+            # Hint: H<code>[...]
+            return {'code': chr(raw[0]), 'args': json.loads(raw[1:])}
+        return json.loads(raw)
+    
+    def __repr__(self):
+        return f"RSCRow({self.id!r}, tag={self.tag!r}, {len(self._raw)} octets)"
+
+
+class RSCModuleRef:
+    """Référence vers un module client (row I[...]), décodée seulement si on la lit"""
+    
+    __slots__ = ('row',)
+    
+    def __init__(self, row: RSCRow):
+        self.row = row
+    
+    @property
+    def spec(self) -> Any:
+        """[id, chunks, export] du module"""
+        return self.row.value
+    
+    @property
+    def export(self) -> Optional[str]:
+        spec = self.spec
+        return spec[2] if isinstance(spec, list) and len(spec) > 2 else None
+    
+    def __repr__(self):
+        return f"Module(row {self.row.id})"
+
+
+class RSCSymbol:
+    """Symbole React ($Sreact.fragment, $Sreact.suspense...)"""
+    
+    __slots__ = ('name',)
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __eq__(self, other):
+        return isinstance(other, RSCSymbol) and other.name == self.name
+    
+    def __hash__(self):
+        return hash(('RSCSymbol', self.name))
+    
+    def __repr__(self):
+        return f"Symbol({self.name})"
+
+
+class RSCDecoder:
+    """Découpe un flux RSC en rows, sans jamais relire les octets déjà traités"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+        # Row de longueur fixe en attente: (id, tag, longueur)
+        self._pending_length = None
+        self.rows: Dict[str, RSCRow] = {}
+    
+    def feed(self, chunk: Union[bytes, str]) -> List[RSCRow]:
+        """
+        Ajoute un morceau du flux
+        
+        Args:
+            chunk: Octets (ou texte) reçus
+        
+        Returns:
+            Rows complétées par ce morceau
+        """
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self._buffer += chunk
+        
+        completed = self._drain(copy=True)
+        
+        # Libérer la partie déjà consommée
+        if self._pos:
+            del self._buffer[:self._pos]
+            self._pos = 0
+        return completed
+    
+    def scan(self, content: bytes) -> List[RSCRow]:
+        """
+        Découpe un contenu complet sans copie: chaque row garde une vue
+        (memoryview) sur les octets d'origine
+        
+        Args:
+            content: Réponse RSC complète
+        
+        Returns:
+            Rows découpées
+        """
+        self._buffer = content
+        self._pos = 0
+        completed = self._drain(copy=False)
+        completed.extend(self.close())
+        return completed
+    
+    def close(self) -> List[RSCRow]:
+        """Termine le flux (dernière row sans retour à la ligne final)"""
+        remaining = bytes(self._buffer[self._pos:])
+        self._buffer = bytearray()
+        self._pos = 0
+        if not remaining.strip():
+            return []
+        
+        if self._pending_length is None:
+            self._buffer = bytearray(remaining + b'\n')
+            completed = self._drain(copy=True)
+            if not self._buffer[self._pos:].strip():
+                return completed
+        raise ValueError(f"Flux RSC tronqué: {len(remaining)} octets non décodés")
+    
+    def _drain(self, copy: bool) -> List[RSCRow]:
+        source = self._buffer if copy else memoryview(self._buffer)
+        completed = []
+        while True:
+            span = self._next_span()
+            if span is None:
+                break
+            row_id, tag, start, end = span
+            raw = bytes(self._buffer[start:end]) if copy else source[start:end]
+            row = RSCRow(row_id, tag, raw)
+            self.rows[row_id] = row
+            completed.append(row)
+        return completed
+    
+    def _next_span(self) -> Optional[tuple]:
+        """Position de la prochaine row complète: (id, tag, début, fin) du contenu"""
+        buf = self._buffer
+        
+        if self._pending_length is not None:
+            row_id, tag, length = self._pending_length
+            if len(buf) - self._pos < length:
+                return None
+            start = self._pos
+            self._pos += length
+            self._pending_length = None
+            return row_id, tag, start, start + length
+        
+        # Ignorer les lignes vides
+        while self._pos < len(buf) and buf[self._pos] in b'\r\n':
+            self._pos += 1
+        
+        colon = buf.find(b':', self._pos)
+        if colon == -1:
+            return None
+        row_id = buf[self._pos:colon].decode('ascii')
+        start = colon + 1
+        if start >= len(buf):
+            return None
+        
+        tag = buf[start]
+        if tag in LENGTH_PREFIXED_TAGS:
+            comma = buf.find(b',', start)
+            if comma == -1:
+                return None
+            try:
+                length = int(buf[start + 1:comma], 16)
+            except ValueError:
+                length = None
+            if length is not None:
+                self._pos = comma + 1
+                self._pending_length = (row_id, chr(tag), length)
+                return self._next_span()
+        
+        newline = buf.find(b'\n', start)
+        if newline == -1:
+            return None
+        self._pos = newline + 1
+        
+        if tag in JSON_TAGS or tag == ord('H'):
+            return row_id, chr(tag), start + 1, newline
+        return row_id, '', start, newline
+
+
+class RSCDocument:
+    """Rows d'une réponse RSC, avec résolution des références"""
+    
+    def __init__(self, rows: Dict[str, RSCRow]):
+        self.rows = rows
+        self._resolved: Dict[str, Any] = {}
+        self._resolving = set()
+    
+    @classmethod
+    def parse(cls, content: Union[bytes, str], chunk_size: int = 65536) -> 'RSCDocument':
+        """
+        Décode un contenu RSC complet
+        
+        Args:
+            content: Réponse RSC brute
+            chunk_size: Taille des morceaux passés au décodeur
+        
+        Returns:
+            Document décodé
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        decoder = RSCDecoder()
+        for i in range(0, len(content), chunk_size):
+            decoder.feed(content[i:i + chunk_size])
+        decoder.close()
+        return cls(decoder.rows)
+    
+    @classmethod
+    def from_stream(cls, chunks) -> 'RSCDocument':
+        """Décode un itérable de morceaux (ex: response.iter_content())"""
+        decoder = RSCDecoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+        decoder.close()
+        return cls(decoder.rows)
+    
+    # ==================== RÉSOLUTION ====================
+    
+    def row_value(self, row_id: str) -> Any:
+        """Valeur résolue d'une row (mise en cache, protégée contre les cycles)"""
+        if row_id in self._resolved:
+            return self._resolved[row_id]
+        row = self.rows.get(row_id)
+        if row is None:
+            return {'$missing': row_id}
+        if row.is_module:
+            return RSCModuleRef(row)
+        if row_id in self._resolving:
+            return {'$ref': row_id}
+        
+        self._resolving.add(row_id)
+        try:
+            value = self.resolve(row.value)
+        finally:
+            self._resolving.discard(row_id)
+        self._resolved[row_id] = value
+        return value
+    
+    def resolve(self, value: Any) -> Any:
+        """Résout récursivement les références d'une valeur"""
+        if isinstance(value, str):
+            return self._resolve_string(value)
+        if isinstance(value, list):
+            if len(value) == 4 and value[0] == '$':
+                # Élément React: ["$", type, key, props]
+                return {
+                    '$element': self.resolve(value[1]),
+                    'key': value[2],
+                    'props': self.resolve(value[3]),
+                }
+            return [self.resolve(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self.resolve(v) for k, v in value.items()}
+        return value
+    
+    def _resolve_string(self, value: str) -> Any:
+        if not value.startswith('$') or len(value) == 1:
+            return value
+        
+        marker = value[1]
+        if marker == '$':
+            return value[1:]
+        if marker == 'S':
+            return RSCSymbol(value[2:])
+        if value == '$undefined' or marker == 'u':
+            return None
+        if marker in 'L@':
+            return self._resolve_reference(value[2:])
+        if marker == 'I':
+            return float('inf')
+        if marker == 'N':
+            return float('nan')
+        if marker == 'n':
+            return int(value[2:])
+        if marker == 'D':
+            return value[2:]
+        if marker in '0123456789abcdef':
+            return self._resolve_reference(value[1:])
+        # Autres références (serveur, FormData, Map...): conservées telles quelles
+        return value
+    
+    def _resolve_reference(self, reference: str) -> Any:
+        row_id, *path = reference.split(':')
+        if not path:
+            return self.row_value(row_id)
+        # Référence à un sous-chemin: seul ce sous-arbre est résolu
+        return self.get(*path, row_id=row_id)
+    
+    def root(self) -> Any:
+        """Arbre résolu à partir de la row 0"""
+        return self.row_value('0')
+    
+    def get(self, *path: Union[str, int], row_id: str = '0') -> Any:
+        """
+        Valeur résolue à un chemin donné, sans résoudre le reste de l'arbre
+        
+        Les références rencontrées en chemin sont suivies, et seules les rows
+        traversées sont décodées. Un élément React ["$", type, key, props]
+        se parcourt avec les clés 'type', 'key' et 'props'.
+        
+        Args:
+            *path: Clés de dict / index de liste (ex: 'f', 0, 5, 'props')
+            row_id: Row de départ
+        
+        Returns:
+            Valeur résolue (None si le chemin n'existe pas)
+        """
+        row = self.rows.get(row_id)
+        if row is None:
+            return None
+        if row.is_module:
+            return RSCModuleRef(row) if not path else None
+        
+        value = row.value
+        for key in path:
+            value = self._follow(value)
+            if isinstance(value, list) and len(value) == 4 and value[0] == '$':
+                value = value[ELEMENT_FIELDS[key]] if key in ELEMENT_FIELDS else None
+            elif isinstance(value, dict):
+                value = value.get(str(key))
+            elif isinstance(value, list) and str(key).isdigit():
+                index = int(key)
+                value = value[index] if index < len(value) else None
+            else:
+                return None
+        return self.resolve(value)
+    
+    def _follow(self, value: Any) -> Any:
+        """Suit une référence de row sans résoudre son contenu"""
+        while isinstance(value, str) and len(value) > 1 and value[0] == '$':
+            marker = value[1]
+            if marker in 'L@':
+                reference = value[2:]
+            elif marker in '0123456789abcdef':
+                reference = value[1:]
+            else:
+                return value
+            row_id, *path = reference.split(':')
+            row = self.rows.get(row_id)
+            if row is None or row.is_module:
+                return value
+            value = row.value
+            for key in path:
+                if isinstance(value, dict):
+                    value = value.get(key)
+                elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                    value = value[int(key)]
+                else:
+                    return None
+        return value
+    
+    def decoded_rows(self) -> int:
+        """Nombre de rows dont le JSON a effectivement été décodé"""
+        return sum(1 for row in self.rows.values() if row.is_decoded)
+    
+    # ==================== EXTRACTION ====================
+    
+    def modules(self) -> Iterator[RSCRow]:
+        """Rows d'import de modules"""
+        return (row for row in self.rows.values() if row.is_module)
+    
+    def walk(self, value: Any = None) -> Iterator[Dict[str, Any]]:
+        """Parcourt tous les dicts de l'arbre résolu (props comprises)"""
+        stack = [self.root() if value is None else value]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                yield node
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+    
+    def find_products(self) -> List[Dict[str, Any]]:
+        """
+        Objets ressemblant à des produits (id + name + price/quantity)
+        
+        Seules les rows dont les octets bruts contiennent "id" et "name" sont
+        décodées; les manifestes de modules ne sont jamais parsés.
+        """
+        products = []
+        seen_ids = set()
+        for row in self.rows.values():
+            if row.tag or b'"name"' not in row.raw or b'"id"' not in row.raw:
+                continue
+            for node in self.walk(self.row_value(row.id)):
+                if 'id' in node and 'name' in node and ('price' in node or 'quantity' in node):
+                    if node['id'] in seen_ids:
+                        continue
+                    seen_ids.add(node['id'])
+                    products.append(node)
+        return products
+
+
+def main():
+    """Décode data/fridge_full_content.txt et affiche sa structure"""
+    import sys
+    import time
+    
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data/fridge_full_content.txt'
+    with open(path, 'rb') as f:
+        content = f.read()
+    
+    start = time.perf_counter()
+    document = RSCDocument.parse(content)
+    build = document.get('b')
+    elapsed = time.perf_counter() - start
+    
+    print(f"📄 {path}: {len(content)} octets, {len(document.rows)} rows en {elapsed * 1000:.2f}ms")
+    print(f"   📦 Modules: {sum(1 for _ in document.modules())}")
+    print(f"   🌳 Build: {build} ({document.decoded_rows()} row(s) décodée(s))")
+    print(f"   🛒 Produits: {len(document.find_products())} ({document.decoded_rows()} row(s) décodée(s))")
+
+
+if __name__ == "__main__":
+    main()
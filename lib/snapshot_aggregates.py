@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Agrégats par capture (totaux, prix, catégories, DLC, végétariens), mis en
+cache par hash de contenu. Les rapports combinent ces agrégats partiels au
+lieu de re-parser le JSON brut: seules les nouvelles captures sont analysées.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Tuple
+
+# À incrémenter quand le calcul des agrégats change (invalide le cache)
+AGGREGATES_VERSION = 1
+
+DEFAULT_CACHE_FILE = os.path.join('cantines_data', 'store', 'aggregates.json')
+
+
+def iter_items(data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Parcourt les produits d'une réponse frigo/menu
+    
+    Supporte les deux formats ('items' ou 'products' par catégorie).
+    
+    Yields:
+        Tuples (nom de catégorie, produit)
+    """
+    for cat in (data or {}).get('categories', []):
+        cat_name = cat.get('name', 'Unknown')
+        for item in (cat.get('items', []) or cat.get('products', [])):
+            yield cat_name, item
+
+
+def price_amount(item: Dict[str, Any]):
+    """Montant brut du prix (dict {'amount': ...} ou nombre)"""
+    price = item.get('price', 0)
+    if isinstance(price, dict):
+        price = price.get('amount', 0)
+    return price if isinstance(price, (int, float)) else 0
+
+
+def excluded_diets(item: Dict[str, Any]) -> List[str]:
+    filter_reasons = item.get('filter_reasons', {}) or {}
+    return filter_reasons.get('excluded_diets', []) if isinstance(filter_reasons, dict) else []
+
+
+# Produit normalisé, compact (tuple): ce que les analyses utilisent d'une capture
+ProductRecord = namedtuple('ProductRecord', 'product name category price quantity dlc diets nutriscore')
+
+
+def normalize_items(data: Dict[str, Any]) -> List[ProductRecord]:
+    """
+    Produits d'une réponse frigo/menu sous forme compacte
+    
+    Supporte 'items' ou 'products', prix en dict ou en nombre.
+    """
+    return [
+        ProductRecord(
+            str(item.get('id') or item.get('name', 'N/A')),
+            item.get('name', 'N/A'),
+            cat_name,
+            price_amount(item),
+            item.get('quantity', 0) or 0,
+            bool(item.get('has_near_expiration_sale', False)),
+            tuple(excluded_diets(item)),
+            item.get('nutriscore'),
+        )
+        for cat_name, item in iter_items(data)
+    ]
+
+
+def content_hash(raw: bytes) -> str:
+    """Hash SHA-256 du contenu brut (même clé que le SnapshotStore)"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compute_aggregates(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calcule les agrégats d'une capture
+    
+    Args:
+        data: Réponse frigo décodée
+    
+    Returns:
+        Dict d'agrégats combinables avec merge_aggregates()
+    """
+    return aggregate_records(normalize_items(data))
+
+
+def aggregate_records(records: Iterable[ProductRecord]) -> Dict[str, Any]:
+    """Agrégats d'une capture à partir de ses produits normalisés"""
+    agg = {
+        'snapshots': 1,
+        'total_produits': 0,
+        'total_unites': 0,
+        'prix_sum': 0,
+        'prix_count': 0,
+        'prix_min': None,
+        'prix_max': None,
+        'total_vegetarien': 0,
+        'categories': {},
+        'produits_dlc': [],
+    }
+    
+    for record in records:
+        cat = agg['categories'].setdefault(record.category, {'produits': 0, 'unites': 0})
+        cat['produits'] += 1
+        cat['unites'] += record.quantity
+        agg['total_produits'] += 1
+        agg['total_unites'] += record.quantity
+        
+        prix = record.price
+        if prix:
+            agg['prix_sum'] += prix
+            agg['prix_count'] += 1
+            agg['prix_min'] = prix if agg['prix_min'] is None else min(agg['prix_min'], prix)
+            agg['prix_max'] = prix if agg['prix_max'] is None else max(agg['prix_max'], prix)
+        
+        # Végétarien: aucun régime exclu, ou seulement pescétarien
+        diets = record.diets
+        if not diets or (len(diets) == 1 and 'PESCATARIAN' in diets):
+            agg['total_vegetarien'] += 1
+        
+        if record.dlc:
+            agg['produits_dlc'].append({
+                'nom': record.name,
+                'category': record.category,
+                'quantity': record.quantity,
+                'price': prix
+            })
+    
+    return agg
+
+
+def merge_aggregates(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine des agrégats partiels (plusieurs captures)
+    
+    Les sommes s'additionnent, min/max se combinent, les listes DLC se
+    concatènent. 'snapshots' compte les captures combinées.
+    """
+    merged = {
+        'snapshots': 0,
+        'total_produits': 0,
+        'total_unites': 0,
+        'prix_sum': 0,
+        'prix_count': 0,
+        'prix_min': None,
+        'prix_max': None,
+        'total_vegetarien': 0,
+        'categories': {},
+        'produits_dlc': [],
+    }
+    
+    for part in parts:
+        for key in ('snapshots', 'total_produits', 'total_unites', 'prix_sum', 'prix_count', 'total_vegetarien'):
+            merged[key] += part.get(key, 0)
+        for key, pick in (('prix_min', min), ('prix_max', max)):
+            if part.get(key) is not None:
+                merged[key] = part[key] if merged[key] is None else pick(merged[key], part[key])
+        for cat_name, cat in part.get('categories', {}).items():
+            target = merged['categories'].setdefault(cat_name, {'produits': 0, 'unites': 0})
+            target['produits'] += cat['produits']
+            target['unites'] += cat['unites']
+        merged['produits_dlc'].extend(part.get('produits_dlc', []))
+    
+    return merged
+
+
+class AggregateCache:
+    """Cache persistant des agrégats, clé = hash du contenu de la capture"""
+    
+    def __init__(self, path: str = DEFAULT_CACHE_FILE):
+        """
+        Charge le cache
+        
+        Args:
+            path: Fichier JSON du cache
+        """
+        self.path = path
+        self.entries: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('version') == AGGREGATES_VERSION:
+                    self.entries = cached.get('entries', {})
+            except (OSError, ValueError):
+                # Cache corrompu: on repart de zéro
+                self.entries = {}
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Agrégats d'une capture, calculés seulement si absents du cache
+        
+        Args:
+            key: Hash du contenu (éventuellement préfixé par le type d'analyse)
+            compute: Fonction appelée en cas d'absence (parse + calcul)
+        
+        Returns:
+            Agrégats
+        """
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        
+        self.misses += 1
+        value = compute()
+        self.entries[key] = value
+        self._dirty = True
+        return value
+    
+    def discard_prefix(self, prefix: str, keep: str = None) -> int:
+        """
+        Retire les entrées d'un préfixe (ex: analyses détaillées d'une cantine)
+        
+        Args:
+            prefix: Début des clés à retirer
+            keep: Clé à conserver (entrée courante)
+        
+        Returns:
+            Nombre d'entrées retirées
+        """
+        stale = [key for key in self.entries if key.startswith(prefix) and key != keep]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+    
+    def aggregates_for_raw(self, raw: bytes) -> Dict[str, Any]:
+        """Agrégats standards d'une capture brute (JSON décodé seulement si absent)"""
+        return self.get_or_compute(content_hash(raw), lambda: compute_aggregates(json.loads(raw)))
+    
+    def save(self):
+        """Écrit le cache sur disque (atomique) s'il a changé"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': AGGREGATES_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
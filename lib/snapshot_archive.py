@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Archive binaire en colonnes des captures, lue par projection mémoire (mmap).
+
+Une ligne par (capture, produit), dans un dossier par cantine, en ordre
+chronologique; chaque colonne est un fichier de valeurs de taille fixe:
+    
+    archive/<cantine>/ts.i8        horodatage (secondes epoch)
+    archive/<cantine>/product.i4   produit (indice dans index.json)
+    archive/<cantine>/quantity.i4  quantité
+    archive/<cantine>/price.i4     prix (montant brut de l'API)
+    archive/<cantine>/dlc.u1       produit en DLC courte
+    archive/index.json             produits, nombre de lignes par cantine, curseurs
+
+Les lectures ne copient rien: les colonnes sont des vues (tableaux NumPy si
+disponible, memoryview sinon) sur les fichiers projetés; une plage de temps
+est trouvée par dichotomie sur ts. Une requête sur un an ne touche que les
+pages de la cantine, de la plage et des colonnes demandées.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from snapshot_aggregates import normalize_items
+
+# À incrémenter quand le format change
+ARCHIVE_VERSION = 1
+
+DEFAULT_ARCHIVE_DIR = os.path.join('cantines_data', 'store', 'archive')
+
+# Colonne -> (code array / memoryview, dtype NumPy)
+COLUMNS = {
+    'ts': ('q', '<i8'),
+    'product': ('i', '<i4'),
+    'quantity': ('i', '<i4'),
+    'price': ('i', '<i4'),
+    'dlc': ('B', '<u1'),
+}
+
+EXTENSIONS = {'ts': 'i8', 'product': 'i4', 'quantity': 'i4', 'price': 'i4', 'dlc': 'u1'}
+
+
+class SnapshotArchive:
+    """Colonnes des captures, ajoutées en fin de fichier et lues par mmap"""
+    
+    def __init__(self, root: str = DEFAULT_ARCHIVE_DIR):
+        """
+        Ouvre l'archive (créée à la première écriture)
+        
+        Args:
+            root: Dossier de l'archive
+        """
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        # Identifiants des produits; la position dans la liste est l'indice stocké
+        self.products: List[str] = []
+        self.names: List[str] = []
+        # cantine -> nombre de lignes valides (au-delà: écriture interrompue, ignorée)
+        self.rows: Dict[str, int] = {}
+        # cantine -> horodatage ISO de la dernière capture archivée
+        self.cursors: Dict[str, str] = {}
+        self._product_ids: Dict[str, int] = {}
+        self._maps: Dict[Tuple[str, str], Tuple[Any, mmap.mmap]] = {}
+        
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"Version d'archive non supportée: {index.get('version')}")
+            if index.get('byteorder', 'little') != sys.byteorder:
+                raise ValueError("Archive écrite sur une machine d'un autre boutisme")
+            self.products = index['products']
+            self.names = index['names']
+            self.rows = index['rows']
+            self.cursors = index['cursors']
+            self._product_ids = {key: i for i, key in enumerate(self.products)}
+    
+    def _path(self, canteen: str, column: str) -> str:
+        return os.path.join(self.root, canteen, f"{column}.{EXTENSIONS[column]}")
+    
+    # ==================== ÉCRITURE ====================
+    
+    def _product_id(self, key: str, name: str) -> int:
+        product_id = self._product_ids.get(key)
+        if product_id is None:
+            product_id = self._product_ids[key] = len(self.products)
+            self.products.append(key)
+            self.names.append(name)
+        return product_id
+    
+    def append(self, canteen: Union[int, str], snapshots: Sequence[Tuple[datetime, Any]]):
+        """
+        Ajoute des captures d'une cantine (postérieures à son curseur)
+        
+        Args:
+            canteen: ID de la cantine
+            snapshots: (horodatage, réponse frigo décodée ou produits normalisés), ordre chronologique
+        """
+        canteen = str(canteen)
+        columns = {column: array(code) for column, (code, _) in COLUMNS.items()}
+        last = self.cursors.get(canteen, '')
+        for ts, data in snapshots:
+            # Même format que le 'ts' du SnapshotStore (curseur de iter_after)
+            ts_iso = ts.isoformat()
+            if ts_iso <= last:
+                continue
+            epoch = int(ts.timestamp())
+            records = normalize_items(data) if isinstance(data, dict) else data
+            for record in records:
+                columns['ts'].append(epoch)
+                columns['product'].append(self._product_id(record.product, record.name))
+                columns['quantity'].append(int(record.quantity))
+                columns['price'].append(int(record.price or 0))
+                columns['dlc'].append(int(record.dlc))
+            last = ts_iso
+        if last == self.cursors.get(canteen, ''):
+            return
+        
+        os.makedirs(os.path.join(self.root, canteen), exist_ok=True)
+        # Pas de fichier tronqué sous une projection ouverte
+        self._close(canteen)
+        valid = self.rows.get(canteen, 0)
+        for column, values in columns.items():
+            path = self._path(canteen, column)
+            with open(path, 'ab') as f:
+                # Reste d'une écriture interrompue: on repart de la dernière ligne validée
+                f.truncate(valid * values.itemsize)
+                f.write(values.tobytes())
+        self.rows[canteen] = valid + len(columns['ts'])
+        self.cursors[canteen] = last
+    
+    def update_from_store(self, store) -> int:
+        """
+        Archive les captures du SnapshotStore postérieures aux curseurs
+        
+        Returns:
+            Nombre de captures archivées
+        """
+        pending: Dict[str, List[Tuple[datetime, Any]]] = {}
+        decoded: Dict[str, Any] = {}
+        processed = 0
+        cursors = dict(self.cursors)
+        for record in store.iter_after(cursors, source='fridge'):
+            if record['blob'] not in decoded:
+                decoded[record['blob']] = normalize_items(store.load(record) or {})
+            pending.setdefault(str(record['canteen']), []).append(
+                (datetime.fromisoformat(record['ts']), decoded[record['blob']]))
+            processed += 1
+        for canteen, snapshots in pending.items():
+            self.append(canteen, snapshots)
+        self.save()
+        return processed
+    
+    def save(self):
+        """Écrit l'index (atomique): les lignes ajoutées ne deviennent visibles qu'à ce moment"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ARCHIVE_VERSION, 'byteorder': sys.byteorder, 'products': self.products,
+                       'names': self.names, 'rows': self.rows, 'cursors': self.cursors}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+    
+    # ==================== LECTURE ====================
+    
+    def _close(self, canteen: str):
+        for key in [k for k in self._maps if k[0] == canteen]:
+            _, mapped = self._maps.pop(key)
+            try:
+                mapped.close()
+            except BufferError:
+                # Vues encore utilisées par l'appelant: la projection sera libérée avec elles
+                pass
+    
+    def close(self):
+        """Libère les projections mémoire"""
+        for canteen in {k[0] for k in self._maps}:
+            self._close(canteen)
+    
+    def column(self, canteen: Union[int, str], column: str):
+        """
+        Colonne entière d'une cantine, sans copie
+        
+        Returns:
+            numpy.ndarray (lecture seule) ou memoryview typée si NumPy est absent
+        """
+        canteen = str(canteen)
+        key = (canteen, column)
+        if key not in self._maps:
+            code, dtype = COLUMNS[column]
+            rows = self.rows.get(canteen, 0)
+            if not rows:
+                return numpy.empty(0, dtype=dtype) if numpy is not None else memoryview(array(code))
+            with open(self._path(canteen, column), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if numpy is not None:
+                view = numpy.frombuffer(mapped, dtype=dtype, count=rows)
+            else:
+                view = memoryview(mapped)[:rows * array(code).itemsize].cast(code)
+            self._maps[key] = (view, mapped)
+        return self._maps[key][0]
+    
+    def time_range(self, canteen: Union[int, str], since: datetime = None,
+                   until: datetime = None) -> Tuple[int, int]:
+        """Lignes [début, fin) de la plage de temps (dichotomie sur ts: quelques pages lues)"""
+        ts = self.column(canteen, 'ts')
+        start = 0
+        end = len(ts)
+        if since is not None:
+            start = (int(numpy.searchsorted(ts, int(since.timestamp()), 'left')) if numpy is not None
+                     else bisect.bisect_left(ts, int(since.timestamp())))
+        if until is not None:
+            end = (int(numpy.searchsorted(ts, int(until.timestamp()), 'left')) if numpy is not None
+                   else bisect.bisect_left(ts, int(until.timestamp())))
+        return start, end
+    
+    def columns(self, canteen: Union[int, str], names: Sequence[str] = ('ts', 'quantity'),
+                since: datetime = None, until: datetime = None) -> Dict[str, Any]:
+        """
+        Vues sur des colonnes d'une cantine, limitées à une plage de temps (sans copie)
+        
+        Args:
+            canteen: ID de la cantine
+            names: Colonnes voulues (voir COLUMNS)
+            since: Début (inclus)
+            until: Fin (exclue)
+        
+        Returns:
+            {colonne: vue}
+        """
+        start, end = self.time_range(canteen, since, until)
+        return {name: self.column(canteen, name)[start:end] for name in names}
+    
+    def product_series(self, canteen: Union[int, str], key: str, column: str = 'quantity',
+                       since: datetime = None, until: datetime = None) -> Tuple[Any, Any]:
+        """
+        Série d'un produit: (horodatages epoch, valeurs de la colonne)
+        
+        Seules les colonnes ts, product et la colonne demandée sont lues, et
+        seulement sur la plage de temps.
+        """
+        product_id = self._product_ids.get(str(key))
+        views = self.columns(canteen, ('ts', 'product', column), since, until)
+        if product_id is None:
+            empty = numpy.empty(0) if numpy is not None else []
+            return empty, empty
+        if numpy is not None:
+            mask = views['product'] == product_id
+            return views['ts'][mask], views[column][mask]
+        rows = [i for i, p in enumerate(views['product']) if p == product_id]
+        return [views['ts'][i] for i in rows], [views[column][i] for i in rows]
+
+
+def main():
+    """Met l'archive à jour depuis le SnapshotStore et affiche la série d'un produit"""
+    import argparse
+    import resource
+    import time
+    from datetime import timedelta
+    from canteen_registry import CanteenRegistry
+    from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+    
+    parser = argparse.ArgumentParser(description="Archive binaire des captures (lecture par mmap)")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    parser.add_argument('--cantine', help="ID ou nom court de la cantine")
+    parser.add_argument('--produit', help="ID du produit (série des quantités)")
+    parser.add_argument('--jours', type=int, default=365, help="Période lue")
+    args = parser.parse_args()
+    
+    archive = SnapshotArchive(os.path.join(args.store_dir, 'archive'))
+    processed = archive.update_from_store(SnapshotStore(args.store_dir))
+    print(f"⚡ {processed} nouvelle(s) capture(s) archivée(s), "
+          f"{sum(archive.rows.values())} lignes, {len(archive.products)} produits")
+    if not args.cantine:
+        return
+    
+    entry = CanteenRegistry().get(args.cantine)
+    canteen = entry['id'] if entry else args.cantine
+    since = datetime.now() - timedelta(days=args.jours)
+    start = time.perf_counter()
+    if args.produit:
+        ts, values = archive.product_series(canteen, args.produit, since=since)
+        label = f"produit {args.produit}"
+    else:
+        views = archive.columns(canteen, ('ts', 'quantity'), since=since)
+        ts, values = views['ts'], views['quantity']
+        label = "toutes les lignes"
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    
+    print(f"📈 {canteen}, {label}: {len(values)} valeurs sur {args.jours} jours en {elapsed * 1000:.1f} ms "
+          f"(RSS max {rss:.0f} Mo, NumPy {'oui' if numpy is not None else 'non'})")
+    if len(values):
+        print(f"   du {datetime.fromtimestamp(ts[0]):%d/%m %H:%M} au {datetime.fromtimestamp(ts[-1]):%d/%m %H:%M}, "
+              f"quantité min {min(values)}, max {max(values)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Import des anciens fichiers de cantines_data dans le SnapshotStore.
+
+Formats reconnus:
+- cantine_<nom court|ID>_<YYYYMMDD>[_HHMMSS].json: réponse frigo
+  ('items' ou 'products', prix en dict ou en nombre) -> source 'fridge';
+- bilan_comparatif_<YYYYMMDD>_<HHMMSS>.json: analyses de compare_cantines
+  (une par cantine, prix en euros) -> source 'bilan'.
+
+Chaque fichier est décodé et normalisé dans un pool de processus (format
+unique: 'items', prix {'amount': centimes}), puis dédupliqué (même contenu,
+même cantine, même jour) avant d'être enregistré. L'avancement est gardé dans
+store/backfill.json: une importation interrompue reprend où elle s'était
+arrêtée.
+
+À lancer avant les captures en direct et les traitements incrémentaux
+(prévisions, historique des prix, SQLite, archives): ceux-ci gardent un
+curseur par cantine et ne relisent jamais une capture plus ancienne que
+leur curseur. Des fichiers importés après coup n'y apparaissent qu'en
+reconstruisant ces états.
+"""
+
+import glob
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from snapshot_store import BlobStore, SnapshotStore, DEFAULT_STORE_DIR
+
+CANTEEN_FILE_PATTERN = re.compile(r'^cantine_(.+?)_(\d{8})(?:_(\d{6}))?\.json$')
+BILAN_FILE_PATTERN = re.compile(r'^bilan_comparatif_(\d{8})_(\d{6})\.json$')
+
+STATE_FILE = 'backfill.json'
+
+# Entrée préparée: (clé de cantine, horodatage ISO, source, contenu normalisé, hash)
+Entry = Tuple[str, str, str, bytes, str]
+
+
+def normalize_fridge(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Réponse frigo au format unique: catégories -> 'items', prix {'amount': ...}"""
+    categories = []
+    for cat in data.get('categories', []):
+        items = []
+        for item in (cat.get('items', []) or cat.get('products', [])):
+            item = dict(item)
+            if not isinstance(item.get('price'), dict):
+                item['price'] = {'amount': item.get('price') or 0}
+            items.append(item)
+        categories.append({**{k: v for k, v in cat.items() if k not in ('items', 'products')}, 'items': items})
+    return {**{k: v for k, v in data.items() if k != 'categories'}, 'categories': categories}
+
+
+def bilan_to_fridge(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyse de compare_cantines -> réponse frigo (prix en euros -> centimes)"""
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for product in analysis.get('produits', []):
+        by_category.setdefault(product.get('category', 'Unknown'), []).append({
+            'name': product.get('name', 'N/A'),
+            'quantity': product.get('quantity', 0),
+            'price': {'amount': int(round((product.get('price') or 0) * 100))},
+            'nutriscore': product.get('nutriscore'),
+            'filter_reasons': {'excluded_diets': [] if product.get('vegetarian') else ['VEGETARIAN']},
+        })
+    return {'categories': [{'name': name, 'items': items} for name, items in by_category.items()]}
+
+
+def detect_format(filename: str, data: Any) -> Optional[str]:
+    """'fridge', 'bilan' ou None (format inconnu)"""
+    if not isinstance(data, dict):
+        return None
+    if BILAN_FILE_PATTERN.match(filename) and isinstance(data.get('cantines'), list):
+        return 'bilan'
+    if CANTEEN_FILE_PATTERN.match(filename) and isinstance(data.get('categories'), list):
+        return 'fridge'
+    return None
+
+
+def _file_timestamp(path: str, day: str, hms: Optional[str]) -> str:
+    """Heure du nom de fichier, sinon celle de modification si elle tombe le même jour, sinon midi"""
+    if hms:
+        return datetime.strptime(day + hms, '%Y%m%d%H%M%S').isoformat()
+    mtime = datetime.fromtimestamp(os.path.getmtime(path))
+    if mtime.strftime('%Y%m%d') == day:
+        return mtime.isoformat(timespec='seconds')
+    return datetime.strptime(day + '120000', '%Y%m%d%H%M%S').isoformat()
+
+
+def prepare_file(path: str) -> Tuple[str, Optional[str], List[Entry], Optional[str]]:
+    """
+    Décode, reconnaît et normalise un fichier (exécuté dans le pool)
+    
+    Returns:
+        (chemin, format, entrées, erreur)
+    """
+    filename = os.path.basename(path)
+    try:
+        with open(path, 'rb') as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        return path, None, [], str(e)
+    
+    kind = detect_format(filename, data)
+    entries = []
+    if kind == 'fridge':
+        match = CANTEEN_FILE_PATTERN.match(filename)
+        payload = SnapshotStore.encode(normalize_fridge(data))
+        entries.append((match.group(1), _file_timestamp(path, match.group(2), match.group(3)),
+                        'fridge', payload, BlobStore.hash_bytes(payload)))
+    elif kind == 'bilan':
+        match = BILAN_FILE_PATTERN.match(filename)
+        ts = data.get('date') or _file_timestamp(path, match.group(1), match.group(2))
+        for analysis in data['cantines']:
+            payload = SnapshotStore.encode(bilan_to_fridge(analysis))
+            entries.append((analysis.get('nom', ''), ts[:19], 'bilan', payload, BlobStore.hash_bytes(payload)))
+    return path, kind, entries, None
+
+
+class Backfill:
+    """Importation parallèle, dédupliquée et reprenable des anciens fichiers"""
+    
+    def __init__(self, store: SnapshotStore, registry, workers: int = None, checkpoint: int = 100):
+        """
+        Args:
+            store: SnapshotStore de destination
+            registry: CanteenRegistry (noms courts, IDs et noms complets -> ID)
+            workers: Processus de décodage (défaut: tous les cœurs)
+            checkpoint: Fichiers traités entre deux sauvegardes de l'avancement
+        """
+        self.store = store
+        self.registry = registry
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint = checkpoint
+        self.state_path = os.path.join(store.root, STATE_FILE)
+        self.done: Dict[str, List[float]] = {}
+        self.stats = {'files': 0, 'imported': 0, 'duplicates': 0, 'skipped': 0, 'unknown_canteen': 0,
+                      'unknown_format': 0, 'errors': 0}
+        
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    self.done = json.load(f).get('done', {})
+            except (OSError, ValueError):
+                self.done = {}
+        
+        # Captures déjà présentes: (cantine, source, hash, jour)
+        self.seen = {
+            (str(r['canteen']), r.get('source'), r['blob'], r['ts'][:10])
+            for r in store.iter_snapshots()
+        }
+    
+    @staticmethod
+    def _signature(path: str) -> List[float]:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime]
+    
+    def pending_files(self, data_dir: str) -> List[str]:
+        """Fichiers à importer (nouveaux ou modifiés depuis la dernière importation)"""
+        paths = sorted(glob.glob(os.path.join(data_dir, 'cantine_*.json')) +
+                       glob.glob(os.path.join(data_dir, 'bilan_comparatif_*.json')))
+        pending = []
+        for path in paths:
+            if self.done.get(os.path.abspath(path)) == self._signature(path):
+                self.stats['skipped'] += 1
+            else:
+                pending.append(path)
+        return pending
+    
+    def resolve_canteen(self, key: str) -> Optional[int]:
+        """Nom court, ID ou nom complet -> ID du registre"""
+        for candidate in (key, key.replace('_', ' '), key.split('_')[-1]):
+            entry = self.registry.get(candidate)
+            if entry:
+                return entry['id']
+        return None
+    
+    def _import(self, path: str, kind: Optional[str], entries: List[Entry], error: Optional[str]):
+        if error:
+            self.stats['errors'] += 1
+            print(f"   ❌ {os.path.basename(path)}: {error}")
+        elif kind is None:
+            self.stats['unknown_format'] += 1
+        for key, ts, source, payload, blob_hash in entries:
+            canteen = self.resolve_canteen(key)
+            if canteen is None:
+                self.stats['unknown_canteen'] += 1
+                continue
+            seen_key = (str(canteen), source, blob_hash, ts[:10])
+            if seen_key in self.seen:
+                self.stats['duplicates'] += 1
+                continue
+            self.store.put(canteen, payload, source=source, ts=datetime.fromisoformat(ts),
+                           meta={'imported_from': os.path.basename(path)})
+            self.seen.add(seen_key)
+            self.stats['imported'] += 1
+        if not error:
+            self.done[os.path.abspath(path)] = self._signature(path)
+        self.stats['files'] += 1
+    
+    def save_state(self):
+        """Écrit l'avancement (atomique)"""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'done': self.done}, f)
+        os.replace(tmp_path, self.state_path)
+    
+    def run(self, data_dir: str = 'cantines_data') -> Dict[str, int]:
+        """
+        Importe les fichiers en attente de data_dir
+        
+        Returns:
+            Statistiques (files, imported, duplicates, skipped, unknown_canteen, unknown_format, errors)
+        """
+        paths = self.pending_files(data_dir)
+        total = len(paths)
+        print(f"📥 {total} fichier(s) à importer ({self.stats['skipped']} déjà importés)")
+        start = time.perf_counter()
+        
+        def report():
+            elapsed = time.perf_counter() - start
+            rate = self.stats['files'] / elapsed if elapsed else 0
+            eta = (total - self.stats['files']) / rate if rate else 0
+            print(f"   {self.stats['files']}/{total} fichiers, {self.stats['imported']} captures importées, "
+                  f"{self.stats['duplicates']} doublons ({rate:.0f} fichiers/s, reste ~{eta:.0f}s)")
+        
+        try:
+            if self.workers <= 1 or total <= 1:
+                for path in paths:
+                    self._import(*prepare_file(path))
+                    if self.stats['files'] % self.checkpoint == 0:
+                        self.save_state()
+                        report()
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    pending = deque()
+                    for path in paths:
+                        pending.append(executor.submit(prepare_file, path))
+                        # Fichiers en cours bornés: la mémoire ne dépend pas du nombre de fichiers
+                        if len(pending) >= 4 * self.workers:
+                            self._import(*pending.popleft().result())
+                            if self.stats['files'] % self.checkpoint == 0:
+                                self.save_state()
+                                report()
+                    while pending:
+                        self._import(*pending.popleft().result())
+                        if self.stats['files'] % self.checkpoint == 0:
+                            self.save_state()
+                            report()
+        finally:
+            # Interruption comprise: la prochaine exécution reprend ici
+            self.save_state()
+        
+        report()
+        return dict(self.stats)
+
+
+def main():
+    """Importe cantines_data/*.json dans le SnapshotStore"""
+    import argparse
+    from canteen_registry import CanteenRegistry
+    
+    parser = argparse.ArgumentParser(description="Import des anciens fichiers de capture dans l'historique")
+    parser.add_argument('--data-dir', default='cantines_data', help="Dossier des fichiers à importer")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    parser.add_argument('--workers', type=int, help="Processus de décodage (défaut: tous les cœurs)")
+    parser.add_argument('--restart', action='store_true', help="Ignorer l'avancement enregistré")
+    args = parser.parse_args()
+    
+    backfill = Backfill(SnapshotStore(args.store_dir),
+                        CanteenRegistry(os.path.join(args.data_dir, 'canteens.json')),
+                        workers=args.workers)
+    if args.restart:
+        backfill.done = {}
+    
+    try:
+        stats = backfill.run(args.data_dir)
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrompu: relancer la commande pour reprendre")
+        return
+    
+    print(f"\n✅ {stats['imported']} captures importées, {stats['duplicates']} doublons ignorés")
+    if stats['unknown_canteen'] or stats['unknown_format'] or stats['errors']:
+        print(f"⚠️  {stats['unknown_canteen']} cantine(s) inconnue(s), "
+              f"{stats['unknown_format']} format(s) inconnu(s), {stats['errors']} fichier(s) illisible(s)")
+
+
+if __name__ == "__main__":
+    main()
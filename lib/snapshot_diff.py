@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Différences entre deux captures du frigo, produit par produit.
+
+Chaque capture est réduite à un index compact {id produit: ProductState};
+la comparaison parcourt une fois chaque index (temps linéaire) et classe
+les changements:
+    
+    added       produit apparu
+    removed     produit disparu
+    restocked   quantité en hausse
+    sold        quantité en baisse
+    price       prix modifié
+    dlc         DLC courte activée ou retirée
+    nutriscore  Nutri-Score modifié
+    tags        tags ou régimes exclus modifiés
+
+Un même produit peut avoir plusieurs changements (vendu et passé en DLC).
+"""
+
+import json
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from snapshot_aggregates import iter_items, price_amount, excluded_diets
+
+CHANGE_KINDS = ('added', 'removed', 'restocked', 'sold', 'price', 'dlc', 'nutriscore', 'tags')
+
+KIND_LABELS = {
+    'added': '🆕 Nouveaux',
+    'removed': '🚫 Retirés',
+    'restocked': '📦 Réassorts',
+    'sold': '🛒 Ventes',
+    'price': '💶 Prix',
+    'dlc': '⏰ DLC courte',
+    'nutriscore': '🏷️  Nutri-Score',
+    'tags': '🔖 Tags / régimes',
+}
+
+# État compact d'un produit dans une capture
+ProductState = namedtuple('ProductState', 'name category price quantity dlc nutriscore tags')
+
+# Changement: before/after sont les valeurs du champ concerné (ProductState pour added/removed)
+Change = namedtuple('Change', 'kind product name before after')
+
+
+def product_tags(item: Dict[str, Any]) -> Tuple[str, ...]:
+    """Tags ('tags': noms ou dicts {'name'}) et régimes exclus, triés"""
+    tags = []
+    for tag in item.get('tags', []) or []:
+        name = tag.get('name') if isinstance(tag, dict) else tag
+        if name:
+            tags.append(str(name))
+    tags.extend(f"non {diet.lower()}" for diet in excluded_diets(item))
+    return tuple(sorted(tags))
+
+
+def index_snapshot(data: Dict[str, Any]) -> Dict[str, ProductState]:
+    """
+    Index compact d'une réponse frigo/menu
+    
+    Un produit présent dans plusieurs catégories n'est compté qu'une fois
+    (première occurrence).
+    
+    Returns:
+        Dict {id produit: ProductState}
+    """
+    index = {}
+    for cat_name, item in iter_items(data):
+        product = str(item.get('id') or item.get('name', 'N/A'))
+        if product in index:
+            continue
+        index[product] = ProductState(
+            item.get('name', 'N/A'),
+            cat_name,
+            price_amount(item),
+            item.get('quantity', 0) or 0,
+            bool(item.get('has_near_expiration_sale', False)),
+            item.get('nutriscore'),
+            product_tags(item),
+        )
+    return index
+
+
+def diff_index(before: Dict[str, ProductState], after: Dict[str, ProductState]) -> List[Change]:
+    """
+    Compare deux index (temps linéaire en nombre de produits)
+    
+    Returns:
+        Changements, dans l'ordre des produits de la seconde capture puis des retirés
+    """
+    changes = []
+    for product, new in after.items():
+        old = before.get(product)
+        if old is None:
+            changes.append(Change('added', product, new.name, None, new))
+            continue
+        if old == new:
+            continue
+        if new.quantity > old.quantity:
+            changes.append(Change('restocked', product, new.name, old.quantity, new.quantity))
+        elif new.quantity < old.quantity:
+            changes.append(Change('sold', product, new.name, old.quantity, new.quantity))
+        if new.price != old.price:
+            changes.append(Change('price', product, new.name, old.price, new.price))
+        if new.dlc != old.dlc:
+            changes.append(Change('dlc', product, new.name, old.dlc, new.dlc))
+        if new.nutriscore != old.nutriscore:
+            changes.append(Change('nutriscore', product, new.name, old.nutriscore, new.nutriscore))
+        if new.tags != old.tags:
+            changes.append(Change('tags', product, new.name, old.tags, new.tags))
+    for product, old in before.items():
+        if product not in after:
+            changes.append(Change('removed', product, old.name, old, None))
+    return changes
+
+
+def diff_snapshots(before: Dict[str, Any], after: Dict[str, Any]) -> List[Change]:
+    """Compare deux réponses frigo décodées"""
+    return diff_index(index_snapshot(before), index_snapshot(after))
+
+
+def group_changes(changes: List[Change]) -> Dict[str, List[Change]]:
+    """Changements regroupés par type (ordre de CHANGE_KINDS)"""
+    groups = {kind: [] for kind in CHANGE_KINDS}
+    for change in changes:
+        groups[change.kind].append(change)
+    return groups
+
+
+def summarize(changes: List[Change]) -> Dict[str, int]:
+    """
+    Comptes par type, plus unités vendues et réassorties
+    
+    Returns:
+        Dict {type: nombre de produits, 'units_sold': ..., 'units_restocked': ...}
+    """
+    summary = {kind: 0 for kind in CHANGE_KINDS}
+    summary['units_sold'] = 0
+    summary['units_restocked'] = 0
+    for change in changes:
+        summary[change.kind] += 1
+        if change.kind == 'sold':
+            summary['units_sold'] += change.before - change.after
+        elif change.kind == 'restocked':
+            summary['units_restocked'] += change.after - change.before
+    return summary
+
+
+def _format_price(amount) -> str:
+    return f"{amount / 100:.2f}€" if amount else "-"
+
+
+def format_change(change: Change) -> str:
+    """Ligne lisible pour un changement"""
+    name = f"{change.name} ({change.product})"
+    if change.kind == 'added':
+        state = change.after
+        return f"{name}: {state.quantity} unité(s) à {_format_price(state.price)}"
+    if change.kind == 'removed':
+        return f"{name}: {change.before.quantity} unité(s) restante(s) avant retrait"
+    if change.kind == 'sold':
+        return f"{name}: {change.before} → {change.after} (-{change.before - change.after})"
+    if change.kind == 'restocked':
+        return f"{name}: {change.before} → {change.after} (+{change.after - change.before})"
+    if change.kind == 'price':
+        return f"{name}: {_format_price(change.before)} → {_format_price(change.after)}"
+    if change.kind == 'dlc':
+        return f"{name}: {'activée' if change.after else 'retirée'}"
+    if change.kind == 'tags':
+        removed = sorted(set(change.before) - set(change.after))
+        added = sorted(set(change.after) - set(change.before))
+        parts = [f"+{tag}" for tag in added] + [f"-{tag}" for tag in removed]
+        return f"{name}: {', '.join(parts)}"
+    return f"{name}: {change.before or '-'} → {change.after or '-'}"
+
+
+class SnapshotDiffer:
+    """Comparaisons sur les captures du SnapshotStore (index mis en cache par blob)"""
+    
+    def __init__(self, store, source: str = 'fridge'):
+        """
+        Args:
+            store: SnapshotStore
+            source: Endpoint comparé
+        """
+        self.store = store
+        self.source = source
+        self._cache: Dict[str, Dict[str, ProductState]] = {}
+    
+    def index(self, record: Dict[str, Any]) -> Dict[str, ProductState]:
+        """
+        Index d'une capture (décodée une seule fois)
+        
+        Seuls les deux derniers index sont gardés: une journée parcourue dans
+        l'ordre décode chaque capture une fois, mémoire constante.
+        """
+        blob = record['blob']
+        if blob not in self._cache:
+            raw = self.store.load_raw(record)
+            index = index_snapshot(json.loads(raw)) if raw else {}
+            if len(self._cache) >= 2:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[blob] = index
+        return self._cache[blob]
+    
+    def diff(self, before: Dict[str, Any], after: Dict[str, Any]) -> List[Change]:
+        """Compare deux enregistrements (contenu identique: aucun décodage)"""
+        if before['blob'] == after['blob']:
+            return []
+        return diff_index(self.index(before), self.index(after))
+    
+    def day_records(self, canteen, day: datetime) -> List[Dict[str, Any]]:
+        """Captures d'une cantine pour une journée, par ordre chronologique"""
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        return list(self.store.iter_snapshots(canteen, self.source, since=start, until=start + timedelta(days=1)))
+    
+    @staticmethod
+    def record_at(records: List[Dict[str, Any]], when: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Capture en vigueur à un instant: la dernière à cette heure ou avant,
+        sinon la première de la liste
+        """
+        if not records:
+            return None
+        position = bisect_right([r['ts'] for r in records], when.isoformat(timespec='seconds'))
+        return records[max(position - 1, 0)]
+    
+    def iter_day(self, records: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], List[Change]]]:
+        """
+        Compare chaque capture à la précédente
+        
+        Yields:
+            Tuples (capture précédente, capture, changements)
+        """
+        for before, after in zip(records, records[1:]):
+            yield before, after, self.diff(before, after)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Chargement en masse des captures (fichiers JSON ou blobs du SnapshotStore)
+réparti sur un pool de processus.
+
+Le décodage JSON est limité par le CPU: chaque processus décode un lot de
+sources et ne renvoie au parent que les produits normalisés (ProductRecord,
+des tuples compacts). Les résultats arrivent par lots, avec un nombre borné
+de lots en cours: la mémoire reste stable même sur des mois d'historique.
+"""
+
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Any, Iterable, Iterator, List, Tuple
+
+from snapshot_aggregates import ProductRecord, normalize_items
+
+# Source: (clé, cantine, horodatage ISO, produits)
+LoadedSnapshot = Tuple[str, Any, str, List[ProductRecord]]
+
+FILENAME_DATE_PATTERN = re.compile(r'_(\d{8})(?:_(\d{6}))?\.json$')
+
+# Lecteur de blobs propre à chaque processus (un par dossier)
+_blob_stores = {}
+
+
+def file_timestamp(path: str) -> str:
+    """Horodatage d'un fichier de capture: date du nom (_YYYYMMDD[_HHMMSS]), sinon mtime"""
+    match = FILENAME_DATE_PATTERN.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1) + (match.group(2) or '000000'), '%Y%m%d%H%M%S').isoformat()
+    return datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+
+
+def _read_blob(blobs_root: str, blob_hash: str) -> Optional[bytes]:
+    from snapshot_store import BlobStore
+    if blobs_root not in _blob_stores:
+        _blob_stores[blobs_root] = BlobStore(blobs_root)
+    return _blob_stores[blobs_root].get(blob_hash)
+
+
+def _load_task(task: Tuple[str, str, Any, str]) -> LoadedSnapshot:
+    """
+    Décode et normalise une source (exécuté dans un processus du pool)
+    
+    Args:
+        task: ('file', chemin, cantine, ts) ou ('blob', 'dossier:hash', cantine, ts)
+    """
+    kind, location, canteen, ts = task
+    try:
+        if kind == 'blob':
+            blobs_root, blob_hash = location.rsplit(':', 1)
+            raw = _read_blob(blobs_root, blob_hash)
+        else:
+            with open(location, 'rb') as f:
+                raw = f.read()
+        data = json.loads(raw) if raw else {}
+    except (OSError, ValueError):
+        # Fichier illisible ou JSON invalide: aucune donnée
+        data = {}
+    records = normalize_items(data) if isinstance(data, dict) else []
+    return location, canteen, ts, records
+
+
+def _load_batch(tasks: List[Tuple[str, str, Any, str]]) -> List[LoadedSnapshot]:
+    return [_load_task(task) for task in tasks]
+
+
+class SnapshotLoader:
+    """Décodage parallèle de nombreuses captures, résultats compacts par lots"""
+    
+    def __init__(self, workers: int = None, batch_size: int = 32, max_pending: int = None):
+        """
+        Args:
+            workers: Processus (défaut: tous les cœurs; 1 = sans pool)
+            batch_size: Sources décodées par tâche
+            max_pending: Lots en cours au maximum (défaut: 2 par processus)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * self.workers
+    
+    def _batches(self, tasks: Iterable[Tuple[str, str, Any, str]]) -> Iterator[List[Tuple[str, str, Any, str]]]:
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def iter_tasks(self, tasks: Iterable[Tuple[str, str, Any, str]]) -> Iterator[List[LoadedSnapshot]]:
+        """
+        Décode les sources et produit les résultats lot par lot, dans l'ordre
+        
+        Args:
+            tasks: Sources ('file'|'blob', emplacement, cantine, ts)
+        
+        Yields:
+            Listes de (clé, cantine, ts, produits)
+        """
+        batches = self._batches(tasks)
+        first = next(batches, None)
+        second = next(batches, None)
+        if self.workers <= 1 or second is None:
+            # Un seul lot (ou pas de pool): démarrer des processus coûterait plus cher
+            for batch in (first, second, *batches):
+                if batch:
+                    yield _load_batch(batch)
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for batch in (first, second, *batches):
+                pending.append(executor.submit(_load_batch, batch))
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    
+    def iter_files(self, files: Iterable[Tuple[str, Any]]) -> Iterator[List[LoadedSnapshot]]:
+        """
+        Fichiers cantine_*.json
+        
+        Args:
+            files: (chemin, cantine) (cantine: ID ou nom court, repris tel quel)
+        """
+        return self.iter_tasks(('file', path, canteen, file_timestamp(path)) for path, canteen in files)
+    
+    def iter_store(self, store, records: Iterable[dict]) -> Iterator[List[LoadedSnapshot]]:
+        """
+        Captures du SnapshotStore (clé du résultat: 'dossier:hash' du blob)
+        
+        Args:
+            store: SnapshotStore
+            records: Enregistrements (ex: store.iter_snapshots(...))
+        """
+        return self.iter_tasks(
+            ('blob', f"{store.blobs.root}:{record['blob']}", record['canteen'], record['ts'])
+            for record in records
+        )
+    
+    def load_files(self, files: Iterable[Tuple[str, Any]]) -> List[LoadedSnapshot]:
+        """Comme iter_files(), tout en mémoire (pour un petit nombre de fichiers)"""
+        return [loaded for chunk in self.iter_files(files) for loaded in chunk]
+
+
+def main():
+    """Décode tout l'historique du SnapshotStore et affiche le débit"""
+    import argparse
+    import time
+    from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+    
+    parser = argparse.ArgumentParser(description="Chargement parallèle des captures")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    parser.add_argument('--workers', type=int, help="Processus (défaut: tous les cœurs)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Captures par tâche")
+    args = parser.parse_args()
+    
+    store = SnapshotStore(args.store_dir)
+    loader = SnapshotLoader(args.workers, args.batch_size)
+    
+    start = time.perf_counter()
+    snapshots = products = 0
+    for chunk in loader.iter_store(store, store.iter_snapshots(source='fridge')):
+        snapshots += len(chunk)
+        products += sum(len(records) for _, _, _, records in chunk)
+    elapsed = time.perf_counter() - start
+    
+    print(f"✅ {snapshots} captures, {products} produits en {elapsed:.2f}s "
+          f"({snapshots / elapsed if elapsed else 0:.0f} captures/s, {loader.workers} processus)")
+
+
+if __name__ == "__main__":
+    main()
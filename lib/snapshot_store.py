@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Stockage adressé par contenu des réponses brutes de l'API.
+Les réponses identiques (frigo inchangé entre deux captures) ne sont écrites
+qu'une fois, compressées (zstd si disponible, sinon gzip). Chaque capture
+ajoute seulement un petit enregistrement qui pointe vers son blob.
+
+Structure:
+    blobs/ab/<sha256>.zst|.gz   contenu brut exact, une fois par hash
+    snapshots/YYYYMMDD.jsonl     un enregistrement par capture
+    canteens/<source>/<cantine>  un fichier vide par cantine présente (index)
+
+L'horodatage 'ts' (ISO, microsecondes si non nulles) est unique par cantine et
+endpoint: deux captures dans la même seconde restent distinctes pour les
+traitements incrémentaux, dont le curseur est le dernier 'ts' traité.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, Iterator, Set, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_STORE_DIR = os.path.join('cantines_data', 'store')
+
+
+class BlobStore:
+    """Blobs immuables adressés par leur hash SHA-256"""
+    
+    def __init__(self, root: str, codec: str = None):
+        """
+        Initialise le stockage
+        
+        Args:
+            root: Dossier des blobs
+            codec: 'zstd' ou 'gzip' (défaut: zstd si le module est installé)
+        """
+        self.root = root
+        if codec is None:
+            codec = 'zstd' if zstandard is not None else 'gzip'
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError("Le codec zstd nécessite le module 'zstandard'")
+        self.codec = codec
+        self.written = 0
+        self.deduplicated = 0
+        os.makedirs(root, exist_ok=True)
+    
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+    
+    def _path(self, blob_hash: str, codec: str) -> str:
+        ext = 'zst' if codec == 'zstd' else 'gz'
+        return os.path.join(self.root, blob_hash[:2], f"{blob_hash}.{ext}")
+    
+    def find(self, blob_hash: str) -> Optional[str]:
+        """Chemin du blob s'il existe (quel que soit son codec)"""
+        for codec in ('zstd', 'gzip'):
+            path = self._path(blob_hash, codec)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """
+        Stocke un contenu (une seule fois)
+        
+        Args:
+            data: Contenu brut
+        
+        Returns:
+            Tuple (hash, True si le blob vient d'être créé)
+        """
+        blob_hash = self.hash_bytes(data)
+        if self.find(blob_hash):
+            self.deduplicated += 1
+            return blob_hash, False
+        
+        path = self._path(blob_hash, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.codec == 'zstd':
+            compressed = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+        
+        # Écriture atomique: un lecteur ne voit jamais un blob partiel
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        self.written += 1
+        return blob_hash, True
+    
+    def get(self, blob_hash: str) -> Optional[bytes]:
+        """Relit le contenu exact d'un blob"""
+        path = self.find(blob_hash)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            compressed = f.read()
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise ValueError(f"Blob zstd illisible sans le module 'zstandard': {path}")
+            return zstandard.ZstdDecompressor().decompress(compressed)
+        return gzip.decompress(compressed)
+
+
+class SnapshotStore:
+    """Historique des captures: enregistrements légers pointant vers des blobs"""
+    
+    def __init__(self, root: str = DEFAULT_STORE_DIR, codec: str = None):
+        """
+        Initialise le stockage
+        
+        Args:
+            root: Dossier racine (blobs/ et snapshots/)
+            codec: Codec des blobs (voir BlobStore)
+        """
+        self.root = root
+        self.blobs = BlobStore(os.path.join(root, 'blobs'), codec=codec)
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        self.canteens_dir = os.path.join(root, 'canteens')
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Par (cantine, endpoint): jour, dernière capture (horodatage, blob) pour
+        # 'changed', et horodatages déjà pris ce jour-là (unicité de 'ts')
+        self._day_state: Dict[Tuple[str, str], Tuple[str, str, Optional[str], Set[str]]] = {}
+        # Cantines déjà présentes dans l'index, par endpoint
+        self._known_canteens: Set[Tuple[str, str]] = set()
+    
+    @staticmethod
+    def encode(payload: Union[bytes, str, Dict[str, Any], list]) -> bytes:
+        """Octets à stocker: brut tel quel, sinon JSON compact et trié"""
+        if isinstance(payload, bytes):
+            return payload
+        if isinstance(payload, str):
+            return payload.encode('utf-8')
+        return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    
+    def put(self, canteen: Union[int, str], payload: Union[bytes, str, Dict[str, Any]],
+            source: str = 'fridge', ts: datetime = None,
+            meta: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Enregistre une capture
+        
+        Args:
+            canteen: ID (ou nom court) de la cantine
+            payload: Réponse brute (bytes de préférence) ou JSON décodé
+            source: Endpoint d'origine ('fridge', 'menu', 'rsc'...)
+            ts: Horodatage de la capture (défaut: maintenant); décalé d'une
+                microseconde s'il est déjà pris pour cette cantine
+            meta: Champs supplémentaires à conserver dans l'enregistrement
+        
+        Returns:
+            Enregistrement de la capture, avec 'blob', 'new_blob' (contenu
+            jamais vu dans tout le stockage) et 'changed' (contenu différent
+            de la capture précédente de cette cantine le même jour)
+        """
+        ts = ts or datetime.now()
+        data = self.encode(payload)
+        blob_hash, created = self.blobs.put(data)
+        
+        day = ts.strftime('%Y%m%d')
+        path = os.path.join(self.snapshots_dir, f"{day}.jsonl")
+        key = (str(canteen), source)
+        with self._lock:
+            state = self._day_state.get(key)
+            if state is None or state[0] != day:
+                state = (day, *self._read_day(path, key))
+            _, last_ts, previous, taken = state
+            while ts.isoformat() in taken:
+                ts += timedelta(microseconds=1)
+            record = {
+                'ts': ts.isoformat(),
+                'canteen': canteen,
+                'source': source,
+                'blob': blob_hash,
+                'size': len(data),
+                **(meta or {}),
+            }
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            taken.add(record['ts'])
+            if record['ts'] >= last_ts:
+                last_ts, last_blob = record['ts'], blob_hash
+            else:
+                last_blob = previous
+            self._day_state[key] = (day, last_ts, last_blob, taken)
+        self._mark_canteens(source, [canteen])
+        
+        # new_blob ne suffit pas pour savoir si le fichier du jour est à jour:
+        # un contenu A → B → A réutilise le blob A (new_blob=False)
+        return {**record, 'new_blob': created, 'changed': previous != blob_hash}
+    
+    # ==================== INDEX DES CANTINES ====================
+    
+    def _mark_canteens(self, source: str, canteens: Iterable[Union[int, str]]):
+        """Ajoute des cantines à l'index (un fichier vide chacune: sans conflit entre processus)"""
+        directory = os.path.join(self.canteens_dir, source)
+        for canteen in canteens:
+            key = (source, str(canteen))
+            if key in self._known_canteens:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            open(os.path.join(directory, key[1].replace(os.sep, '_')), 'a').close()
+            self._known_canteens.add(key)
+    
+    def canteens(self, source: str = 'fridge') -> Optional[Set[str]]:
+        """
+        Cantines ayant au moins une capture pour cet endpoint
+        
+        Returns:
+            Identifiants (str), ou None si l'index n'est pas encore complet
+            (stockage antérieur à l'index: voir iter_after)
+        """
+        directory = os.path.join(self.canteens_dir, source)
+        if not os.path.exists(os.path.join(directory, '.complete')):
+            return None
+        return {name for name in os.listdir(directory) if name != '.complete'}
+    
+    @staticmethod
+    def _read_day(path: str, key: Tuple[str, str]) -> Tuple[str, Optional[str], Set[str]]:
+        """
+        Captures du jour d'une cantine (lu une fois par jour et par processus)
+        
+        Returns:
+            (horodatage et blob de la dernière capture, horodatages pris)
+        """
+        blob, last_ts, taken = None, '', set()
+        if not os.path.exists(path):
+            return last_ts, blob, taken
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if str(record['canteen']) != key[0] or record.get('source') != key[1]:
+                    continue
+                taken.add(record['ts'])
+                if record['ts'] >= last_ts:
+                    blob, last_ts = record['blob'], record['ts']
+        return last_ts, blob, taken
+    
+    def iter_snapshots(self, canteen: Union[int, str] = None, source: str = None,
+                       since: datetime = None, until: datetime = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt les enregistrements par ordre chronologique
+        
+        Un fichier du jour est dans l'ordre d'ajout, qui n'est pas toujours
+        chronologique (import d'anciens fichiers, captures de plusieurs
+        processus): les enregistrements retenus d'un jour sont triés par
+        horodatage avant d'être rendus (tri stable, mémoire bornée à un jour).
+        
+        Args:
+            canteen: Filtre cantine
+            source: Filtre endpoint
+            since: Début (inclus)
+            until: Fin (exclue)
+        
+        Yields:
+            Enregistrements de capture
+        """
+        since_day = since.strftime('%Y%m%d') if since else None
+        until_day = until.strftime('%Y%m%d') if until else None
+        since_iso = since.isoformat(timespec='seconds') if since else None
+        until_iso = until.isoformat(timespec='seconds') if until else None
+        
+        for filename in sorted(os.listdir(self.snapshots_dir)):
+            if not filename.endswith('.jsonl'):
+                continue
+            day = filename[:-len('.jsonl')]
+            if (since_day and day < since_day) or (until_day and day > until_day):
+                continue
+            
+            records = []
+            with open(os.path.join(self.snapshots_dir, filename), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if canteen is not None and str(record['canteen']) != str(canteen):
+                        continue
+                    if source and record.get('source') != source:
+                        continue
+                    if since_iso and record['ts'] < since_iso:
+                        continue
+                    if until_iso and record['ts'] >= until_iso:
+                        continue
+                    records.append(record)
+            records.sort(key=lambda r: r['ts'])
+            yield from records
+    
+    def iter_after(self, cursors: Dict[str, str], source: str = 'fridge') -> Iterator[Dict[str, Any]]:
+        """
+        Captures postérieures au curseur de leur cantine (traitements incrémentaux)
+        
+        Args:
+            cursors: {cantine: horodatage ISO de la dernière capture déjà traitée};
+                     mis à jour au fil de l'itération
+            source: Filtre endpoint
+        
+        Yields:
+            Enregistrements pas encore traités, par ordre chronologique
+        """
+        # Les jours antérieurs au plus petit curseur ne sont sautés que si
+        # chaque cantine du stockage a un curseur: une cantine sans curseur
+        # doit être lue depuis le début
+        known = self.canteens(source)
+        since = None
+        if cursors and known is not None and known <= set(cursors):
+            since = min(cursors[canteen] for canteen in known) if known else None
+        
+        seen = set()
+        for record in self.iter_snapshots(source=source, since=datetime.fromisoformat(since) if since else None):
+            canteen = str(record['canteen'])
+            seen.add(canteen)
+            if record['ts'] <= cursors.get(canteen, ''):
+                continue
+            yield record
+            cursors[canteen] = record['ts']
+        
+        if known is None:
+            # Parcours complet d'un stockage sans index: on le construit
+            self._mark_canteens(source, seen)
+            os.makedirs(os.path.join(self.canteens_dir, source), exist_ok=True)
+            open(os.path.join(self.canteens_dir, source, '.complete'), 'a').close()
+    
+    def latest(self, canteen: Union[int, str], source: str = 'fridge') -> Optional[Dict[str, Any]]:
+        """Dernier enregistrement d'une cantine"""
+        latest = None
+        for record in self.iter_snapshots(canteen=canteen, source=source):
+            latest = record
+        return latest
+    
+    def load_raw(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """Contenu brut exact d'une capture"""
+        return self.blobs.get(record['blob'])
+    
+    def load(self, record: Dict[str, Any]) -> Any:
+        """Contenu JSON décodé d'une capture"""
+        raw = self.load_raw(record)
+        return json.loads(raw) if raw is not None else None
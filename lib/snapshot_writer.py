@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Écriture atomique et groupée des fichiers de capture (cantine_<nom>_<date>.json).
+
+Chaque fichier est écrit dans un fichier temporaire du même dossier puis
+renommé: un lecteur (compare_cantines, generate_report) voit l'ancienne ou la
+nouvelle version, jamais un fichier tronqué. Les écritures sont regroupées:
+plusieurs captures du même fichier avant le vidage n'en font qu'une. Le lot
+est vidé quand il est plein, quand sa plus ancienne écriture atteint max_delay
+(minuterie, même si plus rien n'est écrit) ou à la fermeture. La
+synchronisation disque (fsync) suit une politique configurable:
+    
+    'always'  pas de lot: chaque capture est écrite aussitôt, fsync du
+              fichier puis de son dossier
+    'batch'   écriture au vidage du lot; chaque fichier a toujours son propre
+              fsync, seul le fsync du dossier est fait une fois par lot (défaut)
+    'never'   pas de fsync (le renommage reste atomique si le processus meurt)
+
+Le JSON est compact; orjson est utilisé s'il est installé, et une réponse
+brute (bytes) est écrite telle quelle, sans décodage ni ré-encodage.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Iterable, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+def dumps(payload: Union[bytes, str, Dict[str, Any], list]) -> bytes:
+    """JSON compact (orjson si disponible); bytes et str sont repris tels quels"""
+    if isinstance(payload, bytes):
+        return payload
+    if isinstance(payload, str):
+        return payload.encode('utf-8')
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _fsync_dir(directory: str):
+    """Rend durable le renommage (entrée du dossier)"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # Certains systèmes de fichiers refusent fsync sur un dossier
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: str, data: bytes, fsync: bool):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_snapshot(path: str, payload: Union[bytes, str, Dict[str, Any], list], fsync: str = 'batch') -> int:
+    """
+    Écrit un fichier immédiatement (atomique)
+    
+    Args:
+        path: Fichier final
+        payload: Réponse brute ou JSON décodé
+        fsync: Politique de synchronisation ('always', 'batch' ou 'never')
+    
+    Returns:
+        Taille écrite (octets)
+    """
+    data = dumps(payload)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    _write_file(path, data, fsync != 'never')
+    if fsync != 'never':
+        _fsync_dir(os.path.dirname(path))
+    return len(data)
+
+
+class SnapshotWriter:
+    """Écritures atomiques mises en lot, vidées par taille, par âge ou explicitement"""
+    
+    def __init__(self, fsync: str = 'batch', batch_size: int = 16, max_delay: float = 2.0):
+        """
+        Args:
+            fsync: 'always', 'batch' ou 'never'
+            batch_size: Fichiers en attente déclenchant un vidage
+            max_delay: Âge maximal (secondes) d'une écriture en attente
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Politique fsync inconnue: {fsync} (attendu: {', '.join(FSYNC_POLICIES)})")
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # Fichier -> contenu encodé (une nouvelle capture du même fichier remplace l'ancienne)
+        self._pending: Dict[str, bytes] = {}
+        self._oldest: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.stats = {'writes': 0, 'files': 0, 'coalesced': 0, 'bytes': 0, 'flushes': 0}
+    
+    def write(self, path: str, payload: Union[bytes, str, Dict[str, Any], list]):
+        """
+        Ajoute une écriture au lot (vidé si le lot est plein ou trop ancien)
+        
+        Args:
+            path: Fichier final
+            payload: Réponse brute (bytes, écrite telle quelle) ou JSON décodé
+        """
+        data = dumps(payload)
+        with self._lock:
+            self.stats['writes'] += 1
+            if path in self._pending:
+                self.stats['coalesced'] += 1
+            self._pending[path] = data
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._oldest >= self.max_delay
+                   or self.fsync == 'always')
+            if not due and self._timer is None:
+                # Vidage par âge même si plus rien n'est écrit ensuite
+                self._timer = threading.Timer(self.max_delay, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+    
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except OSError as e:
+            # Les fichiers non écrits restent en attente (prochaine écriture ou close())
+            print(f"   ❌ Écriture différée des captures: {e} ({len(self._pending)} fichier(s) en attente)")
+    
+    def flush(self) -> int:
+        """
+        Écrit les fichiers en attente
+        
+        Un fichier ne quitte le lot qu'une fois écrit: si une écriture échoue,
+        l'exception remonte et les fichiers restants restent en attente.
+        
+        Returns:
+            Nombre de fichiers écrits
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                self._oldest = None
+                return 0
+            
+            directories = set()
+            written = 0
+            for path in list(self._pending):
+                data = self._pending[path]
+                directory = os.path.dirname(path)
+                if directory not in directories:
+                    os.makedirs(directory or '.', exist_ok=True)
+                    directories.add(directory)
+                _write_file(path, data, self.fsync != 'never')
+                del self._pending[path]
+                written += 1
+                self.stats['files'] += 1
+                self.stats['bytes'] += len(data)
+            self._oldest = None
+            if self.fsync != 'never':
+                # Une synchronisation par dossier pour tout le lot
+                for directory in directories:
+                    _fsync_dir(directory)
+            
+            self.stats['flushes'] += 1
+            return written
+    
+    def pending(self) -> Iterable[str]:
+        """Fichiers pas encore écrits"""
+        with self._lock:
+            return list(self._pending)
+    
+    def close(self):
+        """Vide le lot"""
+        self.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
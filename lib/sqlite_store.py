@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Stockage SQLite (optionnel) des captures: cantines, produits, captures,
+observations de stock et événements DLC.
+
+La base est en mode WAL: un lecteur (rapport, tableau de bord) ne bloque pas
+l'écrivain (poller) et inversement. Chaque capture est insérée en une seule
+transaction; les requêtes par cantine et par produit passent par les index
+(canteen_id, ts) et (product_id, ts).
+
+Les événements DLC ('start' / 'end') sont relevés à l'insertion, par rapport
+à la capture précédente de la même cantine.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Union
+
+from snapshot_aggregates import ProductRecord, normalize_items
+
+DEFAULT_SQLITE_FILE = os.path.join('cantines_data', 'foodles.db')
+
+# À incrémenter quand le schéma change (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS canteens (
+    id INTEGER PRIMARY KEY,
+    short_name TEXT,
+    name TEXT,
+    address TEXT,
+    company TEXT
+);
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    category TEXT,
+    nutriscore TEXT,
+    vegetarian INTEGER
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    canteen_id INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    source TEXT NOT NULL,
+    blob TEXT,
+    products INTEGER,
+    units INTEGER,
+    UNIQUE (canteen_id, source, ts)
+);
+CREATE TABLE IF NOT EXISTS stock_observations (
+    snapshot_id INTEGER NOT NULL,
+    canteen_id INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    quantity INTEGER,
+    price INTEGER,
+    dlc INTEGER
+);
+CREATE TABLE IF NOT EXISTS dlc_events (
+    canteen_id INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    price INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_canteen_ts ON snapshots (canteen_id, ts);
+CREATE INDEX IF NOT EXISTS idx_observations_snapshot ON stock_observations (snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_observations_canteen_ts ON stock_observations (canteen_id, ts);
+CREATE INDEX IF NOT EXISTS idx_observations_product_ts ON stock_observations (product_id, ts);
+CREATE INDEX IF NOT EXISTS idx_dlc_events_canteen_ts ON dlc_events (canteen_id, ts);
+CREATE INDEX IF NOT EXISTS idx_dlc_events_product_ts ON dlc_events (product_id, ts);
+"""
+
+
+def _iso(ts: Union[datetime, str, None]) -> Optional[str]:
+    if ts is None or isinstance(ts, str):
+        return ts
+    # Même format que le SnapshotStore (microsecondes si non nulles)
+    return ts.isoformat()
+
+
+class SQLiteStore:
+    """Base SQLite des captures, partageable entre threads et processus"""
+    
+    def __init__(self, path: str = DEFAULT_SQLITE_FILE, timeout: float = 30.0):
+        """
+        Ouvre (ou crée) la base
+        
+        Args:
+            path: Fichier de la base
+            timeout: Attente maximale (secondes) si un autre écrivain tient le verrou
+        """
+        self.path = path
+        self.timeout = timeout
+        # Une connexion par thread (les connexions sqlite3 ne se partagent pas)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        
+        conn = self.conn
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with conn:
+                conn.executescript(SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connexion du thread courant"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL: synchronous=NORMAL reste cohérent après un crash (seule la dernière transaction peut manquer)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Ferme la connexion du thread courant"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    # ==================== ÉCRITURE ====================
+    
+    def upsert_canteens(self, canteens: Iterable[Dict[str, Any]]) -> int:
+        """
+        Copie les cantines (ex: CanteenRegistry) dans la base
+        
+        Returns:
+            Nombre de cantines écrites
+        """
+        rows = [(c['id'], c.get('short_name'), c.get('name'), c.get('address'), c.get('company'))
+                for c in canteens]
+        with self.conn as conn:
+            conn.executemany(
+                "INSERT INTO canteens (id, short_name, name, address, company) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET short_name=excluded.short_name, name=excluded.name, "
+                "address=excluded.address, company=excluded.company",
+                rows
+            )
+        return len(rows)
+    
+    def put_snapshot(self, canteen_id: int, data: Union[Dict[str, Any], List[ProductRecord]],
+                     ts: Union[datetime, str] = None, source: str = 'fridge', blob: str = None) -> Optional[int]:
+        """
+        Enregistre une capture en une transaction (capture, produits, stock, événements DLC)
+        
+        Args:
+            canteen_id: ID de la cantine
+            data: Réponse frigo décodée, ou produits déjà normalisés
+            ts: Horodatage, ou 'ts' de l'enregistrement du SnapshotStore (défaut: maintenant)
+            source: Endpoint d'origine
+            blob: Hash du blob dans le SnapshotStore (optionnel)
+        
+        Returns:
+            ID de la capture (None si elle était déjà enregistrée)
+        """
+        records = normalize_items(data) if isinstance(data, dict) else list(data)
+        ts_iso = _iso(ts or datetime.now())
+        
+        with self.conn as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO snapshots (canteen_id, ts, source, blob, products, units) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (canteen_id, ts_iso, source, blob, len(records), sum(r.quantity for r in records))
+            )
+            if not cursor.rowcount:
+                return None
+            snapshot_id = cursor.lastrowid
+            
+            conn.executemany(
+                "INSERT INTO products (id, name, category, nutriscore, vegetarian) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name=excluded.name, category=excluded.category, "
+                "nutriscore=excluded.nutriscore, vegetarian=excluded.vegetarian",
+                [(r.product, r.name, r.category, r.nutriscore, int('VEGETARIAN' not in r.diets)) for r in records]
+            )
+            conn.executemany(
+                "INSERT INTO stock_observations (snapshot_id, canteen_id, product_id, ts, quantity, price, dlc) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(snapshot_id, canteen_id, r.product, ts_iso, r.quantity, r.price, int(r.dlc)) for r in records]
+            )
+            
+            if source == 'fridge':
+                current = {r.product: (bool(r.dlc), r.price) for r in records}
+                previous = self._neighbour(conn, canteen_id, ts_iso, before=True)
+                before = self._observations(conn, previous['id']) if previous else {}
+                conn.executemany(
+                    "INSERT INTO dlc_events (canteen_id, product_id, ts, kind, price) VALUES (?, ?, ?, ?, ?)",
+                    self._dlc_changes(canteen_id, ts_iso, before, current)
+                )
+                following = self._neighbour(conn, canteen_id, ts_iso, before=False)
+                if following:
+                    # Capture insérée avant une capture déjà en base (import d'anciens
+                    # fichiers): les événements de la suivante sont recalculés
+                    conn.execute("DELETE FROM dlc_events WHERE canteen_id = ? AND ts = ?",
+                                 (canteen_id, following['ts']))
+                    conn.executemany(
+                        "INSERT INTO dlc_events (canteen_id, product_id, ts, kind, price) VALUES (?, ?, ?, ?, ?)",
+                        self._dlc_changes(canteen_id, following['ts'], current,
+                                          self._observations(conn, following['id']))
+                    )
+        return snapshot_id
+    
+    @staticmethod
+    def _neighbour(conn: sqlite3.Connection, canteen_id: int, ts_iso: str, before: bool) -> Optional[sqlite3.Row]:
+        """Capture frigo de la cantine juste avant (ou juste après) ts_iso"""
+        return conn.execute(
+            "SELECT id, ts FROM snapshots WHERE canteen_id = ? AND source = 'fridge' AND ts "
+            + ("< ? ORDER BY ts DESC" if before else "> ? ORDER BY ts ASC") + " LIMIT 1",
+            (canteen_id, ts_iso)
+        ).fetchone()
+    
+    @staticmethod
+    def _observations(conn: sqlite3.Connection, snapshot_id: int) -> Dict[str, Tuple[bool, Optional[int]]]:
+        """{produit: (DLC courte, prix)} d'une capture"""
+        return {row['product_id']: (bool(row['dlc']), row['price']) for row in conn.execute(
+            "SELECT product_id, dlc, price FROM stock_observations WHERE snapshot_id = ?", (snapshot_id,))}
+    
+    @staticmethod
+    def _dlc_changes(canteen_id: int, ts_iso: str, before: Dict[str, Tuple[bool, Optional[int]]],
+                     after: Dict[str, Tuple[bool, Optional[int]]]) -> List[tuple]:
+        """
+        Basculements du drapeau DLC entre deux captures de la cantine
+        
+        Un produit en DLC courte qui disparaît du frigo termine sa période
+        ('end', au dernier prix connu).
+        """
+        changes = []
+        for product, (dlc, price) in after.items():
+            was_dlc = before.get(product, (False, None))[0]
+            if dlc != was_dlc:
+                changes.append((canteen_id, product, ts_iso, 'start' if dlc else 'end', price))
+        for product, (was_dlc, price) in before.items():
+            if was_dlc and product not in after:
+                changes.append((canteen_id, product, ts_iso, 'end', price))
+        return changes
+    
+    def import_store(self, store, since: datetime = None) -> int:
+        """
+        Recopie les captures du SnapshotStore absentes de la base
+        
+        Args:
+            store: SnapshotStore
+            since: Ignorer les captures antérieures
+        
+        Returns:
+            Nombre de captures ajoutées
+        """
+        cursors = {str(row['canteen_id']): row['ts'] for row in self.conn.execute(
+            "SELECT canteen_id, MAX(ts) AS ts FROM snapshots WHERE source = 'fridge' GROUP BY canteen_id")}
+        since_iso = _iso(since)
+        decoded: Dict[str, List[ProductRecord]] = {}
+        added = 0
+        
+        for record in store.iter_after(cursors, source='fridge'):
+            if since_iso and record['ts'] < since_iso:
+                continue
+            canteen = str(record['canteen'])
+            if not canteen.isdigit():
+                continue
+            if record['blob'] not in decoded:
+                decoded[record['blob']] = normalize_items(store.load(record) or {})
+            if self.put_snapshot(int(canteen), decoded[record['blob']], ts=record['ts'], blob=record['blob']):
+                added += 1
+        return added
+    
+    # ==================== REQUÊTES ====================
+    
+    def canteens(self) -> List[Dict[str, Any]]:
+        """Cantines connues de la base"""
+        return [dict(row) for row in self.conn.execute("SELECT * FROM canteens ORDER BY id")]
+    
+    def latest_snapshot(self, canteen_id: int, source: str = 'fridge',
+                        before: datetime = None) -> Optional[Dict[str, Any]]:
+        """Dernière capture d'une cantine (avant 'before' si précisé)"""
+        row = self.conn.execute(
+            "SELECT * FROM snapshots WHERE canteen_id = ? AND source = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+            (canteen_id, source, _iso(before) or '9999')
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def snapshot_products(self, snapshot_id: int) -> List[Dict[str, Any]]:
+        """
+        Produits d'une capture
+        
+        Returns:
+            Dicts product, name, category, price (centimes), quantity, dlc, vegetarian, nutriscore
+        """
+        return [dict(row) for row in self.conn.execute(
+            "SELECT o.product_id AS product, p.name, p.category, o.price, o.quantity, o.dlc, "
+            "p.vegetarian, p.nutriscore "
+            "FROM stock_observations o JOIN products p ON p.id = o.product_id "
+            "WHERE o.snapshot_id = ? ORDER BY p.category, p.name",
+            (snapshot_id,)
+        )]
+    
+    def latest_products(self, canteen_ids: Iterable[int] = None, since: datetime = None) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Produits de la dernière capture de chaque cantine
+        
+        Args:
+            canteen_ids: Cantines (défaut: toutes celles de la base)
+            since: Ignorer les cantines sans capture depuis cette date
+        
+        Returns:
+            {canteen_id: produits (voir snapshot_products)}
+        """
+        if canteen_ids is None:
+            canteen_ids = [row[0] for row in self.conn.execute("SELECT DISTINCT canteen_id FROM snapshots")]
+        result = {}
+        for canteen_id in canteen_ids:
+            snapshot = self.latest_snapshot(canteen_id)
+            if snapshot and (since is None or snapshot['ts'] >= _iso(since)):
+                result[canteen_id] = self.snapshot_products(snapshot['id'])
+        return result
+    
+    def dlc_products(self, canteen_ids: Iterable[int] = None, since: datetime = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Produits en DLC courte de la dernière capture de chaque cantine"""
+        return {
+            canteen_id: [p for p in products if p['dlc']]
+            for canteen_id, products in self.latest_products(canteen_ids, since).items()
+        }
+    
+    def search_products(self, query: str, canteen_ids: Iterable[int] = None,
+                        since: datetime = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Produits dont le nom contient query, dans la dernière capture de chaque cantine"""
+        query = query.lower()
+        return {
+            canteen_id: [p for p in products if query in (p['name'] or '').lower()]
+            for canteen_id, products in self.latest_products(canteen_ids, since).items()
+        }
+    
+    def product_history(self, product_id: str, canteen_id: int = None, since: datetime = None,
+                        until: datetime = None) -> List[Dict[str, Any]]:
+        """
+        Observations d'un produit dans le temps (index (product_id, ts))
+        
+        Returns:
+            Dicts canteen_id, ts, quantity, price, dlc, par ordre chronologique
+        """
+        sql = "SELECT canteen_id, ts, quantity, price, dlc FROM stock_observations WHERE product_id = ?"
+        params: List[Any] = [product_id]
+        if canteen_id is not None:
+            sql += " AND canteen_id = ?"
+            params.append(canteen_id)
+        if since:
+            sql += " AND ts >= ?"
+            params.append(_iso(since))
+        if until:
+            sql += " AND ts < ?"
+            params.append(_iso(until))
+        return [dict(row) for row in self.conn.execute(sql + " ORDER BY ts", params)]
+    
+    def dlc_events(self, canteen_id: int = None, since: datetime = None) -> List[Dict[str, Any]]:
+        """Passages en DLC courte ('start') et sorties ('end'), par ordre chronologique"""
+        sql = ("SELECT e.canteen_id, e.product_id, p.name, e.ts, e.kind, e.price "
+               "FROM dlc_events e LEFT JOIN products p ON p.id = e.product_id WHERE 1")
+        params: List[Any] = []
+        if canteen_id is not None:
+            sql += " AND e.canteen_id = ?"
+            params.append(canteen_id)
+        if since:
+            sql += " AND e.ts >= ?"
+            params.append(_iso(since))
+        return [dict(row) for row in self.conn.execute(sql + " ORDER BY e.ts", params)]
+    
+    def period_stats(self, since: datetime = None, until: datetime = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Statistiques par cantine sur une période (mêmes champs que merge_aggregates)
+        
+        Returns:
+            {canteen_id: {'snapshots', 'total_produits', 'total_unites', 'prix_sum', 'prix_count',
+                          'prix_min', 'prix_max', 'dlc_observations', 'dlc_products'}}
+        """
+        params = [_iso(since) or '', _iso(until) or '9999']
+        stats = {
+            row['canteen_id']: {
+                'snapshots': row['snapshots'],
+                'total_produits': row['products'] or 0,
+                'total_unites': row['units'] or 0,
+            }
+            for row in self.conn.execute(
+                "SELECT canteen_id, COUNT(*) AS snapshots, SUM(products) AS products, SUM(units) AS units "
+                "FROM snapshots WHERE source = 'fridge' AND ts >= ? AND ts < ? GROUP BY canteen_id",
+                params
+            )
+        }
+        for row in self.conn.execute(
+            "SELECT canteen_id, SUM(CASE WHEN price > 0 THEN price END) AS prix_sum, "
+            "COUNT(CASE WHEN price > 0 THEN 1 END) AS prix_count, MIN(CASE WHEN price > 0 THEN price END) AS prix_min, "
+            "MAX(price) AS prix_max, SUM(dlc) AS dlc_observations, "
+            "COUNT(DISTINCT CASE WHEN dlc THEN product_id END) AS dlc_products "
+            "FROM stock_observations WHERE ts >= ? AND ts < ? GROUP BY canteen_id",
+            params
+        ):
+            if row['canteen_id'] in stats:
+                stats[row['canteen_id']].update({k: row[k] for k in row.keys() if k != 'canteen_id'})
+        for entry in stats.values():
+            entry['prix_sum'] = entry.get('prix_sum') or 0
+            entry.setdefault('prix_count', 0)
+            entry.setdefault('prix_min', None)
+            entry.setdefault('prix_max', None)
+            entry.setdefault('dlc_observations', 0)
+            entry.setdefault('dlc_products', 0)
+        return stats
+
+
+def main():
+    """Recopie le SnapshotStore dans la base SQLite et affiche son contenu"""
+    import argparse
+    from canteen_registry import CanteenRegistry
+    from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+    
+    parser = argparse.ArgumentParser(description="Base SQLite des captures")
+    parser.add_argument('--db', default=DEFAULT_SQLITE_FILE, help="Fichier de la base")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore à importer")
+    parser.add_argument('--no-import', action='store_true', help="Ne pas importer les nouvelles captures")
+    args = parser.parse_args()
+    
+    db = SQLiteStore(args.db)
+    db.upsert_canteens(CanteenRegistry())
+    if not args.no_import:
+        added = db.import_store(SnapshotStore(args.store_dir))
+        print(f"⚡ {added} capture(s) ajoutée(s) à {args.db}")
+    
+    names = {c['id']: c['short_name'] for c in db.canteens()}
+    print(f"\n🗄️  {args.db}")
+    for canteen_id, stats in sorted(db.period_stats().items()):
+        snapshot = db.latest_snapshot(canteen_id)
+        print(f"   {names.get(canteen_id, canteen_id)}: {stats['snapshots']} captures, "
+              f"{stats['dlc_products']} produits passés en DLC, dernière le {snapshot['ts'] if snapshot else '—'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Vitesse d'écoulement et prévision de rupture par produit et par cantine.
+
+Chaque capture du frigo donne une quantité par produit. La vitesse de vente
+(unités/heure) est une moyenne mobile exponentielle pondérée par le temps,
+mise à jour en O(1) à chaque observation; l'état est conservé dans
+cantines_data/store/forecast.json avec, par cantine, la dernière capture
+traitée: seules les nouvelles captures sont lues.
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Union
+
+from snapshot_aggregates import iter_items
+
+# À incrémenter quand le calcul change (invalide l'état)
+FORECAST_VERSION = 1
+
+DEFAULT_FORECAST_FILE = os.path.join('cantines_data', 'store', 'forecast.json')
+
+# Demi-vie de la moyenne (heures): une vente vieille d'une heure compte moitié moins
+DEFAULT_HALF_LIFE = 1.0
+
+# Au-delà de cet écart entre deux captures (nuit, week-end), pas de vitesse calculée
+DEFAULT_MAX_GAP = 3.0
+
+# En deçà (heures), deux captures sont trop proches pour mesurer une vitesse
+MIN_GAP = 1 / 60
+
+
+def product_key(item: Dict[str, Any]) -> str:
+    """Identifiant stable d'un produit (ID, sinon nom)"""
+    return str(item.get('id') or item.get('name', 'N/A'))
+
+
+class StockForecaster:
+    """Vitesses de vente par (cantine, produit), mises à jour incrémentalement"""
+    
+    def __init__(self, path: str = DEFAULT_FORECAST_FILE, half_life: float = DEFAULT_HALF_LIFE,
+                 max_gap: float = DEFAULT_MAX_GAP):
+        """
+        Charge l'état
+        
+        Args:
+            path: Fichier JSON de l'état
+            half_life: Demi-vie de la moyenne, en heures
+            max_gap: Écart maximal (heures) entre deux captures pour mesurer une vente
+        """
+        self.path = path
+        self.half_life = half_life
+        self.max_gap = max_gap
+        # 'cantine|produit' -> {'name', 'ts', 'qty', 'rate', 'n'}
+        self.products: Dict[str, Dict[str, Any]] = {}
+        # cantine -> horodatage ISO de la dernière capture traitée
+        self.cursors: Dict[str, str] = {}
+        self.observations = 0
+        self._dirty = False
+        
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('version') == FORECAST_VERSION:
+                    self.products = state.get('products', {})
+                    self.cursors = state.get('cursors', {})
+            except (OSError, ValueError):
+                # État corrompu: on repart de zéro
+                self.products = {}
+                self.cursors = {}
+    
+    def observe(self, canteen: Union[int, str], key: str, quantity: int, ts: float, name: str = None):
+        """
+        Ajoute une observation de quantité (O(1))
+        
+        Une baisse de stock entre deux captures rapprochées donne une vitesse
+        instantanée, lissée dans la moyenne. Un réassort ou un long écart
+        (nuit) repart de la nouvelle quantité sans toucher à la vitesse.
+        
+        Args:
+            canteen: ID de la cantine
+            key: Identifiant du produit
+            quantity: Quantité en stock
+            ts: Horodatage (secondes epoch)
+            name: Nom du produit (affichage)
+        """
+        state_key = f"{canteen}|{key}"
+        state = self.products.get(state_key)
+        self.observations += 1
+        self._dirty = True
+        
+        if state is None:
+            self.products[state_key] = {'name': name or key, 'ts': ts, 'qty': quantity, 'rate': None, 'n': 0}
+            return
+        
+        hours = (ts - state['ts']) / 3600
+        if hours < 0:
+            return
+        if hours < MIN_GAP:
+            # Captures quasi simultanées: la dernière quantité l'emporte, la
+            # vitesse sera mesurée depuis la capture précédente (ref_qty)
+            state.setdefault('ref_qty', state['qty'])
+            state['qty'] = quantity
+            if name:
+                state['name'] = name
+            return
+        reference = state.pop('ref_qty', state['qty'])
+        if hours <= self.max_gap and quantity <= reference:
+            instant = (reference - quantity) / hours
+            if state['rate'] is None:
+                state['rate'] = instant
+            else:
+                # Poids de la nouvelle mesure selon le temps écoulé
+                alpha = 1 - math.exp(-math.log(2) * hours / self.half_life)
+                state['rate'] += alpha * (instant - state['rate'])
+            state['n'] += 1
+        
+        state['ts'] = ts
+        state['qty'] = quantity
+        if name:
+            state['name'] = name
+    
+    def observe_snapshot(self, canteen: Union[int, str], data: Dict[str, Any], ts: datetime):
+        """Observe tous les produits d'une capture du frigo"""
+        epoch = ts.timestamp()
+        for _, item in iter_items(data):
+            self.observe(canteen, product_key(item), item.get('quantity', 0) or 0, epoch, item.get('name'))
+    
+    def update_from_store(self, store) -> int:
+        """
+        Traite les captures du SnapshotStore postérieures aux curseurs
+        
+        Les captures identiques (même blob) ne sont décodées qu'une fois.
+        
+        Args:
+            store: SnapshotStore
+        
+        Returns:
+            Nombre de captures traitées
+        """
+        decoded: Dict[str, List] = {}
+        processed = 0
+        
+        for record in store.iter_after(self.cursors, source='fridge'):
+            if record['blob'] not in decoded:
+                data = store.load(record) or {}
+                decoded[record['blob']] = [(product_key(item), item.get('quantity', 0) or 0, item.get('name'))
+                                           for _, item in iter_items(data)]
+            epoch = datetime.fromisoformat(record['ts']).timestamp()
+            for key, quantity, name in decoded[record['blob']]:
+                self.observe(record['canteen'], key, quantity, epoch, name)
+            processed += 1
+        
+        return processed
+    
+    @staticmethod
+    def _prediction(state_key: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        store_id, key = state_key.split('|', 1)
+        rate = state['rate']
+        hours_left = state['qty'] / rate if rate and state['qty'] > 0 else None
+        stockout_at = None
+        if hours_left is not None:
+            stockout_at = datetime.fromtimestamp(state['ts']) + timedelta(hours=hours_left)
+        return {
+            'canteen': store_id,
+            'product': key,
+            'name': state['name'],
+            'quantity': state['qty'],
+            'rate': rate,
+            'hours_left': hours_left,
+            'stockout_at': stockout_at,
+        }
+    
+    def forecast(self, canteen: Union[int, str] = None) -> List[Dict[str, Any]]:
+        """
+        Prévisions de rupture des produits en stock, les plus proches d'abord
+        
+        Args:
+            canteen: Filtre cantine (défaut: toutes)
+        
+        Returns:
+            Liste de dicts canteen, product, name, quantity, rate (unités/h),
+            hours_left et stockout_at (None si aucune vente mesurée)
+        """
+        prefix = f"{canteen}|" if canteen is not None else ''
+        latest = {c: datetime.fromisoformat(ts).timestamp() for c, ts in self.cursors.items()}
+        results = []
+        for state_key, state in self.products.items():
+            if not state_key.startswith(prefix) or state['qty'] <= 0:
+                continue
+            # Absent de la dernière capture de sa cantine: retiré ou épuisé
+            if state['ts'] < latest.get(state_key.split('|', 1)[0], 0):
+                continue
+            results.append(self._prediction(state_key, state))
+        return sorted(results, key=lambda r: (r['stockout_at'] is None, r['stockout_at'] or datetime.max))
+    
+    def lookup(self, canteen: Union[int, str], key: str) -> Optional[Dict[str, Any]]:
+        """Prévision d'un produit précis (None s'il n'a jamais été observé)"""
+        state_key = f"{canteen}|{key}"
+        state = self.products.get(state_key)
+        return self._prediction(state_key, state) if state else None
+    
+    def save(self):
+        """Écrit l'état sur disque (atomique) s'il a changé"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': FORECAST_VERSION, 'cursors': self.cursors, 'products': self.products},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def format_hours(hours: Optional[float]) -> str:
+    """Durée lisible ('45 min', '3h10', '—')"""
+    if hours is None:
+        return '—'
+    if hours < 1:
+        return f"{hours * 60:.0f} min"
+    return f"{int(hours)}h{int(hours * 60) % 60:02d}"
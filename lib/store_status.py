@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+État de plusieurs cantines à la fois: ouverture et panier.
+
+Les horaires (/ondemand/stores/{id}/opening/) changent rarement: ils sont
+gardés en cache dans cantines_data/openings.json et l'ouverture est calculée
+localement à partir de l'heure courante. "Quelles cantines sont ouvertes"
+ne fait donc aucun appel réseau. Les paniers sont demandés en parallèle.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterable
+
+from opening_hours import OpeningHours
+
+
+DEFAULT_OPENING_CACHE = os.path.join('cantines_data', 'openings.json')
+
+# Durée de validité des horaires en cache
+DEFAULT_OPENING_TTL = timedelta(hours=24)
+
+
+class StoreStatus:
+    """Ouverture (cache local) et paniers (en parallèle) de plusieurs cantines"""
+    
+    def __init__(self, api=None, cache_file: str = DEFAULT_OPENING_CACHE, workers: int = 8,
+                 ttl: timedelta = DEFAULT_OPENING_TTL):
+        """
+        Charge les horaires en cache
+        
+        Args:
+            api: Client FoodlesRealAPI (None: lecture du cache seulement)
+            cache_file: Fichier JSON des horaires
+            workers: Requêtes simultanées
+            ttl: Durée de validité des horaires
+        """
+        self.api = api
+        self.cache_file = cache_file
+        self.workers = workers
+        self.ttl = ttl
+        self.openings: Dict[int, Dict[str, Any]] = {}
+        self.errors: Dict[int, str] = {}
+        # Modèles construits une fois par réponse d'horaires
+        self._hours: Dict[int, Optional[OpeningHours]] = {}
+        
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self.openings = {int(k): v for k, v in json.load(f).get('openings', {}).items()}
+            except (OSError, ValueError):
+                # Cache corrompu: on repart de zéro
+                self.openings = {}
+    
+    def _fan_out(self, func, store_ids: List[int]) -> Dict[int, Any]:
+        """Appelle func(store_id) en parallèle; les erreurs vont dans self.errors"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {store_id: executor.submit(func, store_id) for store_id in store_ids}
+            for store_id, future in futures.items():
+                try:
+                    results[store_id] = future.result()
+                    self.errors.pop(store_id, None)
+                except Exception as e:
+                    # Une cantine en erreur n'empêche pas les autres
+                    self.errors[store_id] = str(e)
+        return results
+    
+    # ==================== HORAIRES ====================
+    
+    def is_stale(self, store_id: int, now: datetime = None) -> bool:
+        """Horaires absents, expirés, ou dépassés par l'horloge"""
+        entry = self.openings.get(store_id)
+        if entry is None:
+            return True
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(entry['fetched_at']) > self.ttl:
+            return True
+        hours = self.hours(store_id)
+        return hours is None or hours.is_open(now) is None
+    
+    def refresh_openings(self, store_ids: Iterable[int], force: bool = False) -> int:
+        """
+        Redemande en parallèle les horaires absents ou périmés
+        
+        Args:
+            store_ids: IDs des cantines
+            force: Redemander même les horaires encore valides
+        
+        Returns:
+            Nombre de cantines mises à jour
+        """
+        now = datetime.now()
+        todo = [int(s) for s in store_ids if force or self.is_stale(int(s), now)]
+        if not todo:
+            return 0
+        if self.api is None:
+            raise ValueError("Client API requis pour rafraîchir les horaires")
+        
+        fetched_at = datetime.now().isoformat(timespec='seconds')
+        results = self._fan_out(self.api.get_store_opening, todo)
+        for store_id, opening in results.items():
+            self.openings[store_id] = {'fetched_at': fetched_at, 'opening': opening}
+            self._hours.pop(store_id, None)
+        if results:
+            self.save()
+        return len(results)
+    
+    def hours(self, store_id: int) -> Optional[OpeningHours]:
+        """Modèle des horaires en cache (None si inconnus)"""
+        store_id = int(store_id)
+        if store_id not in self._hours:
+            entry = self.openings.get(store_id)
+            self._hours[store_id] = entry and OpeningHours.from_opening(
+                entry['opening'], datetime.fromisoformat(entry['fetched_at']))
+        return self._hours[store_id]
+    
+    def opening_status(self, store_id: int, now: datetime = None) -> Optional[Dict[str, Any]]:
+        """
+        Ouverture calculée depuis le cache (aucun appel réseau)
+        
+        Returns:
+            Dict is_open / next_opening / next_closing (None si horaires inconnus)
+        """
+        hours = self.hours(store_id)
+        if hours is None:
+            return None
+        return hours.status(now or datetime.now())
+    
+    def open_now(self, store_ids: Iterable[int] = None, now: datetime = None) -> List[int]:
+        """Cantines ouvertes à l'instant now, d'après le cache"""
+        now = now or datetime.now()
+        ids = store_ids if store_ids is not None else sorted(self.openings)
+        return [int(s) for s in ids if (self.opening_status(s, now) or {}).get('is_open')]
+    
+    # ==================== PANIERS ====================
+    
+    def fetch_carts(self, store_ids: Iterable[int], date: str = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Paniers de plusieurs cantines, demandés en parallèle
+        
+        Returns:
+            {store_id: panier} (les cantines en erreur sont dans self.errors)
+        """
+        if self.api is None:
+            raise ValueError("Client API requis pour demander les paniers")
+        return self._fan_out(lambda store_id: self.api.get_store_cart(store_id, date), [int(s) for s in store_ids])
+    
+    # ==================== VUE FUSIONNÉE ====================
+    
+    def overview(self, store_ids: Iterable[int], now: datetime = None,
+                 carts: bool = False) -> List[Dict[str, Any]]:
+        """
+        Vue fusionnée: une ligne par cantine avec ouverture et panier
+        
+        Args:
+            store_ids: IDs des cantines
+            now: Instant d'évaluation des horaires (défaut: maintenant)
+            carts: Demander aussi les paniers (seul appel réseau)
+        
+        Returns:
+            Liste de dicts store, is_open, next_opening, next_closing, cart, error
+        """
+        store_ids = [int(s) for s in store_ids]
+        now = now or datetime.now()
+        cart_by_store = self.fetch_carts(store_ids) if carts else {}
+        
+        rows = []
+        for store_id in store_ids:
+            status = self.opening_status(store_id, now) or {'is_open': None, 'next_opening': None, 'next_closing': None}
+            rows.append({
+                'store': store_id,
+                **status,
+                'cart': cart_by_store.get(store_id),
+                'error': self.errors.get(store_id),
+            })
+        return rows
+    
+    def save(self):
+        """Écrit les horaires en cache (atomique)"""
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'openings': {str(k): v for k, v in sorted(self.openings.items())}},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_file)
+
+
+def main():
+    """Affiche l'ouverture (et les paniers) des cantines du registre"""
+    import argparse
+    from dotenv import load_dotenv
+    from canteen_registry import CanteenRegistry
+    from foodles_real_api import FoodlesRealAPI
+    
+    parser = argparse.ArgumentParser(description="Ouverture et paniers des cantines Foodles")
+    parser.add_argument('--store', type=int, action='append', help="ID de cantine (défaut: tout le registre)")
+    parser.add_argument('--cache', default=DEFAULT_OPENING_CACHE, help="Fichier des horaires")
+    parser.add_argument('--carts', action='store_true', help="Demander aussi les paniers")
+    parser.add_argument('--refresh', action='store_true', help="Redemander tous les horaires")
+    parser.add_argument('--offline', action='store_true', help="Horaires en cache seulement")
+    parser.add_argument('--workers', type=int, default=8, help="Requêtes simultanées")
+    parser.add_argument('--base-url', help="URL de l'API (ex: serveur mock)")
+    args = parser.parse_args()
+    
+    registry = CanteenRegistry()
+    store_ids = args.store or registry.ids()
+    
+    api = None
+    if not args.offline:
+        load_dotenv()
+        api = FoodlesRealAPI(
+            session_id=os.getenv('FOODLES_SESSIONID'),
+            csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+            base_url=args.base_url,
+        )
+    
+    status = StoreStatus(api, args.cache, workers=args.workers)
+    if api:
+        updated = status.refresh_openings(store_ids, force=args.refresh)
+        print(f"🕐 {updated} horaire(s) mis à jour")
+    
+    print(f"\n🏢 {len(store_ids)} cantines")
+    for row in status.overview(store_ids, carts=args.carts and api is not None):
+        entry = registry.get(row['store'])
+        name = entry['short_name'] if entry else str(row['store'])
+        if row['is_open'] is None:
+            state = "❔ inconnu"
+        elif row['is_open']:
+            state = f"🟢 ouvert jusqu'à {row['next_closing'] or '?'}"
+        else:
+            state = f"🔴 fermé, ouvre {row['next_opening'] or '?'}"
+        cart = ''
+        if row['cart'] is not None:
+            cart = f" - panier: {len(row['cart'].get('items', []))} article(s)"
+        error = f" - ⚠️ {row['error']}" if row['error'] else ''
+        print(f"   {name:<15} {state}{cart}{error}")
+
+
+if __name__ == "__main__":
+    main()
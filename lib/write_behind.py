@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+File d'écriture différée (write-behind) pour les captures.
+
+Le code de récupération dépose la réponse brute dans une file bornée et
+repart aussitôt vers la requête suivante; un thread dédié décode, enregistre
+et calcule les statistiques. Les temps réseau et disque se recouvrent. Si le
+stockage prend du retard, la file se remplit et submit() attend qu'une place
+se libère (contre-pression): la mémoire reste bornée.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Dict, Any, Deque
+
+# Marqueur de fin pour le thread de traitement
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """File bornée traitée par un thread en arrière-plan"""
+    
+    def __init__(self, handler: Callable[[Any], None], maxsize: int = 16, name: str = 'write-behind',
+                 max_errors: int = 100):
+        """
+        Démarre le thread de traitement
+        
+        Args:
+            handler: Traitement d'un élément (décodage, stockage, index...)
+            maxsize: Éléments en attente au maximum (au-delà, submit() attend)
+            name: Nom du thread
+            max_errors: Erreurs gardées dans self.errors (les plus récentes)
+        """
+        self.handler = handler
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.errors: Deque[Dict[str, Any]] = deque(maxlen=max_errors)
+        # stats est modifié par submit() et par le thread de traitement
+        self._stats_lock = threading.Lock()
+        self.stats = {'submitted': 0, 'processed': 0, 'errors': 0, 'max_depth': 0,
+                      'blocked_seconds': 0.0, 'busy_seconds': 0.0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+    
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                start = time.perf_counter()
+                try:
+                    self.handler(item)
+                    outcome = 'processed'
+                except Exception as e:
+                    # Une capture en échec n'arrête pas les suivantes
+                    outcome = 'errors'
+                    # Clé seulement (pas la réponse brute): la liste reste petite
+                    key = item[0] if isinstance(item, tuple) and item else repr(item)[:80]
+                    self.errors.append({'key': key, 'error': e})
+                    print(f"   ❌ Enregistrement en arrière-plan: {e}")
+                with self._stats_lock:
+                    self.stats[outcome] += 1
+                    self.stats['busy_seconds'] += time.perf_counter() - start
+            finally:
+                self._queue.task_done()
+    
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """
+        Dépose un élément (attend si la file est pleine)
+        
+        Args:
+            item: Élément passé tel quel au handler
+            timeout: Attente maximale en secondes (None: sans limite)
+        
+        Raises:
+            RuntimeError: File fermée
+            queue.Full: Toujours pleine après timeout
+        """
+        if self._closed:
+            raise RuntimeError("File d'écriture fermée")
+        start = time.perf_counter()
+        self._queue.put(item, timeout=timeout)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.stats['blocked_seconds'] += time.perf_counter() - start
+            self.stats['submitted'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+    
+    def pending(self) -> int:
+        """Éléments en attente de traitement"""
+        return self._queue.qsize()
+    
+    def drain(self):
+        """Attend que tous les éléments déposés soient traités"""
+        self._queue.join()
+    
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Traite les éléments restants puis arrête le thread
+        
+        Args:
+            timeout: Attente maximale en secondes (None: jusqu'à la fin)
+        
+        Returns:
+            True si tout est traité, False si le thread tourne encore après timeout
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"   ⚠️  Enregistrement en arrière-plan inachevé après {timeout}s")
+            return False
+        return True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
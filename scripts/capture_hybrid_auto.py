@@ -7,11 +7,19 @@ Utilise Playwright pour les clics + HTTP direct pour les données
 import asyncio
 import json
 import os
+import sys
 import requests
 from datetime import datetime
+from pathlib import Path
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from canteen_registry import CanteenRegistry
+from snapshot_store import SnapshotStore
+from snapshot_writer import SnapshotWriter
+from write_behind import WriteBehindQueue
+
 load_dotenv()
 
 class HybridAutoCapture:
@@ -21,9 +29,14 @@ class HybridAutoCapture:
         
         self.data_dir = 'cantines_data'
         os.makedirs(self.data_dir, exist_ok=True)
+        self.snapshots = SnapshotStore(os.path.join(self.data_dir, 'store'))
+        # Fichiers cantine_*.json: écriture atomique, vidée en fin de scan
+        self.writer = SnapshotWriter()
         
         self.captured = {}
-        self.cantines = ['Copernic', 'Amazone', 'Hangar']
+        self.queue = None
+        self.registry = CanteenRegistry(os.path.join(self.data_dir, 'canteens.json'))
+        self.cantines = self.registry.short_names()
         
         # Client HTTP pour récupérer les données
         self.session = requests.Session()
@@ -49,72 +62,80 @@ class HybridAutoCapture:
             
             page = await context.new_page()
             
-            # Capturer chaque cantine
-            for cantine_name in self.cantines:
-                print(f"{'='*70}")
-                print(f"🔄 {cantine_name}")
-                print(f"{'='*70}")
-                
-                # Aller sur la page de sélection
-                print(f"   🌐 Navigation vers /canteen/select...")
-                await page.goto('https://app.foodles.co/canteen/select', wait_until='domcontentloaded')
-                await asyncio.sleep(2)
-                
-                # Chercher et cliquer
-                print(f"   🔍 Recherche de {cantine_name}...")
-                
-                clicked = False
-                selectors = [
-                    f'a:has-text("{cantine_name}")',
-                    f'button:has-text("{cantine_name}")',
-                    f'[role="button"]:has-text("{cantine_name}")',
-                ]
-                
-                for selector in selectors:
-                    try:
-                        elements = await page.locator(selector).all()
-                        for elem in elements:
-                            if await elem.is_visible():
-                                text = await elem.text_content()
-                                if text and cantine_name.lower() in text.lower():
-                                    print(f"   🎯 Trouvé: {selector}")
-                                    await elem.click()
-                                    print(f"   👆 Clic effectué")
-                                    clicked = True
-                                    break
-                        if clicked:
-                            break
-                    except:
+            # Décodage, stockage et stats en arrière-plan: la cantine suivante
+            # est demandée pendant que la précédente est enregistrée
+            self.queue = WriteBehindQueue(self.process_capture, maxsize=8, name='captures')
+            
+            try:
+                # Capturer chaque cantine
+                for cantine_name in self.cantines:
+                    print(f"{'='*70}")
+                    print(f"🔄 {cantine_name}")
+                    print(f"{'='*70}")
+                    
+                    # Aller sur la page de sélection
+                    print(f"   🌐 Navigation vers /canteen/select...")
+                    await page.goto('https://app.foodles.co/canteen/select', wait_until='domcontentloaded')
+                    await asyncio.sleep(2)
+                    
+                    # Chercher et cliquer
+                    print(f"   🔍 Recherche de {cantine_name}...")
+                    
+                    clicked = False
+                    selectors = [
+                        f'a:has-text("{cantine_name}")',
+                        f'button:has-text("{cantine_name}")',
+                        f'[role="button"]:has-text("{cantine_name}")',
+                    ]
+                    
+                    for selector in selectors:
+                        try:
+                            elements = await page.locator(selector).all()
+                            for elem in elements:
+                                if await elem.is_visible():
+                                    text = await elem.text_content()
+                                    if text and cantine_name.lower() in text.lower():
+                                        print(f"   🎯 Trouvé: {selector}")
+                                        await elem.click()
+                                        print(f"   👆 Clic effectué")
+                                        clicked = True
+                                        break
+                            if clicked:
+                                break
+                        except:
+                            continue
+                    
+                    if not clicked:
+                        print(f"   ❌ Non trouvée")
                         continue
-                
-                if not clicked:
-                    print(f"   ❌ Non trouvée")
-                    continue
-                
-                # Attendre la redirection
-                print(f"   ⏳ Attente de la redirection...")
-                await asyncio.sleep(4)
-                
-                # Maintenant récupérer les données via HTTP
-                print(f"   📡 Récupération des données via HTTP...")
-                try:
-                    response = self.session.get('https://api.foodles.co/api/fridge/', timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'categories' in data:
-                            self.save_data(cantine_name, data)
-                            print(f"✅ [{len(self.captured)}/3] {cantine_name} capturé!\n")
+                    
+                    # Attendre la redirection
+                    print(f"   ⏳ Attente de la redirection...")
+                    await asyncio.sleep(4)
+                    
+                    # Maintenant récupérer les données via HTTP
+                    print(f"   📡 Récupération des données via HTTP...")
+                    try:
+                        response = self.session.get('https://api.foodles.co/api/fridge/', timeout=10)
+                        if response.status_code == 200:
+                            # File pleine: on attend ici (contre-pression) sans bloquer la boucle asyncio
+                            await asyncio.to_thread(self.queue.submit, (cantine_name, response.content))
+                            print(f"   📥 Reçu ({len(response.content)} octets), enregistrement en arrière-plan\n")
                         else:
-                            print(f"⚠️  Données invalides\n")
-                    else:
-                        print(f"⚠️  Erreur HTTP {response.status_code}\n")
-                except Exception as e:
-                    print(f"⚠️  Erreur: {e}\n")
-                
-                await asyncio.sleep(1)
+                            print(f"⚠️  Erreur HTTP {response.status_code}\n")
+                    except Exception as e:
+                        print(f"⚠️  Erreur: {e}\n")
+                    
+                    await asyncio.sleep(1)
+            finally:
+                # Exception comprise: les captures déjà reçues sont enregistrées
+                self.queue.close()
+                self.writer.flush()
             
             print(f"{'='*70}")
-            print(f"🎉 TERMINÉ: {len(self.captured)}/3 cantines")
+            print(f"🎉 TERMINÉ: {len(self.captured)}/{len(self.cantines)} cantines")
+            print(f"⏱️  Enregistrement: {self.queue.stats['busy_seconds']:.2f}s en arrière-plan, "
+                  f"{self.queue.stats['blocked_seconds']:.2f}s d'attente côté réseau")
             print(f"{'='*70}\n")
             
             await asyncio.sleep(2)
@@ -122,13 +143,27 @@ class HybridAutoCapture:
         
         return len(self.captured)
     
-    def save_data(self, name, data):
+    def process_capture(self, item):
+        """Traitement en arrière-plan d'une réponse brute (thread de la file)"""
+        name, raw = item
+        data = json.loads(raw)
+        if 'categories' not in data:
+            print(f"⚠️  {name}: données invalides")
+            return
+        self.save_data(name, data, raw=raw)
+        print(f"✅ [{len(self.captured)}/{len(self.cantines)}] {name} capturé!")
+    
+    def save_data(self, name, data, raw=None):
         self.captured[name] = data
         
+        # Réponse brute dans le stockage dédupliqué (une écriture par contenu distinct)
+        entry = self.registry.get(name)
+        record = self.snapshots.put(entry['id'] if entry else name, raw if raw is not None else data)
+        
         date_str = datetime.now().strftime('%Y%m%d')
         filename = f"{self.data_dir}/cantine_{name}_{date_str}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if record['changed'] or not os.path.exists(filename):
+            self.writer.write(filename, raw if raw is not None else data)
         
         categories = data.get('categories', [])
         total_produits = sum(len(cat.get('items', []) or cat.get('products', [])) for cat in categories)
@@ -144,17 +179,20 @@ class HybridAutoCapture:
         )
         
         print(f"   📊 {total_produits} produits | {total_unites} unités | 🔥 {total_dlc} DLC")
-        print(f"   💾 {filename}")
+        if record['changed']:
+            print(f"   💾 {filename}")
+        else:
+            print(f"   ♻️  Inchangé depuis la dernière capture ({record['blob'][:12]})")
 
 async def main():
     capture = HybridAutoCapture()
     count = await capture.run()
     
-    if count == 3:
+    if count == len(capture.cantines):
         print("✅ SUCCÈS TOTAL!")
         print("📊 Lance: python scripts/generate_report.py")
     elif count > 0:
-        print(f"⚠️  {count}/3 cantines capturées")
+        print(f"⚠️  {count}/{len(capture.cantines)} cantines capturées")
     else:
         print("❌ Échec")
 
@@ -4,17 +4,30 @@ Script de comparaison des cantines Worldline
 Permet de basculer entre les cantines et générer un bilan comparatif
 """
 
+import argparse
+import copy
 import requests
 import json
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 from collections import defaultdict
 
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from canteen_registry import CanteenRegistry
+from columnar_export import PRODUCT_COLUMNS, AGGREGATE_COLUMNS, aggregate_rows, write_table
+from snapshot_aggregates import AggregateCache, content_hash
+from snapshot_loader import SnapshotLoader
+from snapshot_store import SnapshotStore
+from snapshot_writer import write_snapshot
+from sqlite_store import SQLiteStore, DEFAULT_SQLITE_FILE
+
 load_dotenv()
 
 class CantineComparator:
-    def __init__(self):
+    def __init__(self, db=None):
         self.sessionid = os.getenv('FOODLES_SESSIONID')
         self.csrftoken = os.getenv('FOODLES_CSRFTOKEN')
         self.headers = {
@@ -23,38 +36,49 @@ class CantineComparator:
             'Referer': 'https://app.foodles.co/'
         }
         
-        self.cantines = [
-            {'id': 2051, 'nom': 'Worldline Copernic', 'adresse': '3 rue Copernic, 41000 Blois'},
-            {'id': 2052, 'nom': 'Worldline Amazone', 'adresse': '5 rue Copernic, 41000 Blois'},
-            {'id': 2053, 'nom': 'Worldline Hangar', 'adresse': '11 rue Copernic, 41000 Blois'}
-        ]
-        
         # Chemin relatif au script parent
         script_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(script_dir)
         self.data_dir = os.path.join(project_root, 'cantines_data')
         os.makedirs(self.data_dir, exist_ok=True)
-    
-    def fetch_cantine_data(self, canteen_id, nom):
-        """Récupère les données d'une cantine"""
-        print(f"\n🔄 Récupération des données de {nom}...")
         
-        # Chercher d'abord les fichiers locaux existants
+        self.registry = CanteenRegistry(os.path.join(self.data_dir, 'canteens.json'))
+        self.cantines = [
+            {'id': c['id'], 'nom': c['name'], 'adresse': c.get('address', '')}
+            for c in self.registry
+        ]
+        self.snapshots = SnapshotStore(os.path.join(self.data_dir, 'store'))
+        self.aggregates = AggregateCache(os.path.join(self.data_dir, 'store', 'aggregates.json'))
+        # Base SQLite optionnelle (SQLiteStore): recherche sans relire les fichiers JSON
+        self.db = db
+    
+    def find_local_file(self, canteen_id, nom):
+        """Fichier local le plus récent d'une cantine (ou None)"""
         import glob
         
         # Recherche par ID numérique
         pattern_id = f"{self.data_dir}/cantine_{canteen_id}_*.json"
         files_id = glob.glob(pattern_id)
         
-        # Recherche par nom (pour Amazone, Hangar, etc.)
-        nom_short = nom.split()[-1]  # Prend le dernier mot (Copernic, Amazone, Hangar)
+        # Recherche par nom court du registre (Copernic, Amazone, Hangar...)
+        entry = self.registry.get(canteen_id)
+        nom_short = entry['short_name'] if entry else nom.split()[-1]
         pattern_name = f"{self.data_dir}/cantine_{nom_short}_*.json"
         files_name = glob.glob(pattern_name)
         
         # Prendre le fichier le plus récent
         all_files = files_id + files_name
         if all_files:
-            latest_file = max(all_files, key=os.path.getmtime)
+            return max(all_files, key=os.path.getmtime)
+        return None
+    
+    def fetch_cantine_data(self, canteen_id, nom):
+        """Récupère les données d'une cantine"""
+        print(f"\n🔄 Récupération des données de {nom}...")
+        
+        # Chercher d'abord les fichiers locaux existants
+        latest_file = self.find_local_file(canteen_id, nom)
+        if latest_file:
             print(f"✅ Utilisation des données locales: {os.path.basename(latest_file)}")
             with open(latest_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -74,10 +98,11 @@ class CantineComparator:
             if response.status_code == 200:
                 data = response.json()
                 
-                # Sauvegarder les données brutes
+                # Sauvegarder les données brutes (dédupliquées par contenu)
+                record = self.snapshots.put(canteen_id, response.content)
                 filename = f"{self.data_dir}/cantine_{canteen_id}_{datetime.now().strftime('%Y%m%d')}.json"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                if record['changed'] or not os.path.exists(filename):
+                    write_snapshot(filename, response.content)
                 
                 print(f"✅ Données récupérées et sauvegardées dans {filename}")
                 return data
@@ -173,6 +198,30 @@ class CantineComparator:
         
         return analysis
     
+    def load_analysis(self, canteen_id, nom):
+        """
+        Analyse d'une cantine, réutilisée depuis le cache tant que la
+        capture locale n'a pas changé (le JSON n'est alors pas décodé)
+        
+        Seule l'analyse de la dernière capture de chaque cantine est gardée:
+        elle contient la liste complète des produits.
+        """
+        latest_file = self.find_local_file(canteen_id, nom)
+        if not latest_file:
+            return self.analyze_cantine(self.fetch_cantine_data(canteen_id, nom), nom)
+        
+        print(f"\n🔄 Récupération des données de {nom}...")
+        print(f"✅ Utilisation des données locales: {os.path.basename(latest_file)}")
+        with open(latest_file, 'rb') as f:
+            raw = f.read()
+        
+        prefix = f"comparator:{nom}:"
+        key = prefix + content_hash(raw)
+        self.aggregates.discard_prefix(prefix, keep=key)
+        analysis = self.aggregates.get_or_compute(key, lambda: self.analyze_cantine(json.loads(raw), nom))
+        # Copie profonde: l'appelant peut modifier produits et catégories sans toucher au cache
+        return copy.deepcopy(analysis) if analysis else None
+    
     def compare_all(self):
         """Compare toutes les cantines"""
         print("╔════════════════════════════════════════════════════════════════════════╗")
@@ -183,12 +232,12 @@ class CantineComparator:
         
         # Récupérer et analyser chaque cantine
         for cantine in self.cantines:
-            data = self.fetch_cantine_data(cantine['id'], cantine['nom'])
-            if data:
-                analysis = self.analyze_cantine(data, cantine['nom'])
-                if analysis:
-                    analysis['adresse'] = cantine['adresse']
-                    analyses.append(analysis)
+            analysis = self.load_analysis(cantine['id'], cantine['nom'])
+            if analysis:
+                analysis['id'] = cantine['id']
+                analysis['adresse'] = cantine['adresse']
+                analyses.append(analysis)
+        self.aggregates.save()
         
         if not analyses:
             print("\n❌ Aucune donnée récupérée. Vérifie tes cookies et ta cantine active.")
@@ -252,54 +301,126 @@ class CantineComparator:
         
         # Sauvegarder le rapport
         report_file = f"{self.data_dir}/bilan_comparatif_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'date': datetime.now().isoformat(),
-                'cantines': analyses,
-                'top_products': all_products[:50]
-            }, f, indent=2, ensure_ascii=False)
+        write_snapshot(report_file, {
+            'date': datetime.now().isoformat(),
+            'cantines': analyses,
+            'top_products': all_products[:50]
+        })
+        
+        exported = self.export_columnar(analyses)
         
         print("\n" + "="*70)
         print(f"💾 Rapport sauvegardé: {report_file}")
+        for path in exported:
+            print(f"💾 Export colonnes: {path}")
         print("="*70)
     
+    def export_columnar(self, analyses, fmt=None, partition=False):
+        """
+        Exporte les produits et les agrégats par catégorie du bilan en colonnes
+        (Parquet, CSV sans pyarrow) dans cantines_data/exports/
+        
+        Args:
+            analyses: Analyses du bilan
+            fmt: 'parquet', 'arrow' ou 'csv'
+            partition: Partitionner par cantine et date
+        
+        Returns:
+            Chemins des fichiers écrits
+        """
+        now = datetime.now().replace(microsecond=0)
+        rows = [
+            {
+                'canteen_id': analysis.get('id'),
+                'canteen': analysis['nom'],
+                'ts': now,
+                'product': p['name'],
+                'name': p['name'],
+                'category': p['category'],
+                'price_cents': int(round(p['price'] * 100)),
+                'quantity': p['quantity'],
+                'dlc': None,
+                'vegetarian': p['vegetarian'],
+                'nutriscore': p['nutriscore'],
+            }
+            for analysis in analyses
+            for p in analysis['produits']
+        ]
+        
+        export_dir = os.path.join(self.data_dir, 'exports')
+        stamp = now.strftime('%Y%m%d_%H%M%S')
+        written = []
+        for table, columns, table_rows in (('produits', PRODUCT_COLUMNS, rows),
+                                           ('categories', AGGREGATE_COLUMNS, aggregate_rows(rows))):
+            if partition:
+                written += write_table(table_rows, columns, os.path.join(export_dir, f"bilan_{table}"), fmt,
+                                       partition_by=('canteen_id', 'date'), basename=f"bilan_{stamp}")
+            else:
+                written += write_table(table_rows, columns,
+                                       os.path.join(export_dir, f"bilan_{table}_{stamp}.parquet"), fmt)
+        return written
+    
     def show_products_comparison(self, product_name):
         """Compare un produit spécifique entre les cantines"""
         print(f"\n🔍 Recherche de '{product_name}' dans les cantines...\n")
         
+        if self.db is not None:
+            self.show_products_comparison_db(product_name)
+            return
+        
+        date_str = datetime.now().strftime('%Y%m%d')
+        files = [(f"{self.data_dir}/cantine_{cantine['id']}_{date_str}.json", cantine['nom'])
+                 for cantine in self.cantines]
+        
         found = False
-        for cantine in self.cantines:
-            filename = f"{self.data_dir}/cantine_{cantine['id']}_{datetime.now().strftime('%Y%m%d')}.json"
-            
-            if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                categories = data.get('categories', [])
-                for cat in categories:
-                    for p in cat.get('products', []):
-                        name = p.get('name', '')
-                        if product_name.lower() in name.lower():
-                            found = True
-                            price = p.get('price', {})
-                            if isinstance(price, dict):
-                                price_val = price.get('amount', 0) / 100
-                            else:
-                                price_val = price / 100
-                            
-                            print(f"🏢 {cantine['nom']}")
-                            print(f"   • {name}")
-                            print(f"   📦 Stock: {p.get('quantity', 0)} unités")
-                            print(f"   💰 Prix: {price_val:.2f}€")
-                            print(f"   🏷️  Nutriscore: {p.get('nutriscore', 'N/A')}")
-                            print()
+        # Fichiers décodés en parallèle; seuls les produits normalisés reviennent
+        for chunk in SnapshotLoader().iter_files((path, nom) for path, nom in files if os.path.exists(path)):
+            for _, nom, _, records in chunk:
+                for record in records:
+                    if product_name.lower() in record.name.lower():
+                        found = True
+                        print(f"🏢 {nom}")
+                        print(f"   • {record.name}")
+                        print(f"   📦 Stock: {record.quantity} unités")
+                        print(f"   💰 Prix: {record.price / 100:.2f}€")
+                        print(f"   🏷️  Nutriscore: {record.nutriscore or 'N/A'}")
+                        print()
         
         if not found:
             print(f"❌ Produit '{product_name}' non trouvé dans les cantines enregistrées")
+    
+    def show_products_comparison_db(self, product_name):
+        """Comme show_products_comparison, depuis la dernière capture du jour de chaque cantine en base"""
+        # Les scripts de capture n'écrivent que dans le SnapshotStore: la base est mise à jour avant lecture
+        added = self.db.import_store(self.snapshots)
+        if added:
+            print(f"⚡ SQLite: {added} nouvelle(s) capture(s) recopiée(s) dans {self.db.path}")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        names = {cantine['id']: cantine['nom'] for cantine in self.cantines}
+        results = self.db.search_products(product_name, names.keys(), since=today)
+        
+        found = False
+        for canteen_id, products in results.items():
+            for p in products:
+                found = True
+                print(f"🏢 {names[canteen_id]}")
+                print(f"   • {p['name']}")
+                print(f"   📦 Stock: {p['quantity']} unités")
+                print(f"   💰 Prix: {(p['price'] or 0) / 100:.2f}€")
+                print(f"   🏷️  Nutriscore: {p['nutriscore'] or 'N/A'}")
+                print()
+        
+        if not found:
+            print(f"❌ Produit '{product_name}' non trouvé dans {self.db.path}")
 
 
 def main():
-    comparator = CantineComparator()
+    parser = argparse.ArgumentParser(description="Comparateur de cantines")
+    parser.add_argument('--sqlite', nargs='?', const=DEFAULT_SQLITE_FILE, metavar='FICHIER',
+                        help="Rechercher les produits dans la base SQLite")
+    args = parser.parse_args()
+    
+    comparator = CantineComparator(SQLiteStore(args.sqlite) if args.sqlite else None)
     
     print("""
 ╔════════════════════════════════════════════════════════════════════════╗
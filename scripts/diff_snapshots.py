@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Ce qui a changé dans un frigo entre deux captures
+    
+    python scripts/diff_snapshots.py --cantine Hangar --de 11:00 --a 13:30
+    python scripts/diff_snapshots.py --cantine Hangar            # toute la journée, capture par capture
+    python scripts/diff_snapshots.py --fichiers avant.json apres.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from canteen_registry import CanteenRegistry
+from snapshot_diff import (CHANGE_KINDS, KIND_LABELS, SnapshotDiffer, diff_snapshots,
+                           format_change, group_changes, summarize)
+from snapshot_store import SnapshotStore, DEFAULT_STORE_DIR
+
+
+def format_summary(summary):
+    """Résumé d'une ligne: '3 ventes (5 unités), 1 prix...'"""
+    parts = []
+    for kind in CHANGE_KINDS:
+        if not summary[kind]:
+            continue
+        label = KIND_LABELS[kind].split(' ', 1)[1].strip().lower()
+        if kind == 'sold':
+            parts.append(f"{summary[kind]} {label} ({summary['units_sold']} unités)")
+        elif kind == 'restocked':
+            parts.append(f"{summary[kind]} {label} (+{summary['units_restocked']} unités)")
+        else:
+            parts.append(f"{summary[kind]} {label}")
+    return ', '.join(parts) if parts else "aucun changement"
+
+
+def display_changes(changes, limit=None):
+    """Affiche les changements regroupés par type"""
+    if not changes:
+        print("   Aucun changement\n")
+        return
+    for kind, group in group_changes(changes).items():
+        if not group:
+            continue
+        print(f"   {KIND_LABELS[kind]} ({len(group)})")
+        for change in group[:limit]:
+            print(f"      • {format_change(change)}")
+        if limit and len(group) > limit:
+            print(f"      … et {len(group) - limit} autre(s)")
+    print()
+
+
+def parse_time(day, value):
+    """HH:MM (ou HH:MM:SS) pour le jour donné"""
+    fmt = '%H:%M:%S' if value.count(':') == 2 else '%H:%M'
+    t = datetime.strptime(value, fmt)
+    return day.replace(hour=t.hour, minute=t.minute, second=t.second, microsecond=0)
+
+
+def _hm(record):
+    return record['ts'][11:16]
+
+
+def diff_range(differ, label, records, start, end, limit):
+    """Capture en vigueur à 'start' contre celle en vigueur à 'end'"""
+    before = differ.record_at(records, start)
+    after = differ.record_at(records, end)
+    print(f"📍 {label}: capture de {_hm(before)} → capture de {_hm(after)}")
+    changes = differ.diff(before, after)
+    print(f"   {format_summary(summarize(changes))}")
+    display_changes(changes, limit)
+
+
+def diff_day(differ, label, records, detail, limit):
+    """Chaque capture contre la précédente, puis bilan première → dernière"""
+    print(f"📍 {label}: {len(records)} captures, de {_hm(records[0])} à {_hm(records[-1])}")
+    for before, after, changes in differ.iter_day(records):
+        if not changes:
+            continue
+        print(f"   {_hm(before)} → {_hm(after)}: {format_summary(summarize(changes))}")
+        if detail:
+            display_changes(changes, limit)
+    
+    changes = differ.diff(records[0], records[-1])
+    print(f"\n   Bilan {_hm(records[0])} → {_hm(records[-1])}: {format_summary(summarize(changes))}")
+    display_changes(changes, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Différences entre captures du frigo")
+    parser.add_argument('--cantine', action='append', help="ID ou nom court (défaut: tout le registre)")
+    parser.add_argument('--date', help="Jour (AAAA-MM-JJ, défaut: aujourd'hui)")
+    parser.add_argument('--de', dest='start', help="Heure de début (HH:MM)")
+    parser.add_argument('--a', dest='end', help="Heure de fin (HH:MM, défaut: dernière capture)")
+    parser.add_argument('--detail', action='store_true', help="Liste les produits de chaque intervalle")
+    parser.add_argument('--limite', type=int, default=20, help="Produits affichés par type de changement")
+    parser.add_argument('--fichiers', nargs=2, metavar=('AVANT', 'APRES'), help="Compare deux fichiers JSON")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Dossier du SnapshotStore")
+    args = parser.parse_args()
+    
+    if args.fichiers:
+        with open(args.fichiers[0], 'r', encoding='utf-8') as f:
+            before = json.load(f)
+        with open(args.fichiers[1], 'r', encoding='utf-8') as f:
+            after = json.load(f)
+        changes = diff_snapshots(before, after)
+        print(f"📍 {os.path.basename(args.fichiers[0])} → {os.path.basename(args.fichiers[1])}")
+        print(f"   {format_summary(summarize(changes))}")
+        display_changes(changes, args.limite)
+        return
+    
+    day = datetime.strptime(args.date, '%Y-%m-%d') if args.date else datetime.now()
+    registry = CanteenRegistry()
+    entries = []
+    for key in args.cantine or registry.ids():
+        entry = registry.get(key)
+        entries.append((entry['id'], entry['short_name']) if entry else (key, str(key)))
+    
+    differ = SnapshotDiffer(SnapshotStore(args.store_dir))
+    print(f"🔍 Changements du {day:%d/%m/%Y}\n")
+    for canteen, label in entries:
+        records = differ.day_records(canteen, day)
+        if len(records) < 2:
+            if args.cantine:
+                print(f"⚠️  {label}: {len(records)} capture(s) ce jour, rien à comparer\n")
+            continue
+        if args.start or args.end:
+            start = parse_time(day, args.start) if args.start else datetime.fromisoformat(records[0]['ts'])
+            end = parse_time(day, args.end) if args.end else datetime.fromisoformat(records[-1]['ts'])
+            diff_range(differ, label, records, start, end, args.limite)
+        else:
+            diff_day(differ, label, records, args.detail, args.limite)
+
+if __name__ == '__main__':
+    main()
@@ -27,7 +27,7 @@ async def main():
         return 1
     
     print(f"\n{'='*70}")
-    print(f"✅ Capture terminée: {count}/3 cantines")
+    print(f"✅ Capture terminée: {count}/{len(capture.cantines)} cantines")
     print(f"{'='*70}\n")
     
     # Petite pause
@@ -36,8 +36,7 @@ async def main():
     # Étape 2 : Affichage des DLC
     print("\n🔥 ÉTAPE 2/2 : Analyse des produits en DLC courte\n")
     
-    cantines = ['Copernic', 'Amazone', 'Hangar']
-    products_dlc, _ = load_cantines_data()
+    products_dlc, cantines = load_cantines_data()
     
     if not products_dlc:
         print("ℹ️  Aucun produit en DLC courte aujourd'hui.")
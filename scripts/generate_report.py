@@ -3,27 +3,42 @@
 Scanner ultime - Utilise les fichiers déjà capturés pour générer un rapport complet
 """
 
+import argparse
 import json
 import os
 import glob
-from datetime import datetime
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from canteen_registry import CanteenRegistry
+from menu_prefetch import MenuPrefetcher, current_week, print_overview
+from snapshot_aggregates import AggregateCache, aggregate_records, compute_aggregates, merge_aggregates
+from snapshot_loader import SnapshotLoader
+from snapshot_store import SnapshotStore
+from sqlite_store import SQLiteStore, DEFAULT_SQLITE_FILE
+from stock_forecast import StockForecaster, format_hours
+
+load_dotenv()
 
 class ReportGenerator:
     def __init__(self):
         self.data_dir = 'cantines_data'
         self.cantines_data = {}
+        self.registry = CanteenRegistry(os.path.join(self.data_dir, 'canteens.json'))
+        self.aggregates = AggregateCache(os.path.join(self.data_dir, 'store', 'aggregates.json'))
+        self.forecaster = StockForecaster(os.path.join(self.data_dir, 'store', 'forecast.json'))
     
     def load_latest_data(self):
         """Charge les données les plus récentes de chaque cantine"""
         print("📂 Chargement des données existantes...")
         
-        cantines_map = {
-            'Copernic': ['2051', 'Copernic'],
-            'Amazone': ['2052', 'Amazone'],
-            'Hangar': ['2053', 'Hangar']
-        }
-        
-        for cantine_name, patterns_names in cantines_map.items():
+        for entry in self.registry:
+            cantine_name = entry['short_name']
+            patterns_names = self.registry.file_keys(entry)
+            
             # Chercher les fichiers de cette cantine
             patterns = []
             for pattern_name in patterns_names:
@@ -37,10 +52,10 @@ class ReportGenerator:
             if files:
                 # Prendre le fichier le plus récent
                 latest_file = max(files, key=os.path.getmtime)
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                # Lecture brute: le JSON n'est décodé que si les agrégats ne sont pas en cache
+                with open(latest_file, 'rb') as f:
                     self.cantines_data[cantine_name] = {
-                        'data': data,
+                        'raw': f.read(),
                         'file': latest_file
                     }
                 print(f"   ✅ {cantine_name}: {os.path.basename(latest_file)}")
@@ -49,12 +64,36 @@ class ReportGenerator:
         
         return len(self.cantines_data)
     
+    def update_forecasts(self):
+        """Intègre aux prévisions de rupture les captures de l'historique pas encore vues"""
+        store_dir = os.path.join(self.data_dir, 'store')
+        if not os.path.isdir(os.path.join(store_dir, 'snapshots')):
+            return 0
+        processed = self.forecaster.update_from_store(SnapshotStore(store_dir))
+        self.forecaster.save()
+        return processed
+    
+    def print_stockouts(self, cantine_name, limit=5):
+        """Affiche les prochaines ruptures prévues d'une cantine"""
+        entry = self.registry.get(cantine_name)
+        if not entry:
+            return
+        forecasts = [f for f in self.forecaster.forecast(entry['id']) if f['stockout_at']]
+        if not forecasts:
+            return
+        print(f"\n⏳ Ruptures prévues:")
+        for f in forecasts[:limit]:
+            print(f"   • {f['name']}: {f['quantity']} restants, {f['rate']:.1f}/h "
+                  f"→ rupture dans {format_hours(f['hours_left'])} ({f['stockout_at'].strftime('%H:%M')})")
+    
     def generate_full_report(self):
         """Génère un rapport complet et détaillé"""
         if not self.cantines_data:
             print("\n❌ Aucune donnée disponible")
             return
         
+        self.update_forecasts()
+        
         print("\n" + "="*80)
         print("📊 RAPPORT COMPLET DES CANTINES WORLDLINE")
         print("="*80 + "\n")
@@ -62,55 +101,8 @@ class ReportGenerator:
         all_stats = {}
         
         for cantine_name, info in self.cantines_data.items():
-            data = info['data']
-            categories = data.get('categories', [])
-            
-            stats = {
-                'total_produits': 0,
-                'total_unites': 0,
-                'produits_dlc': [],
-                'total_vegetarien': 0,
-                'prix_list': [],
-                'categories': {}
-            }
-            
-            for cat in categories:
-                cat_name = cat.get('name', 'Unknown')
-                # Support both 'items' and 'products' formats
-                items = cat.get('items', []) or cat.get('products', [])
-                
-                stats['categories'][cat_name] = {
-                    'produits': len(items),
-                    'unites': sum(item.get('quantity', 0) for item in items)
-                }
-                
-                for item in items:
-                    stats['total_produits'] += 1
-                    quantity = item.get('quantity', 0)
-                    stats['total_unites'] += quantity
-                    prix = item.get('price', 0)
-                    # Handle price as dict or number
-                    if isinstance(prix, dict):
-                        prix = prix.get('amount', 0)
-                    if prix and isinstance(prix, (int, float)):
-                        stats['prix_list'].append(prix)
-                    
-                    # Végétarien
-                    filter_reasons = item.get('filter_reasons', {}) or {}
-                    excluded_diets = filter_reasons.get('excluded_diets', []) if isinstance(filter_reasons, dict) else []
-                    if not excluded_diets or (len(excluded_diets) == 1 and 'PESCATARIAN' in excluded_diets):
-                        stats['total_vegetarien'] += 1
-                    
-                    # DLC
-                    if item.get('has_near_expiration_sale', False):
-                        stats['produits_dlc'].append({
-                            'nom': item.get('name', 'N/A'),
-                            'category': cat_name,
-                            'quantity': quantity,
-                            'price': prix
-                        })
-            
-            all_stats[cantine_name] = stats
+            all_stats[cantine_name] = self.aggregates.aggregates_for_raw(info['raw'])
+        self.aggregates.save()
         
         # Afficher les résultats
         for cantine_name, stats in all_stats.items():
@@ -121,9 +113,9 @@ class ReportGenerator:
                 print(f"\n{'='*80}\n")
                 continue
             
-            prix_moyen = sum(stats['prix_list']) / len(stats['prix_list']) if stats['prix_list'] else 0
-            prix_min = min(stats['prix_list']) if stats['prix_list'] else 0
-            prix_max = max(stats['prix_list']) if stats['prix_list'] else 0
+            prix_moyen = stats['prix_sum'] / stats['prix_count'] if stats['prix_count'] else 0
+            prix_min = stats['prix_min'] or 0
+            prix_max = stats['prix_max'] or 0
             pct_veg = (stats['total_vegetarien'] / stats['total_produits'] * 100) if stats['total_produits'] > 0 else 0
             
             print(f"🏢 WORLDLINE {cantine_name.upper()}")
@@ -150,6 +142,8 @@ class ReportGenerator:
             else:
                 print(f"\n✅ Aucun produit en DLC courte")
             
+            self.print_stockouts(cantine_name)
+            
             print(f"\n{'='*80}\n")
         
         # Comparaison globale
@@ -183,8 +177,134 @@ class ReportGenerator:
         print(f"   • {total_all_unites} unités en stock")
         print(f"   • {total_all_dlc} produits en DLC courte")
         print(f"{'='*80}\n")
+    
+    def generate_period_report(self, days=7, db=None):
+        """
+        Rapport sur une période à partir de l'historique des captures
+        
+        Combine les agrégats en cache de chaque capture: seules les
+        captures jamais vues sont décodées. Avec une base SQLite (db), les
+        nouvelles captures y sont recopiées et les totaux viennent d'une
+        requête indexée.
+        """
+        store = SnapshotStore(os.path.join(self.data_dir, 'store'))
+        since = datetime.now() - timedelta(days=days)
+        
+        if db is not None:
+            added = db.import_store(store)
+            by_cantine = {}
+            for canteen_id, stats in db.period_stats(since).items():
+                entry = self.registry.get(canteen_id)
+                by_cantine[entry['short_name'] if entry else str(canteen_id)] = stats
+        else:
+            by_cantine = {
+                cantine_name: self._period_stats(merge_aggregates(parts))
+                for cantine_name, parts in self._period_aggregates(store, since).items()
+            }
+        
+        print("\n" + "="*80)
+        print(f"📅 RAPPORT SUR {days} JOURS (depuis le {since.strftime('%d/%m/%Y')})")
+        print("="*80 + "\n")
+        
+        if not by_cantine:
+            print("❌ Aucune capture dans l'historique sur cette période")
+            return {}
+        
+        for cantine_name, stats in sorted(by_cantine.items()):
+            n = stats['snapshots']
+            prix_moyen = stats['prix_sum'] / stats['prix_count'] if stats['prix_count'] else 0
+            
+            print(f"🏢 {cantine_name}")
+            print(f"{'─'*80}")
+            print(f"📸 Captures: {n}")
+            print(f"📦 Produits par capture (moyenne): {stats['total_produits'] / n:.1f}")
+            print(f"📊 Unités par capture (moyenne): {stats['total_unites'] / n:.1f}")
+            if prix_moyen > 0:
+                print(f"💰 Prix moyen: {prix_moyen:.2f}€ ({stats['prix_min']:.2f}€ - {stats['prix_max']:.2f}€)")
+            print(f"🔥 DLC courte: {stats['dlc_observations']} observations, {stats['dlc_products']} produits distincts")
+            print()
+        
+        if db is not None:
+            print(f"⚡ SQLite: {added} nouvelle(s) capture(s) recopiée(s) dans {db.path}")
+        else:
+            print(f"⚡ Cache: {self.aggregates.hits} agrégats réutilisés, {self.aggregates.misses} calculés")
+        return by_cantine
+    
+    def _period_aggregates(self, store, since):
+        """Agrégats de chaque capture de la période, par cantine"""
+        records = list(store.iter_snapshots(source='fridge', since=since))
+        
+        # Captures jamais vues: décodées en parallèle (pool de processus)
+        missing = {}
+        for record in records:
+            if record['blob'] not in self.aggregates.entries:
+                missing.setdefault(record['blob'], record)
+        computed = {}
+        for chunk in SnapshotLoader().iter_store(store, missing.values()):
+            for key, _, _, products in chunk:
+                blob_hash = key.rsplit(':', 1)[1]
+                computed[blob_hash] = self.aggregates.get_or_compute(
+                    blob_hash, lambda products=products: aggregate_records(products))
+        
+        by_cantine = {}
+        for record in records:
+            stats = computed.pop(record['blob'], None) or self.aggregates.get_or_compute(
+                record['blob'],
+                lambda record=record: compute_aggregates(store.load(record))
+            )
+            entry = self.registry.get(record['canteen'])
+            by_cantine.setdefault(entry['short_name'] if entry else str(record['canteen']), []).append(stats)
+        self.aggregates.save()
+        return by_cantine
+    
+    @staticmethod
+    def _period_stats(merged):
+        """Agrégats combinés -> totaux de la période (même forme que SQLiteStore.period_stats)"""
+        return {
+            'snapshots': merged['snapshots'],
+            'total_produits': merged['total_produits'],
+            'total_unites': merged['total_unites'],
+            'prix_sum': merged['prix_sum'],
+            'prix_count': merged['prix_count'],
+            'prix_min': merged['prix_min'],
+            'prix_max': merged['prix_max'],
+            'dlc_observations': len(merged['produits_dlc']),
+            'dlc_products': len({p['nom'] for p in merged['produits_dlc']}),
+        }
+    
+    def generate_week_report(self, api=None):
+        """
+        Menus de la semaine par cantine, depuis le cache des menus
+        
+        Seuls les couples (cantine, jour) absents du cache sont demandés,
+        en parallèle; sans client API, le rapport se contente du cache.
+        """
+        prefetcher = MenuPrefetcher(api, os.path.join(self.data_dir, 'menus.json'))
+        days = current_week()
+        if api:
+            stats = prefetcher.prefetch(self.registry.ids(), days)
+            prefetcher.save()
+            print(f"⚡ Menus: {stats['cached']} en cache, {stats['fetched']} téléchargés, {stats['errors']} erreurs, "
+                  f"{stats['skipped']} échecs récents non redemandés")
+        
+        print("\n" + "="*80)
+        print("🗓️  MENUS DE LA SEMAINE")
+        print("="*80)
+        overview = prefetcher.overview(self.registry.ids(), days)
+        print_overview(overview, {entry['id']: entry['short_name'] for entry in self.registry})
+        print()
+        return overview
 
 def main():
+    parser = argparse.ArgumentParser(description="Rapport des cantines Foodles")
+    parser.add_argument('--jours', type=int, default=0,
+                        help="Rapport sur l'historique des N derniers jours (au lieu du dernier état)")
+    parser.add_argument('--sqlite', nargs='?', const=DEFAULT_SQLITE_FILE, metavar='FICHIER',
+                        help="Rapport --jours depuis la base SQLite (recopie les nouvelles captures)")
+    parser.add_argument('--semaine', action='store_true',
+                        help="Menus de la semaine (cache des menus, complété via l'API si connecté)")
+    args = parser.parse_args()
+    
     print()
     print("╔════════════════════════════════════════════════════════════════════════╗")
     print("║            📊 GÉNÉRATEUR DE RAPPORT AUTOMATIQUE                        ║")
@@ -192,6 +312,20 @@ def main():
     print()
     
     generator = ReportGenerator()
+    
+    if args.jours:
+        generator.generate_period_report(args.jours, SQLiteStore(args.sqlite) if args.sqlite else None)
+        return
+    
+    if args.semaine:
+        api = None
+        if os.getenv('FOODLES_SESSIONID'):
+            from foodles_real_api import FoodlesRealAPI
+            api = FoodlesRealAPI(session_id=os.getenv('FOODLES_SESSIONID'),
+                                 csrf_token=os.getenv('FOODLES_CSRFTOKEN'))
+        generator.generate_week_report(api)
+        return
+    
     count = generator.load_latest_data()
     
     if count == 0:
@@ -200,8 +334,8 @@ def main():
     else:
         generator.generate_full_report()
         
-        if count < 3:
-            print(f"💡 Tu as {count}/3 cantines. Pour capturer les manquantes:")
+        if count < len(generator.registry):
+            print(f"💡 Tu as {count}/{len(generator.registry)} cantines. Pour capturer les manquantes:")
             print("   python capture_manual_cantine.py")
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test de charge contre le serveur mock Foodles
+Simule N fois notre nombre réel de cantines, avec latence et erreurs injectées:
+    
+    1. scan concurrent des frigos (get_canteen_fridge en parallèle)
+    2. file de capture: réponses déposées dans la WriteBehindQueue, stockées
+       (SnapshotStore) et écrites (SnapshotWriter) en arrière-plan
+    3. poller: passes FridgePoller.tick (cantine active + frigo, horaires)
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+
+import requests
+from canteen_registry import CanteenRegistry
+from foodles_real_api import FoodlesRealAPI
+from mock_foodles_server import FixtureSet, MockFoodlesServer
+from poll_fridges import FridgePoller
+from snapshot_store import SnapshotStore
+from snapshot_writer import SnapshotWriter
+from store_status import StoreStatus
+from write_behind import WriteBehindQueue
+
+REAL_CANTEEN_COUNT = len(CanteenRegistry())
+
+
+def percentile(values, pct):
+    """Percentile simple (valeurs triées)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def scan_once(api, canteen_ids, workers):
+    """
+    Scanne toutes les cantines en parallèle
+    
+    Returns:
+        Tuple (latences en secondes, nombre d'erreurs)
+    """
+    def fetch(canteen_id):
+        start = time.perf_counter()
+        try:
+            api.get_canteen_fridge(canteen_id)
+            return time.perf_counter() - start, None
+        except requests.RequestException as e:
+            return time.perf_counter() - start, e
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, canteen_ids))
+    
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, error in results if error is not None)
+    return latencies, errors
+
+
+def capture_once(api, canteen_ids, workers, work_dir, queue_size):
+    """
+    Chaîne de capture: réseau en parallèle, stockage et écriture en arrière-plan
+    
+    Returns:
+        Tuple (durée en secondes, erreurs réseau, stats de la file, stats de l'écriture)
+    """
+    store = SnapshotStore(os.path.join(work_dir, 'store'))
+    writer = SnapshotWriter()
+    
+    def enregistrer(item):
+        canteen_id, data = item
+        record = store.put(canteen_id, data)
+        filename = os.path.join(work_dir, f"cantine_{canteen_id}.json")
+        if record['changed'] or not os.path.exists(filename):
+            writer.write(filename, data)
+    
+    errors = 0
+    start = time.perf_counter()
+    queue = WriteBehindQueue(enregistrer, maxsize=queue_size, name='load-test')
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(api.get_canteen_fridge, canteen_id): canteen_id
+                       for canteen_id in canteen_ids}
+            for future in as_completed(futures):
+                try:
+                    queue.submit((futures[future], future.result()))
+                except requests.RequestException:
+                    errors += 1
+    finally:
+        queue.close()
+        writer.close()
+    return time.perf_counter() - start, errors, dict(queue.stats), dict(writer.stats)
+
+
+def poll_rounds(server_url, canteen_ids, rounds, interval, work_dir):
+    """
+    Passes du poller (séquentiel: une session, cantine active changée à chaque frigo)
+    
+    Chaque passe avance l'horloge d'un intervalle: toutes les cantines sont à échéance.
+    
+    Returns:
+        Liste de (durée en secondes, captures, erreurs) par passe
+    """
+    api = FoodlesRealAPI(session_id='loadtest-poller', csrf_token='loadtest', base_url=server_url)
+    status = StoreStatus(api, cache_file=os.path.join(work_dir, 'opening.json'))
+    poller = FridgePoller(api, status, SnapshotStore(os.path.join(work_dir, 'store')), canteen_ids,
+                          interval=interval, fast_interval=interval)
+    results = []
+    now = datetime.now()
+    for _ in range(rounds):
+        polls, errors = poller.stats['polls'], poller.stats['errors']
+        start = time.perf_counter()
+        # Une ligne par capture: sortie masquée, les compteurs suffisent
+        with contextlib.redirect_stdout(io.StringIO()):
+            poller.tick(now)
+        results.append((time.perf_counter() - start, poller.stats['polls'] - polls,
+                        poller.stats['errors'] - errors))
+        now += timedelta(seconds=interval)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du scan Foodles (serveur mock)")
+    parser.add_argument('--multiplier', type=int, default=100,
+                        help=f"Multiplicateur du nombre réel de cantines ({REAL_CANTEEN_COUNT})")
+    parser.add_argument('--rounds', type=int, default=5, help="Nombre de scans complets")
+    parser.add_argument('--workers', type=int, default=32, help="Requêtes en parallèle")
+    parser.add_argument('--latency', type=float, default=0.05, help="Latence serveur (s)")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Variation de latence (s)")
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Taux d'erreurs injectées")
+    parser.add_argument('--queue-size', type=int, default=8, help="Taille de la file d'écriture")
+    parser.add_argument('--poll-stores', type=int, default=100, help="Cantines suivies par le poller")
+    parser.add_argument('--poll-rounds', type=int, default=3, help="Passes du poller")
+    args = parser.parse_args()
+    
+    count = REAL_CANTEEN_COUNT * args.multiplier
+    fixtures = FixtureSet.synthesize(count)
+    # Ouvert en continu: le poller capture à chaque passe au lieu d'attendre l'ouverture
+    always_open = {'opening_hours': [{'day': day, 'start': '00:00', 'end': '00:00'} for day in range(7)]}
+    for canteen_id in fixtures.canteen_ids:
+        fixtures.openings[canteen_id] = always_open
+    
+    print("╔════════════════════════════════════════════════════════════════════════╗")
+    print("║              🧪 TEST DE CHARGE - SERVEUR MOCK FOODLES                  ║")
+    print("╚════════════════════════════════════════════════════════════════════════╝\n")
+    print(f"   🏢 {count} cantines | 🔀 {args.workers} workers | 🔁 {args.rounds} scans")
+    print(f"   ⏱️  Latence {args.latency * 1000:.0f}ms ±{args.jitter * 1000:.0f}ms | ❌ {args.error_rate:.1%} erreurs\n")
+    
+    with MockFoodlesServer(fixtures, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, seed=1) as server:
+        api = FoodlesRealAPI(session_id='loadtest', csrf_token='loadtest', base_url=server.url)
+        # Un pool HTTP assez grand pour les workers
+        adapter = requests.adapters.HTTPAdapter(pool_connections=args.workers, pool_maxsize=args.workers)
+        api.session.mount('http://', adapter)
+        
+        all_latencies = []
+        total_errors = 0
+        started = time.perf_counter()
+        
+        for round_index in range(1, args.rounds + 1):
+            round_start = time.perf_counter()
+            latencies, errors = scan_once(api, fixtures.canteen_ids, args.workers)
+            elapsed = time.perf_counter() - round_start
+            all_latencies.extend(latencies)
+            total_errors += errors
+            print(f"   [{round_index}/{args.rounds}] {len(latencies)} requêtes en {elapsed:.2f}s "
+                  f"({len(latencies) / elapsed:.0f} req/s) | p95 {percentile(latencies, 95) * 1000:.0f}ms "
+                  f"| {errors} erreurs")
+        
+        total = time.perf_counter() - started
+        all_latencies.sort()
+        
+        with tempfile.TemporaryDirectory() as work_dir:
+            print(f"\n   📥 File de capture ({args.queue_size} places)...")
+            elapsed, capture_errors, queue_stats, writer_stats = capture_once(
+                api, fixtures.canteen_ids, args.workers, work_dir, args.queue_size)
+            print(f"   {queue_stats['processed']} captures enregistrées en {elapsed:.2f}s "
+                  f"({queue_stats['processed'] / elapsed:.0f}/s) | {capture_errors} erreurs réseau "
+                  f"| {queue_stats['errors']} erreurs d'enregistrement")
+            print(f"   file: profondeur max {queue_stats['max_depth']}, "
+                  f"{queue_stats['blocked_seconds']:.2f}s d'attente côté réseau, "
+                  f"{queue_stats['busy_seconds']:.2f}s de traitement | "
+                  f"{writer_stats['files']} fichiers en {writer_stats['flushes']} lots")
+            
+            poll_ids = fixtures.canteen_ids[:args.poll_stores]
+            print(f"\n   ⏰ Poller: {len(poll_ids)} cantines, {args.poll_rounds} passes...")
+            for index, (elapsed, polls, errors) in enumerate(
+                    poll_rounds(server.url, poll_ids, args.poll_rounds, 300, work_dir), 1):
+                print(f"   [{index}/{args.poll_rounds}] {polls} captures en {elapsed:.2f}s "
+                      f"({polls / elapsed:.0f}/s) | {errors} erreurs")
+    
+    print(f"\n{'='*70}")
+    print("📊 RÉSULTATS")
+    print(f"{'='*70}")
+    print(f"   • Requêtes: {len(all_latencies)} en {total:.2f}s ({len(all_latencies) / total:.0f} req/s)")
+    print(f"   • Latence p50/p95/p99: {percentile(all_latencies, 50) * 1000:.0f} / "
+          f"{percentile(all_latencies, 95) * 1000:.0f} / {percentile(all_latencies, 99) * 1000:.0f} ms")
+    print(f"   • Erreurs: {total_errors} ({total_errors / max(1, len(all_latencies)):.1%})")
+    print(f"   • Requêtes reçues par le mock:")
+    for route, hits in sorted(server.stats.items()):
+        print(f"      - {route}: {hits}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Surveillance des frigos au rythme des horaires d'ouverture
+
+Chaque cantine a sa propre échéance: en pause quand elle est fermée (réveil
+à la prochaine ouverture), intervalle normal pendant le service, intervalle
+court à l'approche de la fermeture. Les captures vont dans le SnapshotStore.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+
+from dotenv import load_dotenv
+from canteen_registry import CanteenRegistry
+from foodles_real_api import FoodlesRealAPI
+from snapshot_store import SnapshotStore
+from sqlite_store import SQLiteStore, DEFAULT_SQLITE_FILE
+from store_status import StoreStatus
+
+load_dotenv()
+
+
+class FridgePoller:
+    """Capture des frigos, une échéance par cantine selon ses horaires"""
+    
+    def __init__(self, api, status: StoreStatus, store: SnapshotStore, store_ids,
+                 interval: int = 300, fast_interval: int = 60, rush_minutes: int = 30,
+                 unknown_interval: int = 900, db: SQLiteStore = None):
+        """
+        Args:
+            api: Client FoodlesRealAPI authentifié
+            status: Horaires des cantines (cache local)
+            store: Historique des captures
+            store_ids: Cantines à surveiller
+            interval: Secondes entre deux captures pendant le service
+            fast_interval: Secondes entre deux captures avant la fermeture
+            rush_minutes: Fenêtre avant la fermeture où l'on accélère
+            unknown_interval: Secondes entre deux captures si les horaires sont inconnus
+            db: Base SQLite alimentée en plus du SnapshotStore (optionnel)
+        """
+        self.api = api
+        self.status = status
+        self.store = store
+        self.store_ids = [int(s) for s in store_ids]
+        self.interval = timedelta(seconds=interval)
+        self.fast_interval = timedelta(seconds=fast_interval)
+        self.rush = timedelta(minutes=rush_minutes)
+        self.unknown_interval = timedelta(seconds=unknown_interval)
+        self.db = db
+        self.due = {store_id: None for store_id in self.store_ids}
+        self.stats = {'polls': 0, 'errors': 0, 'pauses': 0, 'avoided': 0}
+    
+    def schedule(self, store_id: int, now: datetime) -> datetime:
+        """
+        Prochaine capture d'une cantine
+        
+        Fermée: réveil à l'ouverture (les captures évitées sont comptées).
+        Ouverte: intervalle normal, ou court si la fermeture approche.
+        """
+        hours = self.status.hours(store_id)
+        is_open = hours.is_open(now) if hours else None
+        
+        if is_open is None:
+            return now + self.unknown_interval
+        
+        if not is_open:
+            wake_up = hours.next_opening(now)
+            if wake_up is None:
+                # Jamais ouverte d'après les horaires: on revérifie à l'expiration du cache
+                wake_up = now + self.status.ttl
+            self.stats['pauses'] += 1
+            self.stats['avoided'] += int((wake_up - now) / self.interval)
+            return wake_up
+        
+        closing = hours.next_closing(now)
+        if closing and closing - now <= self.rush:
+            return min(now + self.fast_interval, closing)
+        next_poll = now + self.interval
+        if closing and next_poll > closing - self.rush:
+            # On entre dans la fenêtre de fin de service au bon moment
+            next_poll = max(closing - self.rush, now + self.fast_interval)
+        return next_poll
+    
+    def poll(self, store_id: int, now: datetime):
+        """Capture le frigo d'une cantine (change la cantine active du compte)"""
+        try:
+            self.api.set_active_canteen(store_id)
+            fridge = self.api.get_fridge()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"   ❌ {store_id}: {e}")
+            return
+        record = self.store.put(store_id, fridge, source='fridge', ts=now)
+        if self.db is not None:
+            # Une transaction par capture; les lecteurs (rapports) ne sont pas bloqués (WAL)
+            self.db.put_snapshot(store_id, fridge, ts=record['ts'], blob=record['blob'])
+        self.stats['polls'] += 1
+        print(f"   📦 {store_id}: {record['size']} octets{' (nouveau)' if record['new_blob'] else ''}")
+    
+    def tick(self, now: datetime = None) -> datetime:
+        """
+        Capture les cantines arrivées à échéance et replanifie
+        
+        Returns:
+            Prochaine échéance (toutes cantines confondues)
+        """
+        now = now or datetime.now()
+        try:
+            # Seuls les horaires absents ou périmés partent sur le réseau
+            self.status.refresh_openings(self.store_ids)
+        except Exception as e:
+            print(f"   ⚠️  Horaires non rafraîchis: {e}")
+        
+        for store_id, due in self.due.items():
+            if due is not None and due > now:
+                continue
+            hours = self.status.hours(store_id)
+            # Cantine fermée au démarrage: pas de capture, on planifie. Une échéance
+            # tombant à la fermeture capture encore l'état de fin de service.
+            if due is not None or not hours or hours.is_open(now) is not False:
+                self.poll(store_id, now)
+            self.due[store_id] = self.schedule(store_id, now)
+        
+        return min(self.due.values())
+    
+    def run(self, duration: int = None, max_sleep: int = 60):
+        """
+        Boucle de surveillance
+        
+        Args:
+            duration: Durée totale en secondes (None: sans fin)
+            max_sleep: Attente maximale entre deux vérifications
+        """
+        end = datetime.now() + timedelta(seconds=duration) if duration else None
+        while end is None or datetime.now() < end:
+            next_due = self.tick()
+            wait = (next_due - datetime.now()).total_seconds()
+            if end is not None:
+                wait = min(wait, (end - datetime.now()).total_seconds())
+            time.sleep(max(1, min(wait, max_sleep)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surveillance des frigos selon les horaires d'ouverture")
+    parser.add_argument('--store', type=int, action='append', help="ID de cantine (défaut: tout le registre)")
+    parser.add_argument('--interval', type=int, default=300, help="Secondes entre deux captures en service")
+    parser.add_argument('--fast-interval', type=int, default=60, help="Secondes entre deux captures avant la fermeture")
+    parser.add_argument('--rush', type=int, default=30, help="Minutes avant la fermeture où l'on accélère")
+    parser.add_argument('--duration', type=int, help="Durée de surveillance en secondes (défaut: sans fin)")
+    parser.add_argument('--once', action='store_true', help="Une seule passe")
+    parser.add_argument('--sqlite', nargs='?', const=DEFAULT_SQLITE_FILE, metavar='FICHIER',
+                        help="Écrire aussi les captures dans la base SQLite")
+    parser.add_argument('--base-url', help="URL de l'API (ex: serveur mock)")
+    args = parser.parse_args()
+    
+    data_dir = 'cantines_data'
+    registry = CanteenRegistry(os.path.join(data_dir, 'canteens.json'))
+    api = FoodlesRealAPI(
+        session_id=os.getenv('FOODLES_SESSIONID'),
+        csrf_token=os.getenv('FOODLES_CSRFTOKEN'),
+        base_url=args.base_url,
+    )
+    poller = FridgePoller(
+        api,
+        StoreStatus(api, os.path.join(data_dir, 'openings.json')),
+        SnapshotStore(os.path.join(data_dir, 'store')),
+        args.store or registry.ids(),
+        interval=args.interval,
+        fast_interval=args.fast_interval,
+        rush_minutes=args.rush,
+        db=SQLiteStore(args.sqlite) if args.sqlite else None,
+    )
+    
+    print(f"🔄 Surveillance de {len(poller.store_ids)} cantines")
+    try:
+        if args.once:
+            poller.tick()
+        else:
+            poller.run(args.duration)
+    except KeyboardInterrupt:
+        print("\n⏹️  Arrêt demandé")
+    
+    stats = poller.stats
+    print(f"\n✅ {stats['polls']} captures, {stats['errors']} erreurs, "
+          f"{stats['pauses']} mises en pause ({stats['avoided']} captures évitées hors service)")
+
+
+if __name__ == '__main__':
+    main()
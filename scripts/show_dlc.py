@@ -3,51 +3,89 @@
 Affiche un tableau de synthèse des produits en DLC courte
 """
 
-import json
+import argparse
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
 
-def load_cantines_data():
-    """Charge les données des 3 cantines"""
-    cantines = ['Copernic', 'Amazone', 'Hangar']
+sys.path.append(str(Path(__file__).parent.parent / 'lib'))
+from canteen_registry import CanteenRegistry
+from price_history import PriceHistory
+from snapshot_loader import SnapshotLoader
+from snapshot_store import SnapshotStore
+from sqlite_store import SQLiteStore, DEFAULT_SQLITE_FILE
+from stock_forecast import StockForecaster, format_hours
+
+def load_cantines_data(db=None):
+    """
+    Charge les données du jour de toutes les cantines du registre (décodage en parallèle)
+    
+    Args:
+        db: SQLiteStore optionnel: dernière capture du jour de chaque cantine, lue dans la base
+    """
+    registry = CanteenRegistry()
+    cantines = registry.short_names()
     products_dlc = []
+    missing = []
     date_str = datetime.now().strftime('%Y%m%d')
     
+    if db is not None:
+        # Les scripts de capture n'écrivent que dans le SnapshotStore: la base est mise à jour avant lecture
+        store_dir = os.path.join('cantines_data', 'store')
+        if os.path.isdir(os.path.join(store_dir, 'snapshots')):
+            added = db.import_store(SnapshotStore(store_dir))
+            if added:
+                print(f"⚡ SQLite: {added} nouvelle(s) capture(s) recopiée(s) dans {db.path}")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        found = db.dlc_products(registry.ids(), since=today)
+        for entry in registry:
+            if entry['id'] not in found:
+                missing.append(entry['short_name'])
+                continue
+            for p in found[entry['id']]:
+                products_dlc.append({
+                    'cantine': entry['short_name'],
+                    'produit': p['product'],
+                    'nom': p['name'],
+                    'categorie': p['category'],
+                    'prix': p['price'] / 100 if p['price'] else 0,
+                    'quantite': p['quantity'],
+                    'vegetarien': '🌱' if p['vegetarian'] else ''
+                })
+        if missing:
+            print(f"⚠️  Pas de capture du {date_str} dans {db.path} pour: {', '.join(missing[:10])}")
+        return products_dlc, cantines
+    
+    files = []
     for cantine in cantines:
         filename = f"cantines_data/cantine_{cantine}_{date_str}.json"
-        if not os.path.exists(filename):
-            print(f"⚠️  Fichier non trouvé: {filename}")
-            continue
-            
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            for category in data.get('categories', []):
-                items = category.get('items', []) or category.get('products', [])
-                for item in items:
-                    if item.get('has_near_expiration_sale', False):
-                        price = item.get('price', {})
-                        if isinstance(price, dict):
-                            price_val = price.get('amount', 0)
-                        else:
-                            price_val = price
-                        
-                        # Vérifier si végétarien
-                        filter_reasons = item.get('filter_reasons', {})
-                        excluded_diets = filter_reasons.get('excluded_diets', []) if filter_reasons else []
-                        is_vegetarian = 'VEGETARIAN' not in excluded_diets
-                        
-                        products_dlc.append({
-                            'cantine': cantine,
-                            'nom': item.get('name', 'N/A'),
-                            'categorie': category.get('name', 'N/A'),
-                            'prix': price_val / 100 if price_val else 0,
-                            'quantite': item.get('quantity', 0),
-                            'vegetarien': '🌱' if is_vegetarian else ''
-                        })
-        except Exception as e:
-            print(f"❌ Erreur lors du chargement de {cantine}: {e}")
+        if os.path.exists(filename):
+            files.append((filename, cantine))
+        else:
+            missing.append(cantine)
+    
+    for chunk in SnapshotLoader().iter_files(files):
+        for filename, cantine, _, records in chunk:
+            if not records:
+                print(f"❌ Erreur lors du chargement de {cantine}: aucun produit lisible")
+                continue
+            for record in records:
+                if not record.dlc:
+                    continue
+                products_dlc.append({
+                    'cantine': cantine,
+                    'produit': record.product,
+                    'nom': record.name,
+                    'categorie': record.category,
+                    'prix': record.price / 100 if record.price else 0,
+                    'quantite': record.quantity,
+                    'vegetarien': '🌱' if 'VEGETARIAN' not in record.diets else ''
+                })
+    
+    if missing:
+        shown = ', '.join(missing[:10]) + (f" (+{len(missing) - 10})" if len(missing) > 10 else '')
+        print(f"⚠️  Pas de fichier du {date_str} pour: {shown}")
     
     return products_dlc, cantines
 
@@ -96,10 +134,72 @@ def display_table(products_dlc, cantines):
         cheapest = min(products_dlc, key=lambda x: x['prix'])
         print(f"\n💡 Meilleure affaire: {cheapest['nom']} à {cheapest['prix']:.2f}€ ({cheapest['cantine']})")
 
+def display_stockouts(products_dlc):
+    """Prévision de rupture des produits en DLC (historique des captures)"""
+    store_dir = os.path.join('cantines_data', 'store')
+    if not products_dlc or not os.path.isdir(os.path.join(store_dir, 'snapshots')):
+        return
+    
+    forecaster = StockForecaster(os.path.join(store_dir, 'forecast.json'))
+    forecaster.update_from_store(SnapshotStore(store_dir))
+    forecaster.save()
+    
+    registry = CanteenRegistry()
+    forecasts = []
+    for p in products_dlc:
+        entry = registry.get(p['cantine'])
+        forecast = forecaster.lookup(entry['id'], p['produit']) if entry else None
+        if forecast and forecast['stockout_at']:
+            forecasts.append((p, forecast))
+    
+    if not forecasts:
+        return
+    print("\n⏳ Ruptures prévues:")
+    for p, forecast in sorted(forecasts, key=lambda x: x[1]['stockout_at']):
+        print(f"   • {p['nom']} ({p['cantine']}): {forecast['rate']:.1f}/h "
+              f"→ épuisé dans {format_hours(forecast['hours_left'])} ({forecast['stockout_at'].strftime('%H:%M')})")
+
+def display_markdowns(products_dlc):
+    """Démarque de chaque produit en DLC et remise type par catégorie (historique des prix)"""
+    store_dir = os.path.join('cantines_data', 'store')
+    if not products_dlc or not os.path.isdir(os.path.join(store_dir, 'snapshots')):
+        return
+    
+    history = PriceHistory(os.path.join(store_dir, 'prices.json'))
+    history.update_from_store(SnapshotStore(store_dir))
+    history.save()
+    
+    registry = CanteenRegistry()
+    lines = []
+    for p in products_dlc:
+        entry = registry.get(p['cantine'])
+        markdown = history.last_markdown(entry['id'], p['produit']) if entry else None
+        if markdown:
+            lines.append(f"   • {p['nom']} ({p['cantine']}): {markdown['from'] / 100:.2f}€ → "
+                         f"{markdown['to'] / 100:.2f}€ (-{markdown['depth'] * 100:.0f}%) "
+                         f"depuis {markdown['at'].strftime('%H:%M')}")
+    if lines:
+        print("\n🏷️  Démarques:")
+        print('\n'.join(lines))
+    
+    categories = {p['categorie'] for p in products_dlc}
+    typical = {c: stats for c, stats in history.typical_discount().items() if c in categories}
+    if typical:
+        print("\n📉 Remise type par catégorie:")
+        for category, stats in typical.items():
+            print(f"   • {category}: -{stats['median'] * 100:.0f}% ({stats['count']} démarques)")
+
 def main():
+    parser = argparse.ArgumentParser(description="Produits en DLC courte du jour")
+    parser.add_argument('--sqlite', nargs='?', const=DEFAULT_SQLITE_FILE, metavar='FICHIER',
+                        help="Lire les captures du jour dans la base SQLite")
+    args = parser.parse_args()
+    
     print("🔍 Chargement des données...\n")
-    products_dlc, cantines = load_cantines_data()
+    products_dlc, cantines = load_cantines_data(SQLiteStore(args.sqlite) if args.sqlite else None)
     display_table(products_dlc, cantines)
+    display_stockouts(products_dlc)
+    display_markdowns(products_dlc)
 
 if __name__ == '__main__':
     main()